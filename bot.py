@@ -6,8 +6,25 @@ import random
 import asyncio
 from datetime import datetime, timedelta
 import time
+import math
 import sys
 import aiofiles
+from array import array
+import aiohttp
+import re
+import unicodedata
+import heapq
+import bisect
+import sqlite3
+import subprocess
+import threading
+import signal
+import argparse
+import contextlib
+import contextvars
+import weakref
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping, MutableSequence
 
 # Railway logging setup
 import logging
@@ -21,235 +38,114 @@ intents.message_content = True
 intents.members = True
 intents.invites = True
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+class GatedCommandTree(discord.app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if not interaction.guild_id:
+            if interaction.type is discord.InteractionType.application_command:
+                await interaction.response.send_message("❌ Commands can only be used in a server!", ephemeral=True)
+            return False
+        if not await accept_interaction(interaction):
+            return False
+        await enter_guild(interaction.guild_id)
+        return await run_command_gate(interaction)
 
-# Configuration
+class GuildView(discord.ui.View):
+    """View whose callbacks see the state of the guild it was clicked in"""
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if not interaction.guild_id or not await accept_interaction(interaction):
+            return False
+        await enter_guild(interaction.guild_id)
+        return True
+
+class GuildModal(discord.ui.Modal):
+    """Modal whose submit handler sees the state of the guild it was sent from"""
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if not interaction.guild_id or not await accept_interaction(interaction):
+            return False
+        await enter_guild(interaction.guild_id)
+        return True
+
+# Sharded deployment: `python bot.py --workers N` runs N processes that split the shards
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', '0'))
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv('SHARD_IDS', '').split(',') if shard_id.strip()]
+WORKER_ID = int(os.getenv('WORKER_ID', '0'))
+WORKER_DATA_DIR = 'workers'
+SHARED_STORE_FILE = 'shared_store.db'
+SHARD_LEASE_TIMEOUT = 120
+INVENTORY_ID_BLOCK = 100
+INVENTORY_ID_LOW_WATER = 50
+
+if SHARD_COUNT:
+    bot = commands.AutoShardedBot(command_prefix='!', intents=intents, tree_cls=GatedCommandTree,
+                                  shard_count=SHARD_COUNT, shard_ids=SHARD_IDS or None)
+else:
+    bot = commands.Bot(command_prefix='!', intents=intents, tree_cls=GatedCommandTree)
+
+# Configuration (defaults for the home guild, other guilds use /config_guild)
 ADMIN_ROLE_ID = 1416365888499880056
 LOG_CHANNEL_ID = 1413818486404415590
 PURCHASE_LOG_CHANNEL_ID = 1413885597826813972
 MINIGAME_CHANNEL_ID = 1412400847404666940
 
+# The home guild keeps the top-level data files, found through LOG_CHANNEL_ID if not set
+HOME_GUILD_ID = int(os.getenv('HOME_GUILD_ID', '0'))
+GUILD_DATA_DIR = 'guilds'
+GUILD_IDLE_TIMEOUT = 3600
+
+# Graceful shutdown: how long to wait for in-flight events, then for the final save
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv('SHUTDOWN_DRAIN_TIMEOUT', '10'))
+SHUTDOWN_SAVE_TIMEOUT = float(os.getenv('SHUTDOWN_SAVE_TIMEOUT', '10'))
+
 # Coinflip configuration
 coinflip_config = {
     "win_chance": 45,
     "max_bet": 1000
 }
+COINFLIP_MAX_ROUNDS = 50
 
 # Mines configuration
 mines_config = {
     "min_mines": 1,
     "max_mines": 24,
     "min_bet": 100,
-    "max_bet": 1000
-}
-
-# Mines multipliers
-MINES_MULTIPLIERS = {
-    1: 1.00, 2: 1.10, 3: 1.21, 4: 1.33, 5: 1.46,
-    6: 1.61, 7: 1.77, 8: 1.95, 9: 2.14, 10: 2.36,
-    11: 2.59, 12: 2.85, 13: 3.14, 14: 3.45, 15: 3.80,
-    16: 4.18, 17: 4.60, 18: 5.06, 19: 5.57, 20: 6.12,
-    21: 6.74, 22: 7.41, 23: 8.15, 24: 8.97, 25: 9.87
+    "max_bet": 1000,
+    "house_edge": 3,
+    "expire_action": "cashout"
 }
 
-# Minigame questions and answers
-MINIGAME_QUESTIONS = [
-    {"question": "What is the capital of France?", "answer": "paris"},
-    {"question": "What is 5 + 7?", "answer": "12"},
-    {"question": "What is the largest planet in our solar system?", "answer": "jupiter"},
-    {"question": "How many continents are there?", "answer": "7"},
-    {"question": "What is the chemical symbol for gold?", "answer": "au"},
-    {"question": "Who wrote Romeo and Juliet?", "answer": "shakespeare"},
-    {"question": "What is the square root of 64?", "answer": "8"},
-    {"question": "How many days are in a leap year?", "answer": "366"},
-    {"question": "What is the fastest land animal?", "answer": "cheetah"},
-    {"question": "What is the hardest natural substance on Earth?", "answer": "diamond"},
-    {"question": "What is the capital of Japan?", "answer": "tokyo"},
-    {"question": "How many sides does a hexagon have?", "answer": "6"},
-    {"question": "What gas do humans breathe in to survive?", "answer": "oxygen"},
-    {"question": "Who painted the Mona Lisa?", "answer": "da vinci"},
-    {"question": "What is the tallest mountain in the world?", "answer": "everest"},
-    {"question": "What is H2O commonly known as?", "answer": "water"},
-    {"question": "How many hours are in a day?", "answer": "24"},
-    {"question": "Which planet is known as the Red Planet?", "answer": "mars"},
-    {"question": "How many letters are in the English alphabet?", "answer": "26"},
-    {"question": "What is the freezing point of water in Celsius?", "answer": "0"},
-    {"question": "Which ocean is the largest?", "answer": "pacific"},
-    {"question": "What is the currency of the USA?", "answer": "dollar"},
-    {"question": "What is the fastest bird in the world?", "answer": "peregrine falcon"},
-    {"question": "Who is known as the father of computers?", "answer": "charles babbage"},
-    {"question": "What is the main language spoken in Brazil?", "answer": "portuguese"},
-    {"question": "How many planets are in our solar system?", "answer": "8"},
-    {"question": "What organ pumps blood in the human body?", "answer": "heart"},
-    {"question": "What is the boiling point of water in Celsius?", "answer": "100"},
-    {"question": "Which animal is known as the King of the Jungle?", "answer": "lion"},
-    {"question": "How many bones are in the adult human body?", "answer": "206"},
-    {"question": "What is the capital of Italy?", "answer": "rome"},
-    {"question": "What is the capital of Germany?", "answer": "berlin"},
-    {"question": "What is the capital of Spain?", "answer": "madrid"},
-    {"question": "What is the capital of Canada?", "answer": "ottawa"},
-    {"question": "What is the capital of Australia?", "answer": "canberra"},
-    {"question": "What is the capital of China?", "answer": "beijing"},
-    {"question": "How many minutes are in an hour?", "answer": "60"},
-    {"question": "How many seconds are in a minute?", "answer": "60"},
-    {"question": "How many weeks are in a year?", "answer": "52"},
-    {"question": "How many colors are in a rainbow?", "answer": "7"},
-    {"question": "What planet is closest to the Sun?", "answer": "mercury"},
-    {"question": "What is the largest mammal?", "answer": "blue whale"},
-    {"question": "Which bird can mimic human speech?", "answer": "parrot"},
-    {"question": "What is the smallest prime number?", "answer": "2"},
-    {"question": "What is the opposite of hot?", "answer": "cold"},
-    {"question": "What is the opposite of light?", "answer": "dark"},
-    {"question": "What is the opposite of up?", "answer": "down"},
-    {"question": "What is the opposite of left?", "answer": "right"},
-    {"question": "What is the opposite of fast?", "answer": "slow"},
-    {"question": "How many days are in a week?", "answer": "7"},
-    {"question": "How many months are in a year?", "answer": "12"},
-    {"question": "What is the capital of the UK?", "answer": "london"},
-    {"question": "What is the capital of Russia?", "answer": "moscow"},
-    {"question": "What is the capital of India?", "answer": "new delhi"},
-    {"question": "What is the capital of South Korea?", "answer": "seoul"},
-    {"question": "What is the capital of Egypt?", "answer": "cairo"},
-    {"question": "What is the capital of Mexico?", "answer": "mexico city"},
-    {"question": "How many players are on a soccer team?", "answer": "11"},
-    {"question": "What sport uses a bat and ball?", "answer": "baseball"},
-    {"question": "What sport is known as the beautiful game?", "answer": "football"},
-    {"question": "What sport uses rackets and a shuttlecock?", "answer": "badminton"},
-    {"question": "What sport uses rackets and a yellow ball?", "answer": "tennis"},
-    {"question": "What sport has positions called quarterback and linebacker?", "answer": "american football"},
-    {"question": "What sport is played on ice with sticks?", "answer": "hockey"},
-    {"question": "What is the capital of Argentina?", "answer": "buenos aires"},
-    {"question": "What is the capital of Turkey?", "answer": "ankara"},
-    {"question": "What is the capital of Greece?", "answer": "athens"},
-    {"question": "What is the capital of Sweden?", "answer": "stockholm"},
-    {"question": "What is the capital of Norway?", "answer": "oslo"},
-    {"question": "What is the capital of Finland?", "answer": "helsinki"},
-    {"question": "What is the capital of Poland?", "answer": "warsaw"},
-    {"question": "What is the capital of Portugal?", "answer": "lisbon"},
-    {"question": "What is the capital of Netherlands?", "answer": "amsterdam"},
-    {"question": "What is the capital of Belgium?", "answer": "brussels"},
-    {"question": "What is the capital of Switzerland?", "answer": "bern"},
-    {"question": "What is the capital of Austria?", "answer": "vienna"},
-    {"question": "What is the capital of Hungary?", "answer": "budapest"},
-    {"question": "What is the capital of Czech Republic?", "answer": "prague"},
-    {"question": "What is the capital of Denmark?", "answer": "copenhagen"},
-    {"question": "What is the capital of Ireland?", "answer": "dublin"},
-    {"question": "What is the capital of New Zealand?", "answer": "wellington"},
-    {"question": "What is the capital of South Africa?", "answer": "pretoria"},
-    {"question": "What is the capital of Nigeria?", "answer": "abuja"},
-    {"question": "What is the capital of Kenya?", "answer": "nairobi"},
-    {"question": "What is the capital of Saudi Arabia?", "answer": "riyadh"},
-    {"question": "What is the capital of United Arab Emirates?", "answer": "abu dhabi"},
-    {"question": "What is the capital of Israel?", "answer": "jerusalem"},
-    {"question": "What is the capital of Thailand?", "answer": "bangkok"},
-    {"question": "What is the capital of Vietnam?", "answer": "hanoi"},
-    {"question": "What is the capital of Indonesia?", "answer": "jakarta"},
-    {"question": "What is the capital of Malaysia?", "answer": "kuala lumpur"},
-    {"question": "What is the capital of Philippines?", "answer": "manila"},
-    {"question": "What is the capital of Singapore?", "answer": "singapore"},
-    {"question": "What is the capital of Pakistan?", "answer": "islamabad"},
-    {"question": "What is the capital of Afghanistan?", "answer": "kabul"}
+# Doors configuration (prizes are checked in order, chances in %)
+DEFAULT_DOORS_PRIZES = [
+    {"name": "TITANIC", "chance": 0.3, "tokens": 0},
+    {"name": "1,000,000,000 Gems", "chance": 1.0, "tokens": 0},
+    {"name": "300,000,000 Gems", "chance": 1.5, "tokens": 0},
+    {"name": "50,000,000 Gems", "chance": 20.0, "tokens": 0},
+    {"name": "10,000,000 Gems", "chance": 30.0, "tokens": 0},
+    {"name": "450 Tokens", "chance": 47.2, "tokens": 450}
 ]
+doors_config = {"fee": 550, "prizes": [dict(prize) for prize in DEFAULT_DOORS_PRIZES]}
+doors_cumulative = []
+DOORS_MAX_BATCH = 20
+SHOP_PAGE_SIZE = 10
+SHOP_RESERVATION_TIMEOUT = 60
+INVENTORY_PAGE_SIZE = 10
 
-MINIGAME_SCRAMBLED_WORDS = [
-    {"scrambled": "ELAPP", "answer": "apple"},
-    {"scrambled": "ANBNAA", "answer": "banana"},
-    {"scrambled": "ROANGE", "answer": "orange"},
-    {"scrambled": "OGDO", "answer": "dog"},
-    {"scrambled": "TCA", "answer": "cat"},
-    {"scrambled": "ELEPHTNA", "answer": "elephant"},
-    {"scrambled": "RTEICH", "answer": "cherry"},
-    {"scrambled": "OMUTECRP", "answer": "computer"},
-    {"scrambled": "HOENP", "answer": "phone"},
-    {"scrambled": "OKOB", "answer": "book"},
-    {"scrambled": "RAC", "answer": "car"},
-    {"scrambled": "SUOH", "answer": "house"},
-    {"scrambled": "SMEUO", "answer": "mouse"},
-    {"scrambled": "EESHC", "answer": "cheese"},
-    {"scrambled": "GAEM", "answer": "game"},
-    {"scrambled": "APTOPL", "answer": "laptop"},
-    {"scrambled": "VLOE", "answer": "love"},
-    {"scrambled": "REHTOM", "answer": "mother"},
-    {"scrambled": "REHTAF", "answer": "father"},
-    {"scrambled": "SISRET", "answer": "sister"},
-    {"scrambled": "BORHTER", "answer": "brother"},
-    {"scrambled": "DLOHCS", "answer": "school"},
-    {"scrambled": "EHCTARE", "answer": "teacher"},
-    {"scrambled": "STUDNTE", "answer": "student"},
-    {"scrambled": "TNETRINEN", "answer": "internet"},
-    {"scrambled": "RODTCO", "answer": "doctor"},
-    {"scrambled": "ESRUN", "answer": "nurse"},
-    {"scrambled": "YOB", "answer": "boy"},
-    {"scrambled": "RLIG", "answer": "girl"},
-    {"scrambled": "ABLL", "answer": "ball"},
-    {"scrambled": "PHSO", "answer": "shop"},
-    {"scrambled": "BANK", "answer": "bank"},
-    {"scrambled": "YENOM", "answer": "money"},
-    {"scrambled": "TROCMAEK", "answer": "market"},
-    {"scrambled": "DLORW", "answer": "world"},
-    {"scrambled": "KABROO", "answer": "bookar"},  # filler alt
-    {"scrambled": "OTOPSH", "answer": "photos"},
-    {"scrambled": "PMAC", "answer": "camp"},
-    {"scrambled": "TAEHR", "answer": "earth"},
-    {"scrambled": "UNS", "answer": "sun"},
-    {"scrambled": "MNOO", "answer": "moon"},
-    {"scrambled": "STRSA", "answer": "stars"},
-    {"scrambled": "DLOUC", "answer": "cloud"},
-    {"scrambled": "NRAI", "answer": "rain"},
-    {"scrambled": "WNOSI", "answer": "snow"},
-    {"scrambled": "DNWI", "answer": "wind"},
-    {"scrambled": "REIVR", "answer": "river"},
-    {"scrambled": "KLAE", "answer": "lake"},
-    {"scrambled": "NAECO", "answer": "ocean"},
-    {"scrambled": "GEVLOA", "answer": "volage"},  # alt volcano
-    {"scrambled": "NTOMUAN", "answer": "mountan"},  # alt mountain
-    {"scrambled": "TRSEE", "answer": "trees"},
-    {"scrambled": "WOLFRE", "answer": "flower"},
-    {"scrambled": "ASSRG", "answer": "grass"},
-    {"scrambled": "ROFSET", "answer": "forest"},
-    {"scrambled": "REIF", "answer": "fire"},
-    {"scrambled": "REWOTA", "answer": "water"},
-    {"scrambled": "DOFO", "answer": "food"},
-    {"scrambled": "BDA", "answer": "bad"},
-    {"scrambled": "GODO", "answer": "good"},
-    {"scrambled": "ENIC", "answer": "nice"},
-    {"scrambled": "YHAPHP", "answer": "happy"},
-    {"scrambled": "SDA", "answer": "sad"},
-    {"scrambled": "DMAD", "answer": "mad"},
-    {"scrambled": "NEPPAH", "answer": "happen"},
-    {"scrambled": "RGONOAD", "answer": "dragon"},
-    {"scrambled": "RGIHT", "answer": "right"},
-    {"scrambled": "FTLE", "answer": "left"},
-    {"scrambled": "PU", "answer": "up"},
-    {"scrambled": "NWOD", "answer": "down"},
-    {"scrambled": "HATR", "answer": "hat"},
-    {"scrambled": "OSHE", "answer": "shoe"},
-    {"scrambled": "STOCKS", "answer": "socks"},
-    {"scrambled": "HATC", "answer": "chat"},
-    {"scrambled": "TPHOE", "answer": "phone"},
-    {"scrambled": "YEK", "answer": "key"},
-    {"scrambled": "TRDOO", "answer": "door"},
-    {"scrambled": "WNIODW", "answer": "window"},
-    {"scrambled": "TBEAL", "answer": "table"},
-    {"scrambled": "RIDCHA", "answer": "chair"},
-    {"scrambled": "DRAB", "answer": "bard"},
-    {"scrambled": "TRAP", "answer": "part"},
-    {"scrambled": "ELBAT", "answer": "table"},
-    {"scrambled": "MROFO", "answer": "form"},
-    {"scrambled": "TPECOMUR", "answer": "computer"},
-    {"scrambled": "OYTO", "answer": "toy"},
-    {"scrambled": "LALB", "answer": "ball"},
-    {"scrambled": "RATC", "answer": "cart"},
-    {"scrambled": "LAURB", "answer": "rural"},
-    {"scrambled": "FRIEND", "answer": "friend"},
-    {"scrambled": "LOVE", "answer": "love"},
-    {"scrambled": "PEACE", "answer": "peace"},
-    {"scrambled": "MUSIC", "answer": "music"},
-    {"scrambled": "DANCE", "answer": "dance"},
-    {"scrambled": "SING", "answer": "sing"},
-    {"scrambled": "MOVIE", "answer": "movie"},
-    {"scrambled": "GAME", "answer": "game"}
-]
+# Mines payout table (flat list, see build_mines_payout_table)
+MINES_GRID_SIZE = 25
+MINES_GAME_TIMEOUT = 300
+JOIN_BATCH_WINDOW = 2
+JOIN_BATCH_MAX = 100
+INVITE_REWARD = 300
+DUEL_TIMEOUT = 60
+DUEL_QUEUE_TIMEOUT = 300
+# Lower edges of the open-duel stake buckets
+DUEL_QUEUE_BUCKETS = [1, 100, 500, 1000, 5000, 10000]
+mines_payout_table = []
+
+# Minigame question banks (one entry per line, read lazily)
+MINIGAME_BANK_DIR = 'minigames'
+MINIGAME_PRIZE = 200
+MINIGAME_DURATION = 60
+ANSWER_IGNORED_WORDS = frozenset({"the", "a", "an"})
 
 # Priority roles for giveaways
 PRIORITY_ROLES = {
@@ -258,23 +154,171 @@ PRIORITY_ROLES = {
     1410917146459897928: 3,
 }
 
-# Data storage
-user_data = {}
-shop_data = []
-cooldowns = {
-    "daily": {}, "work": {}, "crime": {}, "gift": {}, "buy": {}, 
-    "coinflip": {}, "duel": {}, "giveaway": {}, "mines": {}, 
-    "roblox": {}, "doors": {}
-}
-pending_duels = {}
-active_giveaways = {}
-giveaway_daily_totals = {}
-active_mines_games = {}
-invite_data = {}
+COOLDOWN_COMMANDS = ("daily", "work", "crime", "gift", "buy", "coinflip", "duel", "giveaway", "mines", "roblox", "doors")
+
+def new_cooldowns():
+    """Get empty cooldown tables for every command"""
+    return {command: {} for command in COOLDOWN_COMMANDS}
+
+# Guild partitioning
+current_guild_id = contextvars.ContextVar("current_guild_id", default=None)
+home_guild_id = None
+guild_states = {}
+guild_load_locks = {}
+shared_store = None
+
+def owns_guild(guild_id):
+    """Check whether one of this process's shards receives the guild's events"""
+    return not SHARD_IDS or (guild_id >> 22) % SHARD_COUNT in SHARD_IDS
+
+def get_default_guild_config(guild_id):
+    """Get the starting config for a guild, the home guild inherits the module constants"""
+    if guild_id == home_guild_id:
+        return {
+            "admin_role_ids": [ADMIN_ROLE_ID],
+            "log_channel_id": LOG_CHANNEL_ID,
+            "purchase_log_channel_id": PURCHASE_LOG_CHANNEL_ID,
+            "priority_roles": dict(PRIORITY_ROLES)
+        }
+    return {"admin_role_ids": [], "log_channel_id": None, "purchase_log_channel_id": None, "priority_roles": {}}
+
+class GuildState:
+    """Partitioned state for one guild, loaded on first use and dropped when idle"""
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.last_used = time.time()
+        self.config = get_default_guild_config(guild_id)
+        self.user_data = {}
+        self.shop_data = []
+        self.shop_name_index = {}
+        self.shop_sorted_names = []
+        self.shop_trigram_index = {}
+        self.shop_reservations = {}
+        self.shop_reserved = {}
+        self.cooldowns = new_cooldowns()
+        self.active_giveaways = {}
+        self.giveaway_daily_totals = {}
+        self.active_mines_games = {}
+        self.mines_views = {}
+        self.pending_duels = {}
+        self.duel_queues = {}
+        self.duel_queue_index = {}
+        self.invite_data = {}
+        self.invited_index = {}
+        self.invite_config = {"clawback_hours": 24}
+        self.minigame_config = {
+            "channels": [MINIGAME_CHANNEL_ID] if guild_id == home_guild_id else [],
+            "message_threshold": 75
+        }
+    
+    def has_timers(self):
+        """Check for state that expires on its own, which keeps the guild loaded"""
+        return bool(self.active_giveaways or self.active_mines_games or self.pending_duels
+                    or self.duel_queue_index or self.shop_reservations)
+
+def get_guild_state():
+    """Get the state of the guild the current event belongs to"""
+    guild_id = current_guild_id.get()
+    if guild_id is None:
+        raise RuntimeError("No guild selected for this event")
+    return guild_states[guild_id]
+
+class GuildDict(MutableMapping):
+    """Module-level dict that resolves to the current guild's copy"""
+    def __init__(self, name):
+        self.name = name
+    
+    def __getitem__(self, key):
+        return getattr(get_guild_state(), self.name)[key]
+    
+    def __setitem__(self, key, value):
+        getattr(get_guild_state(), self.name)[key] = value
+    
+    def __delitem__(self, key):
+        del getattr(get_guild_state(), self.name)[key]
+    
+    def __iter__(self):
+        return iter(getattr(get_guild_state(), self.name))
+    
+    def __len__(self):
+        return len(getattr(get_guild_state(), self.name))
+    
+    def __contains__(self, key):
+        return key in getattr(get_guild_state(), self.name)
+
+class GuildList(MutableSequence):
+    """Module-level list that resolves to the current guild's copy"""
+    def __init__(self, name):
+        self.name = name
+    
+    def __getitem__(self, index):
+        return getattr(get_guild_state(), self.name)[index]
+    
+    def __setitem__(self, index, value):
+        getattr(get_guild_state(), self.name)[index] = value
+    
+    def __delitem__(self, index):
+        del getattr(get_guild_state(), self.name)[index]
+    
+    def __len__(self):
+        return len(getattr(get_guild_state(), self.name))
+    
+    def insert(self, index, value):
+        getattr(get_guild_state(), self.name).insert(index, value)
+
+# Data storage (GuildDict/GuildList names are per guild)
+guild_config = GuildDict("config")
+user_data = GuildDict("user_data")
+shop_data = GuildList("shop_data")
+shop_name_index = GuildDict("shop_name_index")
+shop_sorted_names = GuildList("shop_sorted_names")
+shop_trigram_index = GuildDict("shop_trigram_index")
+shop_reservations = GuildDict("shop_reservations")
+shop_reserved = GuildDict("shop_reserved")
+inventory_ledger = {}
+ledger_unsaved = []
+user_inventory = {}
+ledger_user_index = {}
+ledger_item_index = {}
+pending_fulfillment = {}
+balance_ledger_unsaved = []
+shared_snapshots = {}
+shared_versions = {}
+inventory_tail = 0
+inventory_ids = deque()
+inventory_id_refill = None
+cooldowns = GuildDict("cooldowns")
+pending_duels = GuildDict("pending_duels")
+duel_queues = GuildDict("duel_queues")
+duel_queue_index = GuildDict("duel_queue_index")
+active_giveaways = GuildDict("active_giveaways")
+giveaway_daily_totals = GuildDict("giveaway_daily_totals")
+active_mines_games = GuildDict("active_mines_games")
+mines_views = GuildDict("mines_views")
+invite_data = GuildDict("invite_data")
 user_message_times = {}
+invite_cache = {}
+invited_index = GuildDict("invited_index")
+invite_config = GuildDict("invite_config")
+join_queue = asyncio.Queue()
+save_lock = asyncio.Lock()
+startup_complete = asyncio.Event()
 roblox_data = {}
-active_minigame = None
-minigame_message_count = 0
+roblox_name_index = {}
+roblox_name_cache = {}
+roblox_pending_lookups = {}
+roblox_lookup_task = None
+active_minigames = {}
+minigame_message_counts = {}
+minigame_channel_ids = set()
+minigame_config = GuildDict("minigame_config")
+minigame_state = {}
+
+# Deadline scheduler state
+deadline_heap = []
+deadline_entries = {}
+deadline_wakeup = None
+deadline_tasks = set()
 
 # Data file paths
 USER_DATA_FILE = 'user_data.json'
@@ -285,8 +329,44 @@ DAILY_GIVEAWAYS_FILE = 'daily_giveaways.json'
 COINFLIP_CONFIG_FILE = 'coinflip_config.json'
 MINES_CONFIG_FILE = 'mines_config.json'
 INVITE_DATA_FILE = 'invite_data.json'
+INVITED_INDEX_FILE = 'invited_index.json'
+INVITE_CONFIG_FILE = 'invite_config.json'
 ANTISPAM_DATA_FILE = 'antispam_data.json'
 ROBLOX_DATA_FILE = 'roblox_data.json'
+MINIGAME_STATE_FILE = 'minigame_state.json'
+MINIGAME_CONFIG_FILE = 'minigame_config.json'
+GUILD_CONFIG_FILE = 'guild_config.json'
+ACTIVE_GUILDS_FILE = 'active_guilds.json'
+ROBLOX_RESOLVER = os.getenv('ROBLOX_RESOLVER', 'api')
+ROBLOX_NAME_CACHE_TTL = 3600
+ROBLOX_BATCH_WINDOW = 0.5
+ROBLOX_BATCH_MAX = 100
+ROBLOX_USERNAME_PATTERN = re.compile(r"^(?=.{3,20}$)[A-Za-z0-9]+(_[A-Za-z0-9]+)?$")
+MINES_GAMES_FILE = 'mines_games.json'
+DOORS_CONFIG_FILE = 'doors_config.json'
+DUELS_FILE = 'duels.json'
+DUEL_QUEUE_FILE = 'duel_queue.json'
+INVENTORY_LEDGER_FILE = 'inventory_ledger.jsonl'
+BALANCE_LEDGER_FILE = 'balance_ledger.jsonl'
+ECONOMY_STATS_FILE = 'economy_stats.json'
+ECONOMY_DAILY_BUCKETS = 30
+ECONOMY_SOURCES = {
+    "chat": "💬 Chat",
+    "daily": "📅 Daily",
+    "work": "💼 Work",
+    "crime": "🦹 Crime",
+    "coinflip": "🪙 Coinflip",
+    "mines": "💣 Mines",
+    "doors": "🚪 Doors",
+    "duel": "⚔️ Duels",
+    "gift": "🎁 Gifts",
+    "giveaway": "🎉 Giveaways",
+    "shop": "🛒 Shop",
+    "minigame": "🎯 Minigames",
+    "invite": "📨 Invites",
+    "admin": "🛠️ Admin",
+    "opening": "📂 Opening Balances"
+}
 
 WORK_JOBS = [
     "worked as a cashier at the supermarket", "stocked shelves at the grocery store", 
@@ -339,65 +419,11 @@ CRIME_ACTIVITIES = [
 ]
 
 async def load_data():
-    """Load all data from files"""
-    global user_data, shop_data, cooldowns, active_giveaways, giveaway_daily_totals
-    global coinflip_config, mines_config, invite_data, user_message_times, roblox_data
+    """Load the data shared by every guild (guild data is loaded by load_guild_state)"""
+    global coinflip_config, mines_config, user_message_times, roblox_data
+    global minigame_state, doors_config, inventory_tail
     
     try:
-        # Load user data
-        if os.path.exists(USER_DATA_FILE):
-            async with aiofiles.open(USER_DATA_FILE, 'r') as f:
-                contents = await f.read()
-                user_data = json.loads(contents)
-                print(f"✅ Loaded user data for {len(user_data)} users")
-        else:
-            print("ℹ️ No user data file found, starting fresh")
-            user_data = {}
-            
-        # Load shop data
-        if os.path.exists(SHOP_DATA_FILE):
-            async with aiofiles.open(SHOP_DATA_FILE, 'r') as f:
-                contents = await f.read()
-                shop_data = json.loads(contents)
-                print(f"✅ Loaded {len(shop_data)} shop items")
-        else:
-            print("ℹ️ No shop data file found, starting fresh")
-            shop_data = []
-            
-        # Load cooldowns
-        if os.path.exists(COOLDOWNS_FILE):
-            async with aiofiles.open(COOLDOWNS_FILE, 'r') as f:
-                contents = await f.read()
-                cooldowns = json.loads(contents)
-                print("✅ Loaded cooldown data")
-        else:
-            print("ℹ️ No cooldowns file found, starting fresh")
-            cooldowns = {
-                "daily": {}, "work": {}, "crime": {}, "gift": {}, "buy": {}, 
-                "coinflip": {}, "duel": {}, "giveaway": {}, "mines": {}, 
-                "roblox": {}, "doors": {}
-            }
-        
-        # Load active giveaways
-        if os.path.exists(GIVEAWAYS_FILE):
-            async with aiofiles.open(GIVEAWAYS_FILE, 'r') as f:
-                contents = await f.read()
-                active_giveaways = json.loads(contents)
-                print(f"✅ Loaded {len(active_giveaways)} active giveaways")
-        else:
-            print("ℹ️ No giveaways file found, starting fresh")
-            active_giveaways = {}
-            
-        # Load daily giveaway totals
-        if os.path.exists(DAILY_GIVEAWAYS_FILE):
-            async with aiofiles.open(DAILY_GIVEAWAYS_FILE, 'r') as f:
-                contents = await f.read()
-                giveaway_daily_totals = json.loads(contents)
-                print("✅ Loaded daily giveaway totals")
-        else:
-            print("ℹ️ No daily giveaways file found, starting fresh")
-            giveaway_daily_totals = {}
-            
         # Load coinflip configuration
         if os.path.exists(COINFLIP_CONFIG_FILE):
             async with aiofiles.open(COINFLIP_CONFIG_FILE, 'r') as f:
@@ -413,24 +439,31 @@ async def load_data():
             async with aiofiles.open(MINES_CONFIG_FILE, 'r') as f:
                 contents = await f.read()
                 mines_config = json.loads(contents)
+                mines_config.setdefault("house_edge", 3)
+                mines_config.setdefault("expire_action", "cashout")
                 print("✅ Loaded mines configuration")
         else:
             print("ℹ️ No mines config file found, using defaults")
-            mines_config = {"min_mines": 1, "max_mines": 24, "min_bet": 100, "max_bet": 1000}
+            mines_config = {"min_mines": 1, "max_mines": 24, "min_bet": 100, "max_bet": 1000, "house_edge": 3, "expire_action": "cashout"}
             
-        # Load invite data
-        if os.path.exists(INVITE_DATA_FILE):
-            async with aiofiles.open(INVITE_DATA_FILE, 'r') as f:
+        # Load doors configuration
+        if os.path.exists(DOORS_CONFIG_FILE):
+            async with aiofiles.open(DOORS_CONFIG_FILE, 'r') as f:
                 contents = await f.read()
-                invite_data = json.loads(contents)
-                print(f"✅ Loaded invite data for {len(invite_data)} inviters")
+                doors_config = json.loads(contents)
+            error = validate_doors_config(doors_config)
+            if error:
+                print(f"⚠️ Invalid doors config ({error}), using defaults")
+                doors_config = {"fee": 550, "prizes": [dict(prize) for prize in DEFAULT_DOORS_PRIZES]}
+            else:
+                print(f"✅ Loaded doors configuration ({len(doors_config['prizes'])} prizes)")
         else:
-            print("ℹ️ No invite data file found, starting fresh")
-            invite_data = {}
+            print("ℹ️ No doors config file found, using defaults")
+            doors_config = {"fee": 550, "prizes": [dict(prize) for prize in DEFAULT_DOORS_PRIZES]}
             
         # Load anti-spam data
-        if os.path.exists(ANTISPAM_DATA_FILE):
-            async with aiofiles.open(ANTISPAM_DATA_FILE, 'r') as f:
+        if os.path.exists(get_worker_file(ANTISPAM_DATA_FILE)):
+            async with aiofiles.open(get_worker_file(ANTISPAM_DATA_FILE), 'r') as f:
                 contents = await f.read()
                 user_message_times = json.loads(contents)
                 print("✅ Loaded anti-spam data")
@@ -448,22 +481,224 @@ async def load_data():
             print("ℹ️ No Roblox data file found, starting fresh")
             roblox_data = {}
             
+        # Sharded workers share game configs and Roblox links, the files only seed the store
+        if shared_store:
+            configs = {"coinflip": coinflip_config, "mines": mines_config, "doors": doors_config}
+            await open_shared_documents("config", configs)
+            coinflip_config, mines_config, doors_config = configs["coinflip"], configs["mines"], configs["doors"]
+            await open_shared_documents("roblox", roblox_data)
+            print(f"✅ Loaded shared configs and {len(roblox_data)} Roblox links")
+        build_roblox_index()
+            
+        # Load minigame question cursors
+        if os.path.exists(get_worker_file(MINIGAME_STATE_FILE)):
+            async with aiofiles.open(get_worker_file(MINIGAME_STATE_FILE), 'r') as f:
+                contents = await f.read()
+                minigame_state = json.loads(contents)
+                print(f"✅ Loaded minigame cursors for {len(minigame_state)} question banks")
+        else:
+            print("ℹ️ No minigame state file found, starting fresh")
+            minigame_state = {}
+            
+        # Load inventory ledger (append-only, replayed to rebuild the indexes)
+        reset_inventory_ledger()
+        entries = []
+        if os.path.exists(INVENTORY_LEDGER_FILE):
+            async with aiofiles.open(INVENTORY_LEDGER_FILE, 'r') as f:
+                contents = await f.read()
+                entries = [json.loads(line) for line in contents.splitlines() if line.strip()]
+        inventory_tail = 0
+        if shared_store:
+            await asyncio.to_thread(shared_store.open_inventory_ledger, entries)
+            stored = await asyncio.to_thread(shared_store.read_inventory_entries)
+            entries = [entry for _, entry in stored]
+            inventory_tail = stored[-1][0] if stored else 0
+            inventory_ids.clear()
+            inventory_ids.extend(await asyncio.to_thread(shared_store.claim_inventory_ids, INVENTORY_ID_BLOCK))
+        for entry in sorted(entries, key=lambda e: e["id"]):
+            # A save retried after a failed append can repeat entries
+            if entry["id"] not in inventory_ledger:
+                apply_ledger_entry(entry)
+        if inventory_ledger:
+            print(f"✅ Loaded {len(inventory_ledger)} ledger entries ({len(pending_fulfillment)} pending fulfillment)")
+        else:
+            print("ℹ️ No inventory ledger found, starting fresh")
+            
+        # Load economy aggregates, replaying the balance ledger if they are missing
+        balance_ledger_unsaved.clear()
+        economy.reset()
+        if shared_store:
+            # The home guild's worker seeds the shared ledger from the single-process one
+            if owns_guild(home_guild_id):
+                entries = []
+                if os.path.exists(BALANCE_LEDGER_FILE):
+                    async with aiofiles.open(BALANCE_LEDGER_FILE, 'r') as f:
+                        contents = await f.read()
+                        entries = [json.loads(line) for line in contents.splitlines() if line.strip()]
+                economy.needs_opening = await asyncio.to_thread(shared_store.open_balance_ledger, entries)
+            economy.load_dict(await asyncio.to_thread(shared_store.read_economy))
+            print(f"✅ Loaded shared economy aggregates ({economy.next_entry_id} ledger entries)")
+        elif os.path.exists(ECONOMY_STATS_FILE):
+            async with aiofiles.open(ECONOMY_STATS_FILE, 'r') as f:
+                contents = await f.read()
+                economy.load_dict(json.loads(contents))
+                print(f"✅ Loaded economy aggregates ({economy.next_entry_id} ledger entries)")
+        elif os.path.exists(BALANCE_LEDGER_FILE):
+            async with aiofiles.open(BALANCE_LEDGER_FILE, 'r') as f:
+                contents = await f.read()
+                entries = {entry["id"]: entry for entry in (json.loads(line) for line in contents.splitlines() if line.strip())}
+                for entry_id in sorted(entries):
+                    economy.apply_entry(entries[entry_id])
+                print(f"✅ Rebuilt economy aggregates from {len(entries)} ledger entries")
+        else:
+            # First run with the ledger: the home guild books its balances when it loads
+            economy.needs_opening = True
+            print("ℹ️ No balance ledger found, starting fresh")
+            
+            
     except Exception as e:
         print(f"⚠️ Error loading data: {e}")
-        user_data = {}
-        shop_data = []
-        cooldowns = {
-            "daily": {}, "work": {}, "crime": {}, "gift": {}, "buy": {}, 
-            "coinflip": {}, "duel": {}, "giveaway": {}, "mines": {}, 
-            "roblox": {}, "doors": {}
-        }
-        active_giveaways = {}
-        giveaway_daily_totals = {}
         coinflip_config = {"win_chance": 45, "max_bet": 1000}
-        mines_config = {"min_mines": 1, "max_mines": 24, "min_bet": 100, "max_bet": 1000}
-        invite_data = {}
+        mines_config = {"min_mines": 1, "max_mines": 24, "min_bet": 100, "max_bet": 1000, "house_edge": 3, "expire_action": "cashout"}
         user_message_times = {}
         roblox_data = {}
+        roblox_name_index.clear()
+        minigame_state = {}
+        reset_inventory_ledger()
+        economy.reset()
+        doors_config = {"fee": 550, "prizes": [dict(prize) for prize in DEFAULT_DOORS_PRIZES]}
+    
+    for user_id_str in user_message_times:
+        schedule_antispam_expiry(user_id_str)
+
+async def read_guild_file(guild_id, filename, default):
+    """Read one of a guild's JSON files, returns default if it doesn't exist yet"""
+    path = get_guild_file(guild_id, filename)
+    if not os.path.exists(path):
+        return default
+    async with aiofiles.open(path, 'r') as f:
+        return json.loads(await f.read())
+
+def get_guild_file(guild_id, filename):
+    """The home guild keeps the top-level files, other guilds get their own directory"""
+    if guild_id == home_guild_id:
+        return filename
+    return os.path.join(GUILD_DATA_DIR, str(guild_id), filename)
+
+async def load_guild_state(guild_id):
+    """Load a guild's partitioned state and resume its timers"""
+    state = GuildState(guild_id)
+    try:
+        config = await read_guild_file(guild_id, GUILD_CONFIG_FILE, {})
+        state.config.update(config)
+        state.config["priority_roles"] = {int(role_id): bonus for role_id, bonus in state.config["priority_roles"].items()}
+        state.user_data = await read_guild_file(guild_id, USER_DATA_FILE, {})
+        state.shop_data = await read_guild_file(guild_id, SHOP_DATA_FILE, [])
+        state.cooldowns.update(await read_guild_file(guild_id, COOLDOWNS_FILE, {}))
+        state.active_giveaways = await read_guild_file(guild_id, GIVEAWAYS_FILE, {})
+        state.giveaway_daily_totals = await read_guild_file(guild_id, DAILY_GIVEAWAYS_FILE, {})
+        state.active_mines_games = await read_guild_file(guild_id, MINES_GAMES_FILE, {})
+        state.pending_duels = await read_guild_file(guild_id, DUELS_FILE, {})
+        state.invite_data = await read_guild_file(guild_id, INVITE_DATA_FILE, {})
+        state.invite_data.pop('cached_invites', None)
+        state.invite_config.update(await read_guild_file(guild_id, INVITE_CONFIG_FILE, {}))
+        state.minigame_config.update(await read_guild_file(guild_id, MINIGAME_CONFIG_FILE, {}))
+        invited_index_data = await read_guild_file(guild_id, INVITED_INDEX_FILE, None)
+        duel_queue_entries = await read_guild_file(guild_id, DUEL_QUEUE_FILE, [])
+    except Exception as e:
+        print(f"⚠️ Error loading data for guild {guild_id}: {e}")
+        state = GuildState(guild_id)
+        invited_index_data = {}
+        duel_queue_entries = []
+    
+    guild_states[guild_id] = state
+    current_guild_id.set(guild_id)
+    
+    state.invited_index = invited_index_data if invited_index_data is not None else build_invited_index()
+    for entry in duel_queue_entries:
+        add_to_duel_queue(entry)
+    build_shop_index()
+    build_minigame_channels()
+    resume_mines_games()
+    resume_duels()
+    resume_giveaways()
+    
+    if guild_id == home_guild_id and economy.needs_opening:
+        # First run with the ledger: book existing balances so the supply adds up
+        economy.needs_opening = False
+        opening = {user_id: data['balance'] for user_id, data in state.user_data.items() if data.get('balance')}
+        if opening:
+            economy.post(opening, "opening")
+        print(f"ℹ️ Opened the balance ledger with {len(opening)} existing balances")
+    
+    print(f"✅ Loaded guild {guild_id}: {len(state.user_data)} users, {len(state.shop_data)} shop items")
+    return state
+
+async def enter_guild(guild_id):
+    """Load a guild's state if needed and route this event's state access to it"""
+    state = guild_states.get(guild_id)
+    if state is None:
+        if not owns_guild(guild_id):
+            # Another worker owns this guild's balances, writing them here would fork them
+            raise RuntimeError(f"Guild {guild_id} is handled by another worker")
+        async with guild_load_locks.setdefault(guild_id, asyncio.Lock()):
+            state = guild_states.get(guild_id)
+            if state is None:
+                state = await load_guild_state(guild_id)
+        guild_load_locks.pop(guild_id, None)
+    state.last_used = time.time()
+    current_guild_id.set(guild_id)
+    return state
+
+def serialize_guild_state(state):
+    """Get the contents of a guild's files as (path, json) pairs"""
+    files = {
+        GUILD_CONFIG_FILE: state.config,
+        USER_DATA_FILE: state.user_data,
+        SHOP_DATA_FILE: state.shop_data,
+        COOLDOWNS_FILE: state.cooldowns,
+        GIVEAWAYS_FILE: state.active_giveaways,
+        DAILY_GIVEAWAYS_FILE: state.giveaway_daily_totals,
+        MINES_GAMES_FILE: state.active_mines_games,
+        DUELS_FILE: state.pending_duels,
+        INVITE_DATA_FILE: state.invite_data,
+        INVITED_INDEX_FILE: state.invited_index,
+        INVITE_CONFIG_FILE: state.invite_config,
+        MINIGAME_CONFIG_FILE: state.minigame_config,
+        # Open duel queue, in queue order
+        DUEL_QUEUE_FILE: [entry for queue in state.duel_queues.values() for entry in queue.values()]
+    }
+    return [(get_guild_file(state.guild_id, filename), json.dumps(data, indent=2)) for filename, data in files.items()]
+
+async def write_guild_files(guild_id, files):
+    """Write the files serialize_guild_state produced"""
+    if guild_id != home_guild_id:
+        os.makedirs(os.path.join(GUILD_DATA_DIR, str(guild_id)), exist_ok=True)
+    for path, contents in files:
+        async with aiofiles.open(path, 'w') as f:
+            await f.write(contents)
+
+def unload_idle_guilds():
+    """Drop guilds that have been idle for a while and have nothing running"""
+    cutoff = time.time() - GUILD_IDLE_TIMEOUT
+    idle = [guild_id for guild_id, state in guild_states.items()
+            if guild_id != home_guild_id and state.last_used < cutoff and not state.has_timers()]
+    for guild_id in idle:
+        del guild_states[guild_id]
+    if idle:
+        build_minigame_channels()
+        print(f"💤 Unloaded {len(idle)} idle guilds ({len(guild_states)} still loaded)")
+
+def resolve_home_guild():
+    """Find the guild that owns the top-level data files"""
+    global home_guild_id
+    if HOME_GUILD_ID:
+        home_guild_id = HOME_GUILD_ID
+    elif bot.get_channel(LOG_CHANNEL_ID):
+        home_guild_id = bot.get_channel(LOG_CHANNEL_ID).guild.id
+    elif len(bot.guilds) == 1:
+        home_guild_id = bot.guilds[0].id
+    print(f"🏠 Home guild: {home_guild_id}")
 
 def parse_amount(amount_str):
     """Parse amount strings with k, m, b suffixes"""
@@ -494,71 +729,274 @@ def parse_amount(amount_str):
             return None
 
 async def save_data():
-    """Save all data to files"""
-    try:
-        # Save user data
-        async with aiofiles.open(USER_DATA_FILE, 'w') as f:
-            await f.write(json.dumps(user_data, indent=2))
-        
-        # Save shop data
-        async with aiofiles.open(SHOP_DATA_FILE, 'w') as f:
-            await f.write(json.dumps(shop_data, indent=2))
+    """Save the shared data plus the current guild's data (every loaded guild outside of a guild event)"""
+    async with save_lock:
+        guild_id = current_guild_id.get()
+        states = [guild_states[guild_id]] if guild_id in guild_states else list(guild_states.values())
+        # The ledgers flushed below hold other guilds' changes too, their files go out with them
+        # so a crash can't leave the ledgers counting tokens the saved balances don't have
+        ledger_guild_ids = {entry.get("guild_id") for entry in balance_ledger_unsaved + ledger_unsaved}
+        states += [state for other_id, state in guild_states.items() if other_id in ledger_guild_ids and state not in states]
+        
+        # Snapshot the guild files and the ledgers without yielding so they show the same moment
+        guild_files = [(state.guild_id, serialize_guild_state(state)) for state in states]
+        balance_entries = balance_ledger_unsaved[:]
+        del balance_ledger_unsaved[:]
+        inventory_entries = ledger_unsaved[:]
+        del ledger_unsaved[:]
+        economy_stats = json.dumps(economy.to_dict(), indent=2)
         
-        # Save cooldowns
-        async with aiofiles.open(COOLDOWNS_FILE, 'w') as f:
-            await f.write(json.dumps(cooldowns, indent=2))
-            
-        # Save active giveaways
-        async with aiofiles.open(GIVEAWAYS_FILE, 'w') as f:
-            await f.write(json.dumps(active_giveaways, indent=2))
-            
-        # Save daily giveaway totals
-        async with aiofiles.open(DAILY_GIVEAWAYS_FILE, 'w') as f:
-            await f.write(json.dumps(giveaway_daily_totals, indent=2))
-            
-        # Save coinflip configuration
-        async with aiofiles.open(COINFLIP_CONFIG_FILE, 'w') as f:
-            await f.write(json.dumps(coinflip_config, indent=2))
-            
-        # Save mines configuration
-        async with aiofiles.open(MINES_CONFIG_FILE, 'w') as f:
-            await f.write(json.dumps(mines_config, indent=2))
-            
-        # Save invite data
-        async with aiofiles.open(INVITE_DATA_FILE, 'w') as f:
-            await f.write(json.dumps(invite_data, indent=2))
-            
-        # Save anti-spam data
-        async with aiofiles.open(ANTISPAM_DATA_FILE, 'w') as f:
-            await f.write(json.dumps(user_message_times, indent=2))
+        try:
+            for state_guild_id, files in guild_files:
+                await write_guild_files(state_guild_id, files)
             
-        # Save Roblox data
-        async with aiofiles.open(ROBLOX_DATA_FILE, 'w') as f:
-            await f.write(json.dumps(roblox_data, indent=2))
+            if SHARD_COUNT:
+                os.makedirs(os.path.join(WORKER_DATA_DIR, str(WORKER_ID)), exist_ok=True)
+                
+            # Remember which guilds have running timers so they are loaded again on startup
+            async with aiofiles.open(get_worker_file(ACTIVE_GUILDS_FILE), 'w') as f:
+                await f.write(json.dumps([guild_id for guild_id, state in guild_states.items() if state.has_timers()], indent=2))
+                
+            # Save anti-spam data
+            async with aiofiles.open(get_worker_file(ANTISPAM_DATA_FILE), 'w') as f:
+                await f.write(json.dumps(user_message_times, indent=2))
+                
+            # Save minigame question cursors
+            async with aiofiles.open(get_worker_file(MINIGAME_STATE_FILE), 'w') as f:
+                await f.write(json.dumps(minigame_state, indent=2))
+                
+            if shared_store:
+                # Ledgers, configs and Roblox links go through the store shared with the other workers
+                entries = (balance_entries, inventory_entries)
+                balance_entries, inventory_entries = [], []
+                await sync_shared_store(*entries)
+                print("💾 Data saved successfully")
+                return True
+                
+            # Save coinflip configuration
+            async with aiofiles.open(COINFLIP_CONFIG_FILE, 'w') as f:
+                await f.write(json.dumps(coinflip_config, indent=2))
+                
+            # Save mines configuration
+            async with aiofiles.open(MINES_CONFIG_FILE, 'w') as f:
+                await f.write(json.dumps(mines_config, indent=2))
+                
+            # Save doors configuration
+            async with aiofiles.open(DOORS_CONFIG_FILE, 'w') as f:
+                await f.write(json.dumps(doors_config, indent=2))
+                
+            # Save Roblox data
+            async with aiofiles.open(ROBLOX_DATA_FILE, 'w') as f:
+                await f.write(json.dumps(roblox_data, indent=2))
+                
+            # Append new ledger entries (the ledger files are never rewritten)
+            if inventory_entries:
+                async with aiofiles.open(INVENTORY_LEDGER_FILE, 'a') as f:
+                    await f.write("".join(json.dumps(entry) + "\n" for entry in inventory_entries))
+                inventory_entries = []
+            if balance_entries:
+                async with aiofiles.open(BALANCE_LEDGER_FILE, 'a') as f:
+                    await f.write("".join(json.dumps(entry) + "\n" for entry in balance_entries))
+                balance_entries = []
             
-        print("💾 Data saved successfully")
-        return True
-    except Exception as e:
-        print(f"⚠️ Error saving data: {e}")
+            # The stats match the snapshot, so they are only written once its entries are in the ledger
+            async with aiofiles.open(ECONOMY_STATS_FILE, 'w') as f:
+                await f.write(economy_stats)
+                
+            print("💾 Data saved successfully")
+            return True
+        except Exception as e:
+            # Put unwritten entries back in front of anything recorded since, the next save retries them
+            balance_ledger_unsaved[:0] = balance_entries
+            ledger_unsaved[:0] = inventory_entries
+            print(f"⚠️ Error saving data: {e}")
+            return False
+
+# Background job supervisor
+JOB_BACKOFF_BASE = 1
+JOB_BACKOFF_MAX = 300
+
+class BackgroundJob:
+    """A supervised background job and the status shown by /jobs"""
+    def __init__(self, name, job, interval, at):
+        self.name = name
+        self.job = job
+        self.interval = interval
+        self.at = at
+        self.task = None
+        self.status = "starting"
+        self.started_at = None
+        self.next_run = None
+        self.last_run = None
+        self.last_duration = None
+        self.restarts = 0
+        self.failures = 0
+        self.last_error = None
+    
+    @property
+    def periodic(self):
+        return self.interval is not None or self.at is not None
+    
+    def get_next_run(self):
+        """Unix time of the job's next regular run"""
+        return self.at() if self.at else time.time() + self.interval
+
+class Supervisor:
+    """Keeps one instance of each background job running, restarting crashed jobs with backoff"""
+    def __init__(self):
+        self.jobs = {}
+    
+    def start(self, name, job, interval=None, at=None):
+        """Run job() every `interval` seconds or at the unix times at() returns, as a recurring
+        deadline; with neither it runs once as a long-running service task"""
+        entry = self.jobs.get(name)
+        if entry and (entry.periodic or not entry.task.done()):
+            return entry
+        entry = BackgroundJob(name, job, interval, at)
+        if entry.periodic:
+            entry.status = "scheduled"
+            self.schedule(entry, entry.get_next_run())
+        else:
+            entry.task = asyncio.create_task(self.run(entry), name=f"job:{name}")
+        self.jobs[name] = entry
+        return entry
+    
+    def schedule(self, entry, when):
+        """Queue a periodic job's next run on the deadline scheduler"""
+        entry.next_run = when
+        schedule_deadline(f"job:{entry.name}", when, self.run_periodic, entry, shared=True)
+    
+    def backoff(self, entry, e):
+        """Record a crash and return how long to wait before trying again"""
+        # A job that ran fine for a while starts its backoff over
+        if time.time() - entry.started_at > JOB_BACKOFF_MAX:
+            entry.failures = 0
+        entry.failures += 1
+        entry.restarts += 1
+        entry.last_error = f"{type(e).__name__}: {e}"
+        entry.status = "restarting"
+        delay = min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * 2 ** (entry.failures - 1))
+        print(f"⚠️ Background job {entry.name} crashed ({entry.last_error}), restarting in {delay}s")
+        return delay
+    
+    async def run_periodic(self, entry):
+        entry.status = "running"
+        entry.started_at = time.time()
+        try:
+            await entry.job()
+        except Exception as e:
+            self.schedule(entry, time.time() + self.backoff(entry, e))
+            return
+        entry.last_run = time.time()
+        entry.last_duration = entry.last_run - entry.started_at
+        entry.failures = 0
+        entry.status = "scheduled"
+        self.schedule(entry, entry.get_next_run())
+    
+    async def run(self, entry):
+        await startup_complete.wait()
+        while True:
+            entry.status = "running"
+            entry.started_at = time.time()
+            try:
+                await entry.job()
+                # Services only return when they're told to stop (the join batcher at shutdown)
+                entry.status = "stopped"
+                return
+            except asyncio.CancelledError:
+                entry.status = "stopped"
+                raise
+            except Exception as e:
+                await asyncio.sleep(self.backoff(entry, e))
+    
+    async def stop(self):
+        """Cancel every service task (taking the deadline runner, and with it the periodic jobs) and wait for them to finish"""
+        tasks = [entry.task for entry in self.jobs.values() if entry.task and not entry.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for entry in self.jobs.values():
+            if entry.periodic:
+                entry.status = "stopped"
+
+supervisor = Supervisor()
+
+# Graceful shutdown
+shutting_down = False
+shutdown_task = None
+inflight_tasks = set()
+
+def accept_event():
+    """Track the current event's task so shutdown can wait for it, returns False once shutting down"""
+    if shutting_down:
         return False
+    task = asyncio.current_task()
+    inflight_tasks.add(task)
+    task.add_done_callback(inflight_tasks.discard)
+    return True
+
+async def accept_interaction(interaction):
+    """accept_event for interactions, asking the user to retry if the bot is shutting down"""
+    if accept_event():
+        return True
+    if interaction.type is not discord.InteractionType.autocomplete:
+        await interaction.response.send_message("🔄 The bot is restarting, try again in a moment!", ephemeral=True)
+    return False
 
-async def force_save_on_exit():
-    """Force save data when bot shuts down"""
-    print("🔄 Bot shutting down, saving data...")
+async def shutdown(reason):
+    """Stop taking events, let in-flight ones finish, save within the deadline and close the bot"""
+    global shutting_down
+    shutting_down = True
+    print(f"🔄 Bot shutting down ({reason}), finishing {len(inflight_tasks)} in-flight events...")
+    
+    # The join batcher rewards what it has queued, then stops at the sentinel
+    join_queue.put_nowait(None)
+    draining = set(inflight_tasks) | deadline_tasks
+    join_batches = supervisor.jobs.get("join_batches")
+    if join_batches and startup_complete.is_set():
+        draining.add(join_batches.task)
+    if draining:
+        _, pending = await asyncio.wait(draining, timeout=SHUTDOWN_DRAIN_TIMEOUT)
+        if pending:
+            # State is settled before awaits, so cancelling only cuts off replies and logs
+            print(f"⚠️ {len(pending)} events still running after {SHUTDOWN_DRAIN_TIMEOUT}s, cancelling them")
+            for task in pending:
+                task.cancel()
+    
+    await supervisor.stop()
+    
     try:
-        if await save_data():
+        if await asyncio.wait_for(save_data(), timeout=SHUTDOWN_SAVE_TIMEOUT):
             print("💾 Data saved on exit")
         else:
             print("❌ Failed to save data on exit")
-    except Exception as e:
-        print(f"⚠️ Error saving on exit: {e}")
+    except asyncio.TimeoutError:
+        print(f"❌ Saving on exit took longer than {SHUTDOWN_SAVE_TIMEOUT}s")
+    if shared_store:
+        await asyncio.to_thread(shared_store.release_shards)
+    await bot.close()
+
+def handle_exit_signal(signame):
+    """Start the shutdown once, repeated signals are ignored while it runs"""
+    global shutdown_task
+    if shutdown_task is None:
+        shutdown_task = asyncio.create_task(shutdown(signame))
+
+def install_signal_handlers():
+    """Route SIGTERM (Railway stopping the service) and SIGINT to shutdown() on the running loop"""
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, handle_exit_signal, signum.name)
 
 async def log_action(action_type, title, description, color=0x0099ff, user=None, fields=None):
-    """Send log message to the log channel"""
+    """Send log message to the guild's log channel"""
     try:
-        log_channel = bot.get_channel(LOG_CHANNEL_ID)
+        log_channel_id = guild_config["log_channel_id"]
+        if not log_channel_id:
+            return
+        log_channel = bot.get_channel(log_channel_id)
         if not log_channel:
-            print(f"⚠️ Log channel {LOG_CHANNEL_ID} not found!")
+            print(f"⚠️ Log channel {log_channel_id} not found!")
             return
         
         embed = discord.Embed(
@@ -586,11 +1024,14 @@ async def log_action(action_type, title, description, color=0x0099ff, user=None,
         print(f"⚠️ Error sending log: {e}")
 
 async def log_purchase(user, item_name, price, quantity=1, item_type="shop"):
-    """Log purchase to purchase log channel"""
+    """Log purchase to the guild's purchase log channel"""
     try:
-        purchase_channel = bot.get_channel(PURCHASE_LOG_CHANNEL_ID)
+        purchase_channel_id = guild_config["purchase_log_channel_id"]
+        if not purchase_channel_id:
+            return
+        purchase_channel = bot.get_channel(purchase_channel_id)
         if not purchase_channel:
-            print(f"⚠️ Purchase log channel {PURCHASE_LOG_CHANNEL_ID} not found!")
+            print(f"⚠️ Purchase log channel {purchase_channel_id} not found!")
             return
         
         embed = discord.Embed(
@@ -618,8 +1059,8 @@ def get_user_balance(user_id):
     """Get user balance"""
     return user_data.get(str(user_id), {}).get('balance', 0)
 
-def update_balance(user_id, amount):
-    """Update user balance"""
+def apply_balance_change(user_id, amount):
+    """Change a user's balance without touching the ledger"""
     user_id = str(user_id)
     if user_id not in user_data:
         user_data[user_id] = {'balance': 0, 'total_earned': 0, 'total_spent': 0}
@@ -632,6 +1073,400 @@ def update_balance(user_id, amount):
     
     return user_data[user_id]['balance']
 
+def update_balance(user_id, amount, source):
+    """Update user balance, booking the opposite side to a source account"""
+    new_balance = apply_balance_change(user_id, amount)
+    if amount:
+        economy.post({str(user_id): amount}, source)
+    return new_balance
+
+# Balance transactions
+class InsufficientFunds(Exception):
+    """Raised when a transaction would leave a user with a negative balance"""
+    def __init__(self, user_id, shortfall):
+        super().__init__(f"User {user_id} is short {shortfall} tokens")
+        self.user_id = str(user_id)
+        self.shortfall = shortfall
+
+class Transaction:
+    """Balance changes that are validated and applied together when the block exits"""
+    def __init__(self, user_ids, source):
+        self.user_ids = user_ids
+        self.source = source
+        self.deltas = {}
+    
+    def balance(self, user_id):
+        """Get a balance including the changes made so far in this transaction"""
+        return get_user_balance(user_id) + self.deltas.get(str(user_id), 0)
+    
+    def credit(self, user_id, amount):
+        """Give tokens to a user"""
+        user_id = str(user_id)
+        if user_id not in self.user_ids:
+            raise ValueError(f"User {user_id} is not locked by this transaction")
+        self.deltas[user_id] = self.deltas.get(user_id, 0) + amount
+    
+    def debit(self, user_id, amount):
+        """Take tokens from a user, failing straight away if they can't afford it"""
+        balance = self.balance(user_id)
+        if balance < amount:
+            raise InsufficientFunds(user_id, amount - balance)
+        self.credit(user_id, -amount)
+    
+    def transfer(self, from_id, to_id, amount):
+        """Move tokens between two users"""
+        self.debit(from_id, amount)
+        self.credit(to_id, amount)
+
+class Economy:
+    """Per-user locks plus the double-entry balance ledger and its running aggregates"""
+    def __init__(self):
+        self.locks = weakref.WeakValueDictionary()
+        self.reset()
+    
+    def reset(self):
+        """Clear the aggregates before loading or replaying the ledger"""
+        self.next_entry_id = 0
+        self.sources = {}
+        self.daily = {}
+        self.needs_opening = False
+    
+    def get_lock(self, user_id):
+        lock = self.locks.get(user_id)
+        if lock is None:
+            lock = asyncio.Lock()
+            self.locks[user_id] = lock
+        return lock
+    
+    @contextlib.asynccontextmanager
+    async def transaction(self, *user_ids, source):
+        """Lock the users in id order, then apply every change in the block at once"""
+        user_ids = sorted({str(user_id) for user_id in user_ids}, key=int)
+        async with contextlib.AsyncExitStack() as stack:
+            for user_id in user_ids:
+                await stack.enter_async_context(self.get_lock(user_id))
+            tx = Transaction(user_ids, source)
+            yield tx
+            self.commit(tx)
+    
+    def commit(self, tx):
+        """Validate and apply a transaction without yielding to the event loop"""
+        deltas = {user_id: delta for user_id, delta in tx.deltas.items() if delta}
+        if not deltas:
+            return None
+        
+        # Balances can still move outside the locks (chat rewards, admin commands)
+        for user_id, delta in deltas.items():
+            balance = get_user_balance(user_id)
+            if delta < 0 and balance + delta < 0:
+                raise InsufficientFunds(user_id, -(balance + delta))
+        
+        for user_id, delta in deltas.items():
+            apply_balance_change(user_id, delta)
+        return self.post(deltas, tx.source)
+    
+    def post(self, deltas, source):
+        """Record user balance changes, the source account takes the opposite side"""
+        if source not in ECONOMY_SOURCES:
+            raise ValueError(f"Unknown economy source: {source}")
+        
+        entry = {
+            # Sharded workers get the id from the shared store when the entry is flushed
+            "id": None if shared_store else self.next_entry_id,
+            "source": source,
+            "guild_id": current_guild_id.get(),
+            "deltas": deltas,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.apply_entry(entry)
+        balance_ledger_unsaved.append(entry)
+        return entry
+    
+    def apply_entry(self, entry):
+        """Fold one ledger entry into the per-source and per-day aggregates"""
+        source = entry.get("source", entry.get("reason"))
+        paid_out = sum(delta for delta in entry["deltas"].values() if delta > 0)
+        paid_in = -sum(delta for delta in entry["deltas"].values() if delta < 0)
+        
+        totals = self.sources.setdefault(source, {"paid_in": 0, "paid_out": 0, "entries": 0})
+        totals["paid_in"] += paid_in
+        totals["paid_out"] += paid_out
+        totals["entries"] += 1
+        
+        day = entry["timestamp"][:10]
+        if day not in self.daily:
+            self.daily[day] = {}
+            for old_day in sorted(self.daily)[:-ECONOMY_DAILY_BUCKETS]:
+                del self.daily[old_day]
+        if day in self.daily:
+            self.daily[day][source] = self.daily[day].get(source, 0) + paid_in - paid_out
+        
+        if entry["id"] is not None:
+            self.next_entry_id = max(self.next_entry_id, entry["id"] + 1)
+    
+    def get_house_net(self, source, days=None):
+        """Tokens a source has taken from users minus what it paid out"""
+        if days is None:
+            totals = self.sources.get(source, {})
+            return totals.get("paid_in", 0) - totals.get("paid_out", 0)
+        
+        since = (datetime.now().date() - timedelta(days=days - 1)).isoformat()
+        return sum(sources.get(source, 0) for day, sources in self.daily.items() if day >= since)
+    
+    def get_supply(self):
+        """Tokens held by users, i.e. everything the source accounts have paid out net"""
+        return -sum(self.get_house_net(source) for source in self.sources)
+    
+    def to_dict(self):
+        return {"next_entry_id": self.next_entry_id, "sources": self.sources, "daily": self.daily}
+    
+    def load_dict(self, data):
+        self.next_entry_id = data["next_entry_id"]
+        self.sources = data["sources"]
+        self.daily = data["daily"]
+
+economy = Economy()
+
+# Shared store (sharded deployments)
+class SharedStore:
+    """SQLite database in WAL mode holding what every worker process shares
+
+    Waiting for another worker's write lock can take seconds, so the bot calls it
+    through asyncio.to_thread. The lock keeps those threads off each other's transactions.
+    """
+    def __init__(self, path, worker_id):
+        self.worker_id = worker_id
+        self.lock = threading.RLock()
+        self.db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER);
+            CREATE TABLE IF NOT EXISTS shard_leases (shard_id INTEGER PRIMARY KEY, worker_id INTEGER, heartbeat REAL);
+            CREATE TABLE IF NOT EXISTS balance_ledger (id INTEGER PRIMARY KEY AUTOINCREMENT, worker_id INTEGER, entry TEXT);
+            CREATE TABLE IF NOT EXISTS economy_sources (source TEXT PRIMARY KEY, paid_in INTEGER, paid_out INTEGER, entries INTEGER);
+            CREATE TABLE IF NOT EXISTS economy_daily (day TEXT, source TEXT, net INTEGER, PRIMARY KEY (day, source));
+            CREATE TABLE IF NOT EXISTS inventory_ledger (seq INTEGER PRIMARY KEY AUTOINCREMENT, id INTEGER UNIQUE, entry TEXT);
+            CREATE TABLE IF NOT EXISTS documents (namespace TEXT, key TEXT, value TEXT, version INTEGER, PRIMARY KEY (namespace, key));
+        """)
+    
+    @contextlib.contextmanager
+    def transaction(self):
+        """Hold the write lock for a block, other workers wait up to 5 seconds for it"""
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                yield self.db
+            except BaseException:
+                self.db.execute("ROLLBACK")
+                raise
+            self.db.execute("COMMIT")
+    
+    def get_meta(self, key):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+    
+    def set_meta(self, key, value):
+        self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, value))
+    
+    def claim_shards(self, shard_ids):
+        """Lease shards to this worker, fails if a live worker still holds one of them"""
+        now = time.time()
+        with self.transaction() as db:
+            for shard_id in shard_ids:
+                row = db.execute("SELECT worker_id, heartbeat FROM shard_leases WHERE shard_id = ?", (shard_id,)).fetchone()
+                if row and row[0] != self.worker_id and row[1] > now - SHARD_LEASE_TIMEOUT:
+                    raise RuntimeError(f"Shard {shard_id} is leased by worker {row[0]}")
+                db.execute("INSERT OR REPLACE INTO shard_leases VALUES (?, ?, ?)", (shard_id, self.worker_id, now))
+    
+    def renew_shards(self):
+        """Keep this worker's leases alive, fails if another worker took one over"""
+        with self.transaction() as db:
+            renewed = db.execute("UPDATE shard_leases SET heartbeat = ? WHERE worker_id = ?", (time.time(), self.worker_id)).rowcount
+            if renewed < len(SHARD_IDS or range(SHARD_COUNT)):
+                raise RuntimeError(f"Worker {self.worker_id} lost the lease for one of its shards")
+    
+    def release_shards(self):
+        with self.transaction() as db:
+            db.execute("DELETE FROM shard_leases WHERE worker_id = ?", (self.worker_id,))
+    
+    def insert_balance_entry(self, entry):
+        """Store a balance ledger entry under the next row id and fold it into the shared aggregates"""
+        source = entry.get("source", entry.get("reason"))
+        paid_out = sum(delta for delta in entry["deltas"].values() if delta > 0)
+        paid_in = -sum(delta for delta in entry["deltas"].values() if delta < 0)
+        # The row id is the entry id, so ids stay unique across workers
+        entry["id"] = self.db.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM balance_ledger").fetchone()[0]
+        self.db.execute("INSERT INTO balance_ledger VALUES (?, ?, ?)", (entry["id"], self.worker_id, json.dumps(entry)))
+        self.db.execute(
+            "INSERT INTO economy_sources VALUES (?, ?, ?, 1) ON CONFLICT (source) DO UPDATE SET "
+            "paid_in = paid_in + excluded.paid_in, paid_out = paid_out + excluded.paid_out, entries = entries + 1",
+            (source, paid_in, paid_out))
+        self.db.execute(
+            "INSERT INTO economy_daily VALUES (?, ?, ?) ON CONFLICT (day, source) DO UPDATE SET net = net + excluded.net",
+            (entry["timestamp"][:10], source, paid_in - paid_out))
+    
+    def read_economy(self):
+        """Get the shared aggregates in the format Economy.load_dict expects"""
+        with self.lock:
+            sources = {source: {"paid_in": paid_in, "paid_out": paid_out, "entries": entries}
+                       for source, paid_in, paid_out, entries in self.db.execute("SELECT * FROM economy_sources")}
+            daily = {}
+            days = self.db.execute("SELECT DISTINCT day FROM economy_daily ORDER BY day DESC LIMIT ?", (ECONOMY_DAILY_BUCKETS,)).fetchall()
+            if days:
+                for day, source, net in self.db.execute("SELECT * FROM economy_daily WHERE day >= ?", (days[-1][0],)):
+                    daily.setdefault(day, {})[source] = net
+            next_entry_id = self.db.execute("SELECT COALESCE(MAX(id), 0) FROM balance_ledger").fetchone()[0]
+        return {"next_entry_id": next_entry_id, "sources": sources, "daily": daily}
+    
+    def append_balance_entries(self, entries):
+        """Add this worker's new ledger entries, returns the aggregates of every worker"""
+        with self.transaction():
+            for entry in entries:
+                self.insert_balance_entry(entry)
+            return self.read_economy()
+    
+    def open_balance_ledger(self, entries):
+        """Seed a new shared ledger with the single-process one, returns True if opening balances are needed"""
+        with self.transaction():
+            if self.get_meta("balance_ledger_opened"):
+                return False
+            self.set_meta("balance_ledger_opened", 1)
+            for entry in entries:
+                self.insert_balance_entry(entry)
+            return not entries
+    
+    def open_inventory_ledger(self, entries):
+        """Seed a new shared inventory ledger with the single-process ledger file"""
+        with self.transaction() as db:
+            if self.get_meta("inventory_ledger_opened"):
+                return
+            self.set_meta("inventory_ledger_opened", 1)
+            self.set_meta("inventory_next_id", max((entry["id"] + 1 for entry in entries), default=0))
+            db.executemany("INSERT INTO inventory_ledger (id, entry) VALUES (?, ?)",
+                           [(entry["id"], json.dumps(entry)) for entry in sorted(entries, key=lambda e: e["id"])])
+    
+    def claim_inventory_ids(self, count):
+        """Hand this worker a block of inventory ids no other worker will use"""
+        with self.transaction():
+            start = self.get_meta("inventory_next_id")
+            self.set_meta("inventory_next_id", start + count)
+        return range(start, start + count)
+    
+    def append_inventory_entries(self, entries):
+        with self.transaction() as db:
+            db.executemany("INSERT INTO inventory_ledger (id, entry) VALUES (?, ?)", [(entry["id"], json.dumps(entry)) for entry in entries])
+    
+    def read_inventory_entries(self, after_seq=0):
+        """Get (seq, entry) pairs in the order the workers stored them, ids from claimed blocks aren't ordered"""
+        with self.lock:
+            rows = self.db.execute("SELECT seq, entry FROM inventory_ledger WHERE seq > ? ORDER BY seq", (after_seq,)).fetchall()
+        return [(seq, json.loads(entry)) for seq, entry in rows]
+    
+    def open_documents(self, namespace, local):
+        """Get a namespace's documents and version, seeding it with the local copy the first time"""
+        with self.transaction():
+            if not self.get_meta(f"{namespace}_opened"):
+                self.set_meta(f"{namespace}_opened", 1)
+                self.write_documents(namespace, local)
+            rows = self.db.execute("SELECT key, value FROM documents WHERE namespace = ? AND value IS NOT NULL", (namespace,)).fetchall()
+            return {key: json.loads(value) for key, value in rows}, self.get_meta("document_version")
+    
+    def write_documents(self, namespace, changes):
+        """Write changed keys under a new version, None values are kept as deletions"""
+        version = self.get_meta("document_version") + 1
+        self.set_meta("document_version", version)
+        self.db.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)", [
+            (namespace, key, None if value is None else json.dumps(value), version) for key, value in changes.items()])
+    
+    def sync_documents(self, namespace, changes, after_version):
+        """Write this worker's changes, returns every change since after_version and the new version"""
+        with self.transaction() as db:
+            if changes:
+                self.write_documents(namespace, changes)
+            rows = db.execute("SELECT key, value FROM documents WHERE namespace = ? AND version > ?", (namespace, after_version)).fetchall()
+            return {key: None if value is None else json.loads(value) for key, value in rows}, self.get_meta("document_version")
+
+def open_shared_store():
+    """Open the store shared with the other workers and lease this worker's shards"""
+    global shared_store
+    store = SharedStore(SHARED_STORE_FILE, WORKER_ID)
+    store.claim_shards(SHARD_IDS or range(SHARD_COUNT))
+    shared_store = store
+    print(f"🧩 Worker {WORKER_ID} leased shards {SHARD_IDS or 'all'} of {SHARD_COUNT}")
+
+async def open_shared_documents(namespace, local):
+    """Replace a shared mapping with the store's copy and start tracking edits to it"""
+    documents, shared_versions[namespace] = await asyncio.to_thread(shared_store.open_documents, namespace, local)
+    local.clear()
+    local.update(documents)
+    shared_snapshots[namespace] = json.loads(json.dumps(local))
+
+async def sync_shared_documents(namespace, local):
+    """Push local edits to a shared mapping and pull the other workers' edits, returns True if it changed"""
+    snapshot = shared_snapshots[namespace]
+    changes = {key: value for key, value in local.items() if snapshot.get(key) != value}
+    changes.update({key: None for key in snapshot if key not in local})
+    pushed = json.loads(json.dumps(local))
+    remote, shared_versions[namespace] = await asyncio.to_thread(shared_store.sync_documents, namespace, changes, shared_versions[namespace])
+    
+    changed = False
+    for key, value in remote.items():
+        if value is None:
+            pushed.pop(key, None)
+            if key in local:
+                del local[key]
+                changed = True
+        else:
+            pushed[key] = value
+            if local.get(key) != value:
+                local[key] = value
+                changed = True
+    # Edits made while the store call ran aren't in the snapshot, so the next sync pushes them
+    shared_snapshots[namespace] = pushed
+    return changed
+
+async def sync_shared_store(balance_entries, inventory_entries):
+    """Exchange ledgers, configs and Roblox links with the other workers, given the entries to flush"""
+    global coinflip_config, mines_config, doors_config, inventory_tail
+    try:
+        await asyncio.to_thread(shared_store.renew_shards)
+        await asyncio.to_thread(shared_store.append_inventory_entries, inventory_entries)
+    except Exception:
+        ledger_unsaved[:0] = inventory_entries
+        balance_ledger_unsaved[:0] = balance_entries
+        raise
+    try:
+        economy_data = await asyncio.to_thread(shared_store.append_balance_entries, balance_entries)
+    except Exception:
+        balance_ledger_unsaved[:0] = balance_entries
+        raise
+    economy.load_dict(economy_data)
+    # The shared totals don't have what was posted since save_data took its snapshot
+    for entry in balance_ledger_unsaved:
+        economy.apply_entry(entry)
+    
+    for seq, entry in await asyncio.to_thread(shared_store.read_inventory_entries, inventory_tail):
+        if entry["id"] not in inventory_ledger:
+            apply_ledger_entry(entry)
+        inventory_tail = seq
+    if len(inventory_ids) < INVENTORY_ID_LOW_WATER:
+        inventory_ids.extend(await asyncio.to_thread(shared_store.claim_inventory_ids, INVENTORY_ID_BLOCK))
+    
+    if await sync_shared_documents("roblox", roblox_data):
+        build_roblox_index()
+    configs = {"coinflip": coinflip_config, "mines": mines_config, "doors": doors_config}
+    if await sync_shared_documents("config", configs):
+        coinflip_config, mines_config, doors_config = configs["coinflip"], configs["mines"], configs["doors"]
+        build_mines_payout_table()
+        build_doors_prize_table()
+
+def get_worker_file(filename):
+    """Files only one process may write get a directory per worker when sharded"""
+    if not SHARD_COUNT:
+        return filename
+    return os.path.join(WORKER_DATA_DIR, str(WORKER_ID), filename)
+
 def get_rank(balance):
     """Get user rank"""
     if balance >= 100000: return "🏆 Legendary"
@@ -642,6 +1477,240 @@ def get_rank(balance):
     elif balance >= 1000: return "🟢 Silver"
     else: return "🔵 Starter"
 
+def build_mines_payout_table():
+    """Precompute mines multipliers for every (mines_count, revealed) pair"""
+    global mines_payout_table
+    house_edge = mines_config.get("house_edge", 3) / 100
+    stride = MINES_GRID_SIZE + 1
+    table = [0.0] * (stride * stride)
+
+    for mines_count in range(stride):
+        safe_tiles = MINES_GRID_SIZE - mines_count
+        survival = 1.0
+        table[mines_count * stride] = 1.0
+
+        # Exact hypergeometric chance of revealing `revealed` gems in a row
+        for revealed in range(1, safe_tiles + 1):
+            survival *= (safe_tiles - revealed + 1) / (MINES_GRID_SIZE - revealed + 1)
+            multiplier = (1 - house_edge) / survival
+            table[mines_count * stride + revealed] = math.floor(multiplier * 100) / 100
+
+    mines_payout_table = table
+
+def get_mines_multiplier(mines_count, revealed):
+    """Get mines multiplier from the precomputed payout table"""
+    return mines_payout_table[mines_count * (MINES_GRID_SIZE + 1) + revealed]
+
+def validate_doors_config(config):
+    """Check a doors config, returns an error message or None"""
+    try:
+        fee = config["fee"]
+        prizes = config["prizes"]
+        if not isinstance(fee, int) or fee <= 0:
+            return "fee must be a positive whole number"
+        if not prizes:
+            return "at least one prize is required"
+        
+        for prize in prizes:
+            if not str(prize["name"]).strip():
+                return "every prize needs a name"
+            if prize["chance"] <= 0:
+                return f"{prize['name']} must have a chance above 0%"
+            if not isinstance(prize["tokens"], int) or prize["tokens"] < 0:
+                return f"{prize['name']} token prize must be a whole number of at least 0"
+        
+        total_chance = sum(prize["chance"] for prize in prizes)
+        if abs(total_chance - 100) > 1e-6:
+            return f"prize chances add up to {total_chance:g}%, not 100%"
+        
+        expected_tokens = sum(prize["chance"] * prize["tokens"] for prize in prizes) / 100
+        if expected_tokens >= fee:
+            return f"expected token prize {expected_tokens:,.1f} is not below the {fee:,} fee"
+    except (KeyError, TypeError):
+        return "prizes need a name, chance and tokens"
+    
+    return None
+
+def build_doors_prize_table():
+    """Compile the doors prize chances into a cumulative array for bisect lookups"""
+    global doors_cumulative
+    cumulative = []
+    total = 0.0
+    for prize in doors_config["prizes"]:
+        total += prize["chance"]
+        cumulative.append(total)
+    doors_cumulative = cumulative
+
+def roll_door_prize():
+    """Roll one door, returns the prize entry from doors_config"""
+    roll = random.random() * doors_cumulative[-1]
+    index = bisect.bisect_left(doors_cumulative, roll)
+    return doors_config["prizes"][min(index, len(doors_cumulative) - 1)]
+
+def get_doors_expected_tokens():
+    """Get the expected token prize per door"""
+    return sum(prize["chance"] * prize["tokens"] for prize in doors_config["prizes"]) / 100
+
+def get_trigrams(text):
+    """Get the padded trigrams of a name for fuzzy matching"""
+    padded = f" {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def build_shop_index():
+    """Rebuild the shop lookup indexes after the catalog changes"""
+    shop_name_index.clear()
+    shop_trigram_index.clear()
+    
+    for i, item in enumerate(shop_data):
+        name = item['name'].lower()
+        shop_name_index[name] = i
+        for trigram in get_trigrams(name):
+            shop_trigram_index.setdefault(trigram, set()).add(i)
+    
+    shop_sorted_names[:] = sorted((item['name'].lower(), i) for i, item in enumerate(shop_data))
+
+def find_shop_item(name):
+    """Find a shop item by exact (case-insensitive) name"""
+    index = shop_name_index.get(name.strip().lower())
+    return shop_data[index] if index is not None else None
+
+def search_shop_items(query, limit=3):
+    """Find shop items by name prefix first, then by shared trigrams"""
+    query = query.strip().lower()
+    matches = []
+    
+    position = bisect.bisect_left(shop_sorted_names, (query,))
+    while position < len(shop_sorted_names) and len(matches) < limit:
+        name, index = shop_sorted_names[position]
+        if not name.startswith(query):
+            break
+        matches.append(index)
+        position += 1
+    
+    if len(matches) < limit and query:
+        scores = {}
+        for trigram in get_trigrams(query):
+            for index in shop_trigram_index.get(trigram, ()):
+                scores[index] = scores.get(index, 0) + 1
+        for index in heapq.nlargest(limit + len(matches), scores, key=scores.get):
+            if index not in matches:
+                matches.append(index)
+            if len(matches) >= limit:
+                break
+    
+    return [shop_data[index] for index in matches]
+
+def is_in_shop(item):
+    """Check that an item dict is still part of the catalog"""
+    index = shop_name_index.get(item['name'].lower())
+    return index is not None and shop_data[index] is item
+
+def get_reserved_quantity(item, user_id=None):
+    """Get the quantity of an item held by pending reservations (or by one user's)"""
+    if user_id is None:
+        return shop_reserved.get(id(item), 0)
+    reservation = shop_reservations.get(str(user_id))
+    return reservation["quantity"] if reservation and reservation["item"] is item else 0
+
+def get_available_stock(item):
+    """Get the unreserved stock of an item (None if unlimited)"""
+    if item.get('stock') is None:
+        return None
+    return item['stock'] - get_reserved_quantity(item)
+
+def get_remaining_purchase_limit(item, user_id):
+    """Get how many more of an item a user may buy (None if uncapped)"""
+    if item.get('per_user_limit') is None:
+        return None
+    purchased = item.get('purchases', {}).get(str(user_id), 0)
+    return item['per_user_limit'] - purchased - get_reserved_quantity(item, user_id)
+
+def format_stock(item):
+    """Format the stock line shown in the shop"""
+    available = get_available_stock(item)
+    if available is None:
+        return ""
+    return "sold out" if available <= 0 else f"{available:,} left"
+
+def reserve_shop_item(user_id, item, quantity=1):
+    """Reserve stock for a purchase, returns an error message or None"""
+    release_shop_reservation(user_id)
+    
+    if not is_in_shop(item):
+        return "❌ This item is no longer available!"
+    
+    available = get_available_stock(item)
+    if available is not None and available < quantity:
+        return "❌ This item is sold out!" if available <= 0 else f"❌ Only **{available:,}** left in stock!"
+    
+    remaining = get_remaining_purchase_limit(item, user_id)
+    if remaining is not None and remaining < quantity:
+        return f"❌ Purchase limit reached! You can buy **{max(remaining, 0):,}** more of this item."
+    
+    balance = get_user_balance(user_id)
+    if balance < item['price'] * quantity:
+        return f"❌ Insufficient funds! You need **{item['price'] * quantity - balance:,}** more tokens."
+    
+    shop_reservations[str(user_id)] = {"item": item, "quantity": quantity}
+    # Keyed by the item dict, which the reservation keeps alive until it is released
+    shop_reserved[id(item)] = shop_reserved.get(id(item), 0) + quantity
+    schedule_deadline(f"shopres:{user_id}", time.time() + SHOP_RESERVATION_TIMEOUT, expire_shop_reservation, str(user_id))
+    return None
+
+def release_shop_reservation(user_id):
+    """Return a user's reserved stock to the shop"""
+    cancel_deadline(f"shopres:{user_id}")
+    reservation = shop_reservations.pop(str(user_id), None)
+    if reservation:
+        key = id(reservation["item"])
+        shop_reserved[key] -= reservation["quantity"]
+        if not shop_reserved[key]:
+            del shop_reserved[key]
+    return reservation
+
+async def expire_shop_reservation(user_id):
+    """Release a reservation that was never confirmed"""
+    release_shop_reservation(user_id)
+
+def commit_shop_reservation(tx, user_id, reservation=None):
+    """Charge a user for their reservation inside a transaction, returns (item, quantity, error)
+    Given a reservation, it is only committed while it is still the user's current one"""
+    current = shop_reservations.get(str(user_id))
+    if not current or (reservation is not None and current is not reservation):
+        return None, 0, "❌ Your reservation expired! Please try again."
+    reservation = release_shop_reservation(user_id)
+    
+    item = reservation["item"]
+    quantity = reservation["quantity"]
+    if not is_in_shop(item):
+        return item, quantity, "❌ This item is no longer available!"
+    if not inventory_ids_ready():
+        return item, quantity, "❌ The shop is busy, please try again in a moment!"
+    
+    total_cost = item['price'] * quantity
+    try:
+        tx.debit(user_id, total_cost)
+    except InsufficientFunds as e:
+        return item, quantity, f"❌ Insufficient funds! You need **{e.shortfall:,}** more tokens."
+    
+    # Record the grant first, if it fails the stock and purchase counts are untouched
+    record_inventory_grant(user_id, item['name'], quantity, item['price'], "shop")
+    if item.get('stock') is not None:
+        item['stock'] -= quantity
+    if item.get('per_user_limit') is not None:
+        purchases = item.setdefault('purchases', {})
+        purchases[str(user_id)] = purchases.get(str(user_id), 0) + quantity
+    
+    return item, quantity, None
+
+async def purchase_shop_item(user_id, item, quantity=1):
+    """Reserve and commit a purchase in one step, returns (new_balance, error)"""
+    async with economy.transaction(user_id, source="shop") as tx:
+        error = reserve_shop_item(user_id, item, quantity)
+        if not error:
+            _, _, error = commit_shop_reservation(tx, user_id)
+    return get_user_balance(user_id), error
+
 def can_use_command(user_id, command_type, hours):
     """Check if user can use command with persistent cooldowns"""
     user_id = str(user_id)
@@ -688,8 +1757,11 @@ def format_time(next_use):
         return "soon"
 
 def is_admin(user):
-    """Check if user is admin"""
-    return any(role.id == ADMIN_ROLE_ID for role in user.roles)
+    """Check if user has one of the guild's admin roles (server admins until roles are set)"""
+    admin_role_ids = guild_config["admin_role_ids"]
+    if not admin_role_ids:
+        return getattr(getattr(user, "guild_permissions", None), "administrator", False)
+    return any(role.id in admin_role_ids for role in getattr(user, "roles", ()))
 
 def check_spam(user_id):
     """Check if user is spamming and deduct tokens if they are"""
@@ -698,6 +1770,7 @@ def check_spam(user_id):
     
     if user_id_str not in user_message_times:
         user_message_times[user_id_str] = []
+        schedule_antispam_expiry(user_id_str)
     
     # Remove timestamps older than 10 seconds
     user_message_times[user_id_str] = [t for t in user_message_times[user_id_str] if current_time - t < 10]
@@ -710,7 +1783,7 @@ def check_spam(user_id):
         # Deduct 50 tokens for spamming
         balance_before = get_user_balance(user_id)
         if balance_before >= 50:
-            new_balance = update_balance(user_id, -50)
+            new_balance = update_balance(user_id, -50, "chat")
             asyncio.create_task(save_data())
             
             # Clear the message times to prevent multiple deductions
@@ -724,188 +1797,963 @@ def has_linked_roblox(user_id):
     """Check if user has linked their Roblox account"""
     return str(user_id) in roblox_data
 
-# Auto-save task
-async def auto_save():
-    """Auto save every 30 seconds"""
-    while True:
-        await asyncio.sleep(30)
-        await save_data()
+# Roblox usernames
+def normalize_roblox_name(username):
+    """Normalize a Roblox username for lookups (usernames are case-insensitive)"""
+    return username.strip().lower()
 
-# Clean up expired duels
-async def cleanup_expired_duels():
-    """Clean up expired duel challenges"""
-    while True:
-        await asyncio.sleep(300)
-        current_time = datetime.now()
-        expired_duels = []
-        
-        for duel_key, duel_data in pending_duels.items():
-            try:
-                created_at = duel_data['created_at']
-                if (current_time - created_at).total_seconds() > 300:
-                    expired_duels.append(duel_key)
-            except:
-                expired_duels.append(duel_key)
-        
-        for expired_key in expired_duels:
-            del pending_duels[expired_key]
+def build_roblox_index():
+    """Rebuild the username -> user index from roblox_data"""
+    roblox_name_index.clear()
+    duplicates = 0
+    for user_id, username in roblox_data.items():
+        key = normalize_roblox_name(username)
+        if key in roblox_name_index:
+            duplicates += 1
+            continue
+        roblox_name_index[key] = user_id
+    if duplicates:
+        print(f"⚠️ {duplicates} Roblox usernames are linked to more than one user")
 
-# Clean up expired giveaways
-async def cleanup_expired_giveaways():
-    """Clean up expired giveaways"""
-    while True:
-        await asyncio.sleep(60)
-        current_time = datetime.now()
-        expired_giveaways = []
-        
-        for giveaway_id, giveaway_data in active_giveaways.items():
-            try:
-                end_time = datetime.fromisoformat(giveaway_data['end_time'])
-                if current_time >= end_time:
-                    expired_giveaways.append(giveaway_id)
-            except:
-                expired_giveaways.append(giveaway_id)
-        
-        for expired_id in expired_giveaways:
-            del active_giveaways[expired_id]
-            await save_data()
+def get_roblox_owner(username):
+    """Get the Discord user id linked to a Roblox username"""
+    return roblox_name_index.get(normalize_roblox_name(username))
 
-# Clean up expired mines games
-async def cleanup_expired_mines():
-    """Clean up expired mines games"""
-    while True:
-        await asyncio.sleep(60)
-        current_time = datetime.now()
-        expired_mines = []
-        
-        for game_id, game_data in active_mines_games.items():
-            try:
-                created_at = datetime.fromisoformat(game_data['created_at'])
-                if (current_time - created_at).total_seconds() > 300:
-                    expired_mines.append(game_id)
-            except:
-                expired_mines.append(game_id)
-        
-        for expired_id in expired_mines:
-            del active_mines_games[expired_id]
+def link_roblox_account(user_id, username):
+    """Link a Roblox username to a user, returns an error message if someone else has it"""
+    user_id = str(user_id)
+    key = normalize_roblox_name(username)
+    owner = roblox_name_index.get(key)
+    if owner and owner != user_id:
+        return f"❌ **{username}** is already linked to another Discord account!"
+    
+    old_username = roblox_data.get(user_id)
+    if old_username and roblox_name_index.get(normalize_roblox_name(old_username)) == user_id:
+        del roblox_name_index[normalize_roblox_name(old_username)]
+    
+    roblox_data[user_id] = username
+    roblox_name_index[key] = user_id
+    return None
 
-# Reset daily giveaway totals at midnight
-async def reset_daily_giveaway_totals():
-    """Reset daily giveaway totals at midnight"""
-    while True:
-        now = datetime.now()
-        next_midnight = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-        wait_seconds = (next_midnight - now).total_seconds()
-        
-        await asyncio.sleep(wait_seconds)
-        
-        giveaway_daily_totals.clear()
-        await save_data()
-        print("🔄 Reset daily giveaway totals")
+class RobloxResolver:
+    """Looks up Roblox usernames in batches"""
+    async def resolve(self, usernames):
+        """Return {normalized name: canonical name, or None if the account doesn't exist}"""
+        raise NotImplementedError
+
+class LocalRobloxResolver(RobloxResolver):
+    """Offline stand-in that only checks the username format"""
+    async def resolve(self, usernames):
+        return {normalize_roblox_name(name): (name.strip() if ROBLOX_USERNAME_PATTERN.match(name.strip()) else None) for name in usernames}
+
+class RobloxApiResolver(RobloxResolver):
+    """Resolves usernames with the Roblox users API (up to 100 per request)"""
+    URL = "https://users.roblox.com/v1/usernames/users"
+    
+    async def resolve(self, usernames):
+        results = {normalize_roblox_name(name): None for name in usernames}
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=10)) as session:
+            for i in range(0, len(usernames), ROBLOX_BATCH_MAX):
+                payload = {"usernames": usernames[i:i + ROBLOX_BATCH_MAX], "excludeBannedUsers": True}
+                async with session.post(self.URL, json=payload) as response:
+                    response.raise_for_status()
+                    data = await response.json()
+                for user in data.get("data", []):
+                    results[normalize_roblox_name(user["requestedUsername"])] = user["name"]
+        return results
+
+roblox_resolver = LocalRobloxResolver() if ROBLOX_RESOLVER == "local" else RobloxApiResolver()
+
+async def validate_roblox_names(usernames):
+    """Resolve usernames through the TTL cache, batching misses from concurrent callers"""
+    global roblox_lookup_task
+    loop = asyncio.get_running_loop()
+    now = time.time()
+    results = {}
+    waiting = {}
+    
+    for username in usernames:
+        key = normalize_roblox_name(username)
+        cached = roblox_name_cache.get(key)
+        if cached and cached[1] > now:
+            results[key] = cached[0]
+            continue
+        if key not in roblox_pending_lookups:
+            roblox_pending_lookups[key] = (username.strip(), loop.create_future())
+        waiting[key] = roblox_pending_lookups[key][1]
+    
+    if waiting:
+        if roblox_lookup_task is None or roblox_lookup_task.done():
+            roblox_lookup_task = asyncio.create_task(flush_roblox_lookups())
+            roblox_lookup_task.add_done_callback(cancel_orphaned_lookups)
+        # Gathered so one failed lookup doesn't leave the others' errors unretrieved
+        values = await asyncio.gather(*(asyncio.shield(future) for future in waiting.values()))
+        results.update(zip(waiting, values))
+    
+    return results
+
+async def validate_roblox_name(username):
+    """Resolve one username, returns its canonical spelling or None"""
+    return (await validate_roblox_names([username]))[normalize_roblox_name(username)]
 
-# Clean up old anti-spam data
-async def cleanup_antispam_data():
-    """Clean up old anti-spam data"""
-    while True:
-        await asyncio.sleep(3600)
-        current_time = time.time()
+async def flush_roblox_lookups():
+    """Send every lookup queued during the batch window to the resolver at once"""
+    batch = {}
+    try:
+        await asyncio.sleep(ROBLOX_BATCH_WINDOW)
         
-        for user_id in list(user_message_times.keys()):
-            user_message_times[user_id] = [t for t in user_message_times[user_id] if current_time - t < 3600]
+        while roblox_pending_lookups:
+            batch = dict(roblox_pending_lookups)
+            roblox_pending_lookups.clear()
+            usernames = [username for username, _ in batch.values()]
             
-            if not user_message_times[user_id]:
-                del user_message_times[user_id]
-        
-        await save_data()
+            try:
+                resolved = await roblox_resolver.resolve(usernames)
+                cache_results = True
+            except Exception as e:
+                print(f"⚠️ Roblox lookup failed, falling back to format check: {e}")
+                resolved = await LocalRobloxResolver().resolve(usernames)
+                cache_results = False
+            
+            now = time.time()
+            for key in [key for key, (_, expires) in roblox_name_cache.items() if expires <= now]:
+                del roblox_name_cache[key]
+            
+            for key, (_, future) in batch.items():
+                if cache_results:
+                    roblox_name_cache[key] = (resolved.get(key), now + ROBLOX_NAME_CACHE_TTL)
+                if not future.done():
+                    future.set_result(resolved.get(key))
+    except Exception as e:
+        print(f"⚠️ Roblox lookup batch failed: {e}")
+        fail_roblox_lookups(batch, e)
+    except asyncio.CancelledError:
+        fail_roblox_lookups(batch, None)
+        raise
 
-async def start_minigame():
-    """Start a minigame every 75 messages in the minigame channel"""
-    global active_minigame, minigame_message_count
-    await bot.wait_until_ready()
-    
-    while not bot.is_closed():
-        await asyncio.sleep(10)
-        
-        if minigame_message_count >= 75:
-            await trigger_minigame()
-            minigame_message_count = 0
+def cancel_orphaned_lookups(task):
+    """A flush cancelled before it started never reaches its except blocks"""
+    if task.cancelled():
+        fail_roblox_lookups({}, None)
+
+def fail_roblox_lookups(batch, error):
+    """Fail the lookups nobody will answer (cancel them if error is None), so their callers finish"""
+    # Lookups queued since the batch was taken have no flush left to answer them either
+    failed = {**batch, **roblox_pending_lookups}
+    roblox_pending_lookups.clear()
+    for _, future in failed.values():
+        if future.done():
+            continue
+        if error is None:
+            future.cancel()
+        else:
+            future.set_exception(error)
+
+# Pre-command gate
+ROBLOX_REQUIRED_EMBED = discord.Embed(
+    title="🔗 Roblox Account Required",
+    description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
+    color=0xff9900
+)
+
+# Checks run by the command tree before a command, keyed by qualified command name.
+# "cooldown_hours" and "cooldown" only check; the command sets the cooldown once it succeeds.
+# "amount" parses the `amount` option into interaction.extras["amount"] and applies the limits.
+COMMAND_GATES = {
+    "balance": {"roblox": True},
+    "daily": {"roblox": True, "cooldown_hours": ("daily", 24, "⏰ Daily already claimed! Come back in **{time_left}**")},
+    "work": {"roblox": True, "cooldown_hours": ("work", 3, "💼 Still tired! Rest for **{time_left}** more")},
+    "crime": {"roblox": True, "cooldown_hours": ("crime", 1, "🚔 Lay low for **{time_left}** more!")},
+    "coinflip": {
+        "roblox": True,
+        "cooldown": ("coinflip", 5, "⏰ Please wait 5 seconds between coinflips!"),
+        "amount": {"max": lambda: coinflip_config["max_bet"]}
+    },
+    "duel challenge": {
+        "roblox": True,
+        "cooldown": ("duel", 10, "⏰ Please wait 10 seconds between duel challenges!"),
+        "amount": {}
+    },
+    "duel open": {
+        "roblox": True,
+        "cooldown": ("duel", 10, "⏰ Please wait 10 seconds between duel challenges!"),
+        "amount": {}
+    },
+    "gift": {
+        "roblox": True,
+        "cooldown": ("gift", 3, "⏰ Please wait 3 seconds between gifts!"),
+        "amount": {"max": lambda: 3000, "max_message": "❌ You can only gift up to 3,000 tokens per day!"}
+    },
+    "shop": {"roblox": True},
+    "buy": {"roblox": True, "cooldown": ("buy", 3, "⏰ Please wait 3 seconds between purchases!")},
+    "leaderboard": {"roblox": True},
+    "cashout": {"roblox": True},
+    "mines": {
+        "roblox": True,
+        "cooldown": ("mines", 10, "⏰ Please wait 10 seconds between mines games!"),
+        "amount": {"min": lambda: mines_config["min_bet"], "max": lambda: mines_config["max_bet"]}
+    },
+    "giveaway": {
+        "roblox": True,
+        "cooldown": ("giveaway", 30, "⏰ Please wait 30 seconds before starting another giveaway!"),
+        "amount": {
+            "min": lambda: 50, "min_message": "❌ Minimum giveaway amount is 50 tokens!",
+            "max": lambda: 5000, "max_message": "❌ Maximum giveaway amount is 5,000 tokens!"
+        }
+    },
+    "giveawayinfo": {"roblox": True},
+    "roblox": {"cooldown_hours": ("roblox", 24, "⏰ You can only set your Roblox username once per day! Come back in **{time_left}**")}
+}
+
+async def require_roblox_link(interaction):
+    """Send the linking prompt and return False if the user has no Roblox account"""
+    if has_linked_roblox(interaction.user.id):
+        return True
+    await interaction.response.send_message(embed=ROBLOX_REQUIRED_EMBED, ephemeral=True)
+    return False
+
+def check_amount_limits(parsed_amount, limits):
+    """Get the error message for an amount outside a command's limits, or None"""
+    if parsed_amount is None or parsed_amount <= 0:
+        return "❌ Invalid amount! Use numbers or suffixes like 10k, 1m, 1b"
+    if "min" in limits and parsed_amount < limits["min"]():
+        return limits.get("min_message", "❌ Minimum bet is {limit:,} tokens!").format(limit=limits["min"]())
+    if "max" in limits and parsed_amount > limits["max"]():
+        return limits.get("max_message", "❌ Maximum bet is {limit:,} tokens!").format(limit=limits["max"]())
+    return None
 
-async def trigger_minigame():
-    """Force start a minigame"""
-    global active_minigame
+async def run_command_gate(interaction):
+    """Apply the command's COMMAND_GATES entry, responding and returning False if it fails"""
+    if interaction.type is not discord.InteractionType.application_command or not interaction.command:
+        return True
     
-    minigame_channel = bot.get_channel(MINIGAME_CHANNEL_ID)
-    if not minigame_channel:
-        print(f"⚠️ Minigame channel {MINIGAME_CHANNEL_ID} not found!")
-        return
+    gate = COMMAND_GATES.get(interaction.command.qualified_name)
+    if not gate:
+        return True
     
-    minigame_type = random.choice(["trivia", "scramble"])
+    if gate.get("roblox") and not await require_roblox_link(interaction):
+        return False
     
-    if minigame_type == "trivia":
-        question_data = random.choice(MINIGAME_QUESTIONS)
-        question = question_data["question"]
-        answer = question_data["answer"]
-        embed_title = "🎯 Trivia Minigame"
-        embed_description = f"**{question}**\n\nFirst person to answer correctly wins 200 tokens!"
+    if "cooldown_hours" in gate:
+        command_name, hours, message = gate["cooldown_hours"]
+        can_use, next_use = can_use_command(interaction.user.id, command_name, hours)
+        if not can_use:
+            await interaction.response.send_message(message.format(time_left=format_time(next_use)), ephemeral=True)
+            return False
+    
+    if "cooldown" in gate:
+        command_name, seconds, message = gate["cooldown"]
+        if not can_use_short_cooldown(interaction.user.id, command_name, seconds):
+            await interaction.response.send_message(message, ephemeral=True)
+            return False
+    
+    if "amount" in gate:
+        parsed_amount = parse_amount(getattr(interaction.namespace, "amount", ""))
+        error = check_amount_limits(parsed_amount, gate["amount"])
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
+            return False
+        interaction.extras["amount"] = parsed_amount
+    
+    return True
+
+# Inventory ledger
+def reset_inventory_ledger():
+    """Clear the ledger and its indexes before replaying the ledger file"""
+    inventory_ledger.clear()
+    ledger_unsaved.clear()
+    user_inventory.clear()
+    ledger_user_index.clear()
+    ledger_item_index.clear()
+    pending_fulfillment.clear()
+
+def apply_ledger_entry(entry):
+    """Add a ledger entry and update the inventory and lookup indexes"""
+    inventory_ledger[entry["id"]] = entry
+    
+    if entry["type"] == "grant":
+        items = user_inventory.setdefault(entry["user_id"], {})
+        items[entry["item"]] = items.get(entry["item"], 0) + entry["quantity"]
+        ledger_user_index.setdefault(entry["user_id"], []).append(entry["id"])
+        ledger_item_index.setdefault(entry["item"].lower(), []).append(entry["id"])
+        pending_fulfillment[entry["id"]] = entry
+    elif entry["type"] == "fulfill":
+        pending_fulfillment.pop(entry["ref"], None)
+
+def inventory_ids_ready(count=1):
+    """Check that `count` new inventory entries can get an id without waiting on the shared store"""
+    return not shared_store or len(inventory_ids) >= count
+
+def refill_inventory_ids():
+    """Top up this worker's id block in the background once it runs low"""
+    global inventory_id_refill
+    if len(inventory_ids) >= INVENTORY_ID_LOW_WATER or (inventory_id_refill and not inventory_id_refill.done()):
+        return
+    inventory_id_refill = asyncio.create_task(claim_inventory_ids())
+
+async def claim_inventory_ids():
+    try:
+        inventory_ids.extend(await asyncio.to_thread(shared_store.claim_inventory_ids, INVENTORY_ID_BLOCK))
+    except Exception as e:
+        print(f"⚠️ Could not claim inventory ids, the next save tries again: {e}")
+
+def add_inventory_entry(entry):
+    """Give a new entry the next ledger id, then apply it and queue it for saving"""
+    if shared_store:
+        # Ids come from a block the shared store handed this worker ahead of time, so they stay unique across workers
+        if not inventory_ids:
+            # Callers check inventory_ids_ready before charging anyone, so this never leaves a half-done grant
+            raise RuntimeError("No inventory ids left until the shared store tops up the block")
+        entry["id"] = inventory_ids.popleft()
+        refill_inventory_ids()
     else:
-        word_data = random.choice(MINIGAME_SCRAMBLED_WORDS)
-        scrambled = word_data["scrambled"]
-        answer = word_data["answer"]
-        embed_title = "🔤 Word Scramble Minigame"
-        embed_description = f"**Unscramble this word: {scrambled}**\n\nFirst person to unscramble correctly wins 200 tokens!"
-    
-    active_minigame = {
-        "type": minigame_type,
-        "question": question if minigame_type == "trivia" else scrambled,
-        "answer": answer.lower(),
-        "active": True,
-        "winner": None,
-        "channel_id": MINIGAME_CHANNEL_ID
+        entry["id"] = len(inventory_ledger)
+    ledger_unsaved.append(entry)
+    apply_ledger_entry(entry)
+    return entry
+
+def record_inventory_grant(user_id, item_name, quantity=1, price=0, source="shop"):
+    """Record that a user received an item which needs to be delivered in Roblox"""
+    entry = {
+        "id": None,
+        "type": "grant",
+        "user_id": str(user_id),
+        "item": item_name,
+        "quantity": quantity,
+        "price": price,
+        "source": source,
+        "guild_id": current_guild_id.get(),
+        "timestamp": datetime.now().isoformat()
     }
-    
-    embed = discord.Embed(
-        title=embed_title,
-        description=embed_description,
-        color=0xFFD700,
-        timestamp=datetime.now()
-    )
-    embed.set_footer(text="Reply with your answer! Minigame ends in 60 seconds.")
+    return add_inventory_entry(entry)
+
+def fulfill_ledger_entry(entry_id, admin_id):
+    """Mark a pending grant as delivered, returns the grant or None"""
+    grant = pending_fulfillment.get(entry_id)
+    if not grant:
+        return None
+    
+    add_inventory_entry({
+        "id": None,
+        "type": "fulfill",
+        "ref": entry_id,
+        "admin_id": str(admin_id),
+        "timestamp": datetime.now().isoformat()
+    })
+    return grant
+
+def is_current_guild_grant(entry):
+    """Check whether a grant was made in the current guild (older grants belong to the home guild)"""
+    return entry.get("guild_id", home_guild_id) == current_guild_id.get()
+
+def is_fulfilled(entry_id):
+    """Check whether a grant has been delivered"""
+    return entry_id not in pending_fulfillment
+
+def format_ledger_grant(entry, show_user=False):
+    """Format a grant for inventory and fulfillment lists"""
+    status = "✅" if is_fulfilled(entry["id"]) else "⏳"
+    user_text = f" → <@{entry['user_id']}> ({roblox_data.get(entry['user_id'], 'No Roblox')})" if show_user else ""
+    return f"{status} `#{entry['id']}` **{entry['item']}** x{entry['quantity']}{user_text} • {entry['source']}"
+
+# Deadline scheduler
+def schedule_deadline(key, when, callback, *args, shared=False):
+    """Run callback(*args) at unix time `when` in the current guild (or outside any guild if shared),
+    replacing any deadline with the same key"""
+    key = (None if shared else current_guild_id.get(), key)
+    entry = [when, key, callback, args]
+    deadline_entries[key] = entry
+    heapq.heappush(deadline_heap, (when, id(entry), entry))
+    if deadline_wakeup:
+        deadline_wakeup.set()
+
+def cancel_deadline(key, shared=False):
+    """Cancel a scheduled deadline (lazily dropped from the heap)"""
+    deadline_entries.pop((None if shared else current_guild_id.get(), key), None)
+
+async def run_deadlines():
+    """Sleep until the next deadline and start it"""
+    global deadline_wakeup
+    deadline_wakeup = asyncio.Event()
     
     try:
-        await minigame_channel.send(embed=embed)
-    except Exception as e:
-        print(f"⚠️ Error sending minigame to channel: {e}")
-        return
-    
-    await asyncio.sleep(60)
-    
-    if active_minigame and active_minigame["winner"] is None:
-        active_minigame = None
-        embed = discord.Embed(
-            title="⏰ Minigame Ended",
-            description="No one answered correctly in time!",
-            color=0xff4444
-        )
-        embed.add_field(name="Correct Answer", value=answer.title(), inline=True)
-        embed.add_field(name="Prize", value="200 🪙 (unclaimed)", inline=True)
-        
-        try:
-            await minigame_channel.send(embed=embed)
+        while True:
+            deadline_wakeup.clear()
+            
+            if not deadline_heap:
+                await deadline_wakeup.wait()
+                continue
+            
+            when, _, entry = deadline_heap[0]
+            if deadline_entries.get(entry[1]) is not entry:
+                heapq.heappop(deadline_heap)
+                continue
+            
+            delay = when - time.time()
+            if delay > 0:
+                # A timer rather than wait_for, which can swallow shutdown's cancel if a deadline was just scheduled
+                timer = asyncio.get_running_loop().call_later(delay, deadline_wakeup.set)
+                try:
+                    await deadline_wakeup.wait()
+                finally:
+                    timer.cancel()
+                continue
+            
+            heapq.heappop(deadline_heap)
+            del deadline_entries[entry[1]]
+            
+            # Each callback gets its own task, so a hung or rate-limited Discord call can't hold up the other deadlines
+            task = asyncio.create_task(run_deadline(entry), name=f"deadline:{entry[1][1]}")
+            deadline_tasks.add(task)
+            task.add_done_callback(deadline_tasks.discard)
+    finally:
+        # Stopped at shutdown, which already gave running callbacks the drain timeout
+        tasks = list(deadline_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+async def run_deadline(entry):
+    """Run a deadline's callback in the guild it was scheduled in"""
+    try:
+        guild_id = entry[1][0]
+        if guild_id is None:
+            current_guild_id.set(None)
+        else:
+            await enter_guild(guild_id)
+        await entry[2](*entry[3])
+    except Exception as e:
+        print(f"⚠️ Error running deadline {entry[1][1]}: {e}")
+
+# Auto-save task
+async def auto_save():
+    """Save everything, then unload guilds that went idle (every 30 seconds)"""
+    # Shielded so shutdown cancelling the deadline callbacks can't cut a ledger append in half
+    if await asyncio.shield(save_data()):
+        unload_idle_guilds()
+
+# Expire duels
+async def expire_duel(duel_key):
+    """Release the challenger's escrowed stake when a duel is not answered in time"""
+    duel_data = pending_duels.pop(duel_key, None)
+    if not duel_data:
+        return
+    
+    update_balance(duel_data['challenger'], duel_data['amount'], "duel")
+    await save_data()
+    
+    channel = bot.get_channel(duel_data.get('channel_id', 0))
+    if channel and duel_data.get('message_id'):
+        embed = discord.Embed(
+            title="⏰ Duel Expired",
+            description=f"<@{duel_data['challenged']}> didn't answer the duel from <@{duel_data['challenger']}> in time.",
+            color=0x808080
+        )
+        embed.add_field(name="Refunded", value=f"{duel_data['amount']:,} 🪙", inline=True)
+        try:
+            await channel.get_partial_message(duel_data['message_id']).edit(embed=embed, view=None)
         except Exception as e:
-            print(f"⚠️ Error sending minigame result: {e}")
+            print(f"⚠️ Could not update expired duel message: {e}")
+
+def resume_duels():
+    """Re-attach saved duels and schedule their expiry"""
+    for duel_key, duel_data in list(pending_duels.items()):
+        if duel_data.get('message_id'):
+            view = DuelAcceptView(duel_data['challenger'], duel_data['challenged'], duel_data['amount'])
+            bot.add_view(view, message_id=duel_data['message_id'])
+        schedule_deadline(f"duel:{duel_key}", duel_data.get('expires_at', time.time()), expire_duel, duel_key)
+    
+    for user_id, bucket in duel_queue_index.items():
+        entry = duel_queues[bucket][user_id]
+        schedule_deadline(f"duelq:{user_id}", entry['expires_at'], expire_open_duel, user_id)
+    
+    if pending_duels or duel_queue_index:
+        print(f"🔄 Resumed {len(pending_duels)} pending duels and {len(duel_queue_index)} open challenges")
+
+# Open duel matchmaking queue
+def get_duel_bucket(amount):
+    """Get the stake bucket for an open duel amount"""
+    return bisect.bisect_right(DUEL_QUEUE_BUCKETS, amount) - 1
+
+def format_duel_bucket(bucket):
+    """Format a stake bucket as a readable range"""
+    low = DUEL_QUEUE_BUCKETS[bucket]
+    if bucket + 1 < len(DUEL_QUEUE_BUCKETS):
+        return f"{low:,}-{DUEL_QUEUE_BUCKETS[bucket + 1] - 1:,}"
+    return f"{low:,}+"
+
+def add_to_duel_queue(entry, front=False):
+    """Add an open challenge to the back (or front) of its bucket queue"""
+    bucket = get_duel_bucket(entry['amount'])
+    user_id = str(entry['user_id'])
+    queue = duel_queues.setdefault(bucket, OrderedDict())
+    queue[user_id] = entry
+    if front:
+        queue.move_to_end(user_id, last=False)
+    duel_queue_index[user_id] = bucket
+
+def remove_from_duel_queue(user_id):
+    """Remove a user's open challenge, returns the entry or None"""
+    user_id = str(user_id)
+    bucket = duel_queue_index.pop(user_id, None)
+    if bucket is None:
+        return None
+    cancel_deadline(f"duelq:{user_id}")
+    return duel_queues[bucket].pop(user_id)
+
+def pop_duel_queue(bucket):
+    """Take the oldest open challenge from a bucket, returns the entry or None"""
+    queue = duel_queues.get(bucket)
+    if not queue:
+        return None
+    user_id, entry = queue.popitem(last=False)
+    del duel_queue_index[user_id]
+    cancel_deadline(f"duelq:{user_id}")
+    return entry
+
+async def edit_open_duel_message(entry, embed):
+    """Update the message that announced an open challenge"""
+    channel = bot.get_channel(entry.get('channel_id', 0))
+    if channel and entry.get('message_id'):
+        try:
+            await channel.get_partial_message(entry['message_id']).edit(embed=embed)
+        except Exception as e:
+            print(f"⚠️ Could not update open duel message: {e}")
+
+async def expire_open_duel(user_id):
+    """Refund an open challenge nobody matched in time"""
+    entry = remove_from_duel_queue(user_id)
+    if not entry:
+        return
+    
+    update_balance(entry['user_id'], entry['amount'], "duel")
+    await save_data()
+    
+    embed = discord.Embed(
+        title="⏰ Open Duel Expired",
+        description=f"Nobody matched <@{entry['user_id']}>'s open challenge in time.",
+        color=0x808080
+    )
+    embed.add_field(name="Refunded", value=f"{entry['amount']:,} 🪙", inline=True)
+    await edit_open_duel_message(entry, embed)
+
+# Expire mines games
+async def expire_mines_game(game_id):
+    """Cash out or refund a mines game that ran out of time"""
+    game = end_mines_game(game_id)
+    if not game or game.get('game_over'):
+        return
+    
+    user_id = int(game_id.split('_')[0])
+    
+    if mines_config.get("expire_action", "cashout") == "refund":
+        multiplier = 1.0
+    else:
+        multiplier = get_mines_multiplier(game['mines_count'], len(game['revealed']))
+    payout = int(game['bet'] * multiplier)
+    
+    update_balance(user_id, payout, "mines")
+    await save_data()
+    
+    embed = discord.Embed(
+        title="⏰ Mines Game - EXPIRED",
+        description=f"The game ran out of time and paid out **{payout:,}** 🪙",
+        color=0xff9900
+    )
+    embed.add_field(name="Bet Amount", value=f"{game['bet']:,} 🪙", inline=True)
+    embed.add_field(name="Safe Spots Found", value=f"{len(game['revealed'])}", inline=True)
+    embed.add_field(name="Multiplier", value=f"{multiplier:.2f}x", inline=True)
+    await edit_mines_board(game_id, game, embed)
+    
+    await log_action(
+        "MINES",
+        "⏰ Mines Game Expired",
+        f"<@{user_id}>'s mines game expired and paid out **{payout:,} tokens**",
+        color=0xff9900,
+        fields=[
+            {"name": "Bet Amount", "value": f"{game['bet']:,} 🪙", "inline": True},
+            {"name": "Safe Spots", "value": len(game['revealed']), "inline": True},
+            {"name": "Multiplier", "value": f"{multiplier:.2f}x", "inline": True},
+            {"name": "Payout", "value": f"{payout:,} 🪙", "inline": True}
+        ]
+    )
+
+def end_mines_game(game_id):
+    """Remove a mines game and stop its board's view, so the old board can't be clicked"""
+    game = active_mines_games.pop(game_id, None)
+    cancel_deadline(f"mines:{game_id}")
+    view = mines_views.pop(game_id, None)
+    if view:
+        view.stop()
+    return game
+
+async def edit_mines_board(game_id, game, embed):
+    """Show a finished game's board with the mines uncovered and every tile disabled"""
+    channel = bot.get_channel(game.get('channel_id', 0))
+    if channel and game.get('message_id'):
+        view = MinesView(game_id, game, finished=True)
+        # Stopped first so discord.py doesn't keep it in its view store
+        view.stop()
+        try:
+            await channel.get_partial_message(game['message_id']).edit(embed=embed, view=view)
+        except Exception as e:
+            print(f"⚠️ Could not update mines game message: {e}")
+
+def get_mines_deadline(game):
+    """Get the unix time a mines game expires at"""
+    if 'expires_at' in game:
+        return game['expires_at']
+    try:
+        return datetime.fromisoformat(game['created_at']).timestamp() + MINES_GAME_TIMEOUT
+    except:
+        return time.time()
+
+def resume_mines_games():
+    """Re-attach saved mines games and schedule their expiry"""
+    for game_id, game in list(active_mines_games.items()):
+        if game.get('message_id'):
+            mines_views[game_id] = MinesView(game_id, game)
+            bot.add_view(mines_views[game_id], message_id=game['message_id'])
+        schedule_deadline(f"mines:{game_id}", get_mines_deadline(game), expire_mines_game, game_id)
+    
+    if active_mines_games:
+        print(f"🔄 Resumed {len(active_mines_games)} mines games")
+
+# Reset daily giveaway totals at midnight
+def get_next_midnight():
+    """Unix time of the next local midnight"""
+    now = datetime.now()
+    return (now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)).timestamp()
+
+async def reset_daily_giveaway_totals():
+    """Reset daily giveaway totals (runs at midnight)"""
+    # Guilds that aren't loaded only keep stale days, which the gift limit ignores
+    for state in guild_states.values():
+        state.giveaway_daily_totals.clear()
+    await save_data()
+    print("🔄 Reset daily giveaway totals")
+
+# Expire old anti-spam data
+def schedule_antispam_expiry(user_id_str):
+    """Forget a user's anti-spam history an hour after their last message"""
+    times = user_message_times.get(user_id_str)
+    when = (times[-1] if times else time.time()) + 3600
+    schedule_deadline(f"antispam:{user_id_str}", when, expire_antispam_data, user_id_str, shared=True)
+
+async def expire_antispam_data(user_id_str):
+    """Drop a user's anti-spam history, or check again if they sent messages since it was scheduled"""
+    times = user_message_times.get(user_id_str)
+    if times and time.time() - times[-1] < 3600:
+        schedule_antispam_expiry(user_id_str)
+    else:
+        user_message_times.pop(user_id_str, None)
+
+def build_minigame_channels():
+    """Rebuild the set of channels that host minigames across the loaded guilds"""
+    minigame_channel_ids.clear()
+    for state in guild_states.values():
+        minigame_channel_ids.update(int(channel_id) for channel_id in state.minigame_config["channels"])
+
+class QuestionBank:
+    """Line-based question file read lazily through a shuffled, persisted no-repeat cursor"""
+    def __init__(self, name, filename, parse=str.strip):
+        self.name = name
+        self.path = os.path.join(MINIGAME_BANK_DIR, filename)
+        self.parse = parse
+        self.offsets = array('q')
+    
+    def load(self):
+        """Index the byte offset of every non-empty line without keeping the lines in memory"""
+        offsets = array('q')
+        if os.path.exists(self.path):
+            with open(self.path, 'rb') as f:
+                position = 0
+                for line in f:
+                    if line.strip():
+                        offsets.append(position)
+                    position += len(line)
+        self.offsets = offsets
+        return len(offsets)
+    
+    def next_index(self):
+        """Walk a random affine permutation of the lines so nothing repeats until the bank is exhausted"""
+        count = len(self.offsets)
+        cursor = minigame_state.get(self.name)
+        if not cursor or cursor["count"] != count or cursor["position"] >= count:
+            step = 1
+            if count > 2:
+                step = random.randrange(1, count)
+                while math.gcd(step, count) != 1:
+                    step = random.randrange(1, count)
+            cursor = {"count": count, "step": step, "start": random.randrange(count), "position": 0}
+            minigame_state[self.name] = cursor
+        
+        index = (cursor["start"] + cursor["step"] * cursor["position"]) % count
+        cursor["position"] += 1
+        return index
+    
+    def next_entry(self):
+        """Read the next unseen entry from disk"""
+        with open(self.path, 'rb') as f:
+            f.seek(self.offsets[self.next_index()])
+            return self.parse(f.readline().decode('utf-8'))
+
+def normalize_answer(text):
+    """Lowercase, strip accents, punctuation and articles so equivalent answers compare equal"""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = re.sub(r"(?<=\d)[,_](?=\d)", "", text)
+    text = "".join(" " if not char.isalnum() else char for char in text if not unicodedata.combining(char))
+    words = text.split()
+    kept = [word for word in words if word not in ANSWER_IGNORED_WORDS]
+    return " ".join(kept or words)
+
+def get_typo_allowance(answer):
+    """Number of typos accepted for an answer (none for numbers and short words)"""
+    if answer.replace(" ", "").isdigit() or len(answer) < 5:
+        return 0
+    return 1 if len(answer) < 10 else 2
+
+def within_edit_distance(guess, answer, max_distance):
+    """Bounded Levenshtein check that only fills a band of width max_distance"""
+    if abs(len(guess) - len(answer)) > max_distance:
+        return False
+    
+    too_far = max_distance + 1
+    previous = list(range(len(answer) + 1))
+    for i, guess_char in enumerate(guess, 1):
+        current = [i] + [too_far] * len(answer)
+        low = max(1, i - max_distance)
+        high = min(len(answer), i + max_distance)
+        for j in range(low, high + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (guess_char != answer[j - 1])
+            )
+        if min(current[max(0, low - 1):high + 1]) > max_distance:
+            return False
+        previous = current
+    
+    return previous[len(answer)] <= max_distance
+
+class AnswerMatcher:
+    """Answer check compiled once per round: a set of normalized aliases plus an optional typo allowance"""
+    def __init__(self, answers, fuzzy=False):
+        self.answers = {normalize_answer(answer) for answer in answers if normalize_answer(answer)}
+        self.fuzzy_answers = [(answer, get_typo_allowance(answer)) for answer in self.answers if fuzzy and get_typo_allowance(answer)]
+        self.max_length = max((len(answer) for answer in self.answers), default=0) + 2
+    
+    def matches(self, text):
+        # Skip normalizing messages far longer than any accepted answer
+        if len(text) > self.max_length * 3 + 10:
+            return False
+        guess = normalize_answer(text)
+        if guess in self.answers:
+            return True
+        return any(within_edit_distance(guess, answer, typos) for answer, typos in self.fuzzy_answers)
+
+class MinigamePlugin:
+    """A minigame type: builds a round of {"question", "answer", "aliases"}"""
+    name = None
+    title = None
+    prompt = None
+    banks = ()
+    fuzzy = False
+    
+    def available(self):
+        return all(len(bank.offsets) for bank in self.banks)
+    
+    def next_round(self):
+        raise NotImplementedError
+
+MINIGAME_PLUGINS = {}
+
+def register_minigame(plugin_class):
+    """Register a minigame plugin by name"""
+    MINIGAME_PLUGINS[plugin_class.name] = plugin_class()
+    return plugin_class
+
+@register_minigame
+class TriviaMinigame(MinigamePlugin):
+    name = "trivia"
+    title = "🎯 Trivia Minigame"
+    prompt = "**{question}**\n\nFirst person to answer correctly wins {prize} tokens!"
+    banks = (QuestionBank("trivia", "trivia.jsonl", json.loads),)
+    fuzzy = True
+    
+    def next_round(self):
+        entry = self.banks[0].next_entry()
+        return {"question": entry["question"], "answer": entry["answer"], "aliases": entry.get("aliases", [])}
+
+@register_minigame
+class ScrambleMinigame(MinigamePlugin):
+    name = "scramble"
+    title = "🔤 Word Scramble Minigame"
+    prompt = "**Unscramble this word: {question}**\n\nFirst person to unscramble correctly wins {prize} tokens!"
+    banks = (QuestionBank("words", "words.txt"),)
+    
+    def next_round(self):
+        word = self.banks[0].next_entry().lower()
+        letters = list(word.upper())
+        if len(set(letters)) > 1:
+            while "".join(letters) == word.upper():
+                random.shuffle(letters)
+        return {"question": "".join(letters), "answer": word}
+
+@register_minigame
+class MathMinigame(MinigamePlugin):
+    name = "math"
+    title = "🧮 Math Minigame"
+    prompt = "**What is {question}?**\n\nFirst person to answer correctly wins {prize} tokens!"
+    
+    def next_round(self):
+        operation = random.choice(["+", "-", "×"])
+        if operation == "×":
+            a, b = random.randint(2, 15), random.randint(2, 15)
+            answer = a * b
+        else:
+            a, b = random.randint(10, 500), random.randint(10, 500)
+            if operation == "-":
+                a, b = max(a, b), min(a, b)
+            answer = a + b if operation == "+" else a - b
+        return {"question": f"{a} {operation} {b}", "answer": str(answer)}
+
+@register_minigame
+class EmojiMinigame(MinigamePlugin):
+    name = "emoji"
+    title = "😀 Emoji Guess Minigame"
+    prompt = "**Guess what this is: {question}**\n\nFirst person to guess correctly wins {prize} tokens!"
+    banks = (QuestionBank("emoji", "emoji.jsonl", json.loads),)
+    fuzzy = True
+    
+    def next_round(self):
+        entry = self.banks[0].next_entry()
+        return {"question": entry["emoji"], "answer": entry["answer"], "aliases": entry.get("aliases", [])}
+
+async def load_minigame_banks():
+    """Index every plugin's question files in a worker thread"""
+    for plugin in MINIGAME_PLUGINS.values():
+        for bank in plugin.banks:
+            try:
+                count = await asyncio.to_thread(bank.load)
+                print(f"✅ Indexed {count} entries in {bank.path}")
+            except Exception as e:
+                print(f"⚠️ Could not load question bank {bank.path}: {e}")
+
+async def trigger_minigame(channel):
+    """Start a minigame in a channel, returns False if one is already running there"""
+    if channel.id in active_minigames:
+        return False
+    
+    plugins = [plugin for plugin in MINIGAME_PLUGINS.values() if plugin.available()]
+    if not plugins:
+        print("⚠️ No minigames available to start!")
+        return False
+    
+    plugin = random.choice(plugins)
+    try:
+        game_round = plugin.next_round()
+    except Exception as e:
+        print(f"⚠️ Error building {plugin.name} minigame: {e}")
+        return False
+    answer = game_round["answer"]
+    
+    # Claim the channel before any await so a second trigger can't start another game
+    active_minigames[channel.id] = {
+        "type": plugin.name,
+        "question": game_round["question"],
+        "answer": answer.lower(),
+        "matcher": AnswerMatcher([answer, *game_round.get("aliases", [])], plugin.fuzzy)
+    }
+    minigame_message_counts[channel.id] = 0
+    schedule_deadline(f"minigame:{channel.id}", time.time() + MINIGAME_DURATION, expire_minigame, channel.id)
+    
+    embed = discord.Embed(
+        title=plugin.title,
+        description=plugin.prompt.format(question=game_round["question"], prize=MINIGAME_PRIZE),
+        color=0xFFD700,
+        timestamp=datetime.now()
+    )
+    embed.set_footer(text=f"Reply with your answer! Minigame ends in {MINIGAME_DURATION} seconds.")
+    
+    try:
+        await channel.send(embed=embed)
+    except Exception as e:
+        print(f"⚠️ Error sending minigame to channel: {e}")
+        active_minigames.pop(channel.id, None)
+        cancel_deadline(f"minigame:{channel.id}")
+        return False
+    
+    return True
+
+async def expire_minigame(channel_id):
+    """End a minigame nobody answered in time"""
+    game = active_minigames.pop(channel_id, None)
+    if not game:
+        return
+    
+    embed = discord.Embed(
+        title="⏰ Minigame Ended",
+        description="No one answered correctly in time!",
+        color=0xff4444
+    )
+    embed.add_field(name="Correct Answer", value=game["answer"].title(), inline=True)
+    embed.add_field(name="Prize", value=f"{MINIGAME_PRIZE} 🪙 (unclaimed)", inline=True)
+    
+    try:
+        await bot.get_channel(channel_id).send(embed=embed)
+    except Exception as e:
+        print(f"⚠️ Error sending minigame result: {e}")
+
+def start_background_jobs():
+    """Start every background job under the supervisor (a job that is already running is left alone)"""
+    supervisor.start("auto_save", auto_save, interval=30)
+    supervisor.start("daily_reset", reset_daily_giveaway_totals, at=get_next_midnight)
+    supervisor.start("deadlines", run_deadlines)
+    supervisor.start("join_batches", process_join_batches)
+
+async def setup_hook():
+    """Runs once before the first connect, unlike on_ready which fires again on every reconnect"""
+    start_background_jobs()
+
+bot.setup_hook = setup_hook
 
 @bot.event
 async def on_ready():
     print(f'🚀 {bot.user} is online!')
-    await load_data()
+    if startup_complete.is_set():
+        # Reconnected: the in-memory state is newer than the files, only refresh what Discord owns
+        print("🔄 Reconnected, keeping the in-memory state")
+        for guild in bot.guilds:
+            await refresh_invite_cache(guild)
+        return
     
-    bot.auto_save_task = asyncio.create_task(auto_save())
-    bot.cleanup_task = asyncio.create_task(cleanup_expired_duels())
-    bot.giveaway_cleanup_task = asyncio.create_task(cleanup_expired_giveaways())
-    bot.mines_cleanup_task = asyncio.create_task(cleanup_expired_mines())
-    bot.daily_reset_task = asyncio.create_task(reset_daily_giveaway_totals())
-    bot.antispam_cleanup_task = asyncio.create_task(cleanup_antispam_data())
-    bot.minigame_task = asyncio.create_task(start_minigame())
+    resolve_home_guild()
+    await load_data()
+    build_mines_payout_table()
+    build_doors_prize_table()
+    await load_minigame_banks()
+    
+    # Guilds with running timers (and the home guild) are loaded now, the rest on first use
+    active_guild_ids = []
+    active_guild_files = [ACTIVE_GUILDS_FILE]
+    if SHARD_COUNT and os.path.isdir(WORKER_DATA_DIR):
+        # Any worker's guilds may have moved here if the shards were split differently
+        active_guild_files = [os.path.join(WORKER_DATA_DIR, worker, ACTIVE_GUILDS_FILE) for worker in os.listdir(WORKER_DATA_DIR)]
+    for path in active_guild_files:
+        if os.path.exists(path):
+            async with aiofiles.open(path, 'r') as f:
+                active_guild_ids.extend(json.loads(await f.read()))
+    for guild_id in {home_guild_id, *active_guild_ids} - {None}:
+        if owns_guild(guild_id):
+            await enter_guild(guild_id)
+    current_guild_id.set(None)
+    
+    # Background jobs wait for this before their first run
+    startup_complete.set()
+    
+    for guild in bot.guilds:
+        await refresh_invite_cache(guild)
     
     try:
         @bot.tree.error
@@ -915,16 +2763,18 @@ async def on_ready():
             else:
                 print(f"Command error: {error}")
         
-        synced = await bot.tree.sync()
-        print(f"✅ Synced {len(synced)} commands")
+        # Commands are global, one worker syncing them is enough
+        if not SHARD_IDS or 0 in SHARD_IDS:
+            synced = await bot.tree.sync()
+            print(f"✅ Synced {len(synced)} commands")
     except Exception as e:
         print(f"❌ Failed to sync: {e}")
 
 @bot.event
 async def on_message(message):
-    global minigame_message_count
-    
-    if not message.author.bot and message.guild:
+    if not message.author.bot and message.guild and accept_event():
+        await enter_guild(message.guild.id)
+        
         # Check for spam
         is_spam, old_balance, new_balance = check_spam(message.author.id)
         if is_spam:
@@ -945,15 +2795,14 @@ async def on_message(message):
         
         # Award tokens for normal messages (if not spamming)
         tokens = random.randint(1, 5)
-        update_balance(message.author.id, tokens)
+        update_balance(message.author.id, tokens, "chat")
         
-        # Check if message is in minigame channel
-        if message.channel.id == MINIGAME_CHANNEL_ID:
-            minigame_message_count += 1
-            
+        # Check if message is in a minigame channel
+        if message.channel.id in minigame_channel_ids:
             # 2% chance to win huge pet reward when chatting in minigame channel
-            if random.random() <= 0.02:  # 2% chance
+            if random.random() <= 0.02 and inventory_ids_ready():  # 2% chance
                 huge_reward_name = random.choice(["Huge Hell Rock", "Huge Corgi", "Huge Cat", "Huge Dog", "Huge Dragon"])
+                record_inventory_grant(message.author.id, huge_reward_name, 1, 0, "chat")
                 await save_data()
                 
                 # Log the reward
@@ -970,96 +2819,312 @@ async def on_message(message):
                 
                 await message.channel.send(embed=embed)
         
-        # Check minigame answer (only in minigame channel)
-        if (active_minigame and 
-            active_minigame["active"] and 
-            active_minigame["winner"] is None and
-            message.channel.id == active_minigame["channel_id"]):
+        # Check minigame answer (only in the channel hosting the game)
+        game = active_minigames.get(message.channel.id)
+        if game and game["matcher"].matches(message.content):
+            # Settle before any await so only the first correct answer wins
+            del active_minigames[message.channel.id]
+            cancel_deadline(f"minigame:{message.channel.id}")
             
-            user_answer = message.content.strip().lower()
-            if user_answer == active_minigame["answer"]:
-                active_minigame["winner"] = message.author.id
-                active_minigame["active"] = False
-                
-                # Award tokens
-                update_balance(message.author.id, 200)
-                await save_data()
-                
-                embed = discord.Embed(
-                    title="🎉 Minigame Winner!",
-                    description=f"{message.author.mention} answered correctly and won 200 tokens!",
-                    color=0x00ff00
-                )
-                embed.add_field(name="Correct Answer", value=active_minigame["answer"].title(), inline=True)
-                embed.add_field(name="Prize", value="200 🪙", inline=True)
-                
-                await message.channel.send(embed=embed)
+            # Award tokens
+            update_balance(message.author.id, MINIGAME_PRIZE, "minigame")
+            await save_data()
+            
+            embed = discord.Embed(
+                title="🎉 Minigame Winner!",
+                description=f"{message.author.mention} answered correctly and won {MINIGAME_PRIZE} tokens!",
+                color=0x00ff00
+            )
+            embed.add_field(name="Correct Answer", value=game["answer"].title(), inline=True)
+            embed.add_field(name="Prize", value=f"{MINIGAME_PRIZE} 🪙", inline=True)
+            
+            await message.channel.send(embed=embed)
+        
+        # Start a game once the channel has seen enough messages
+        elif message.channel.id in minigame_channel_ids and not game:
+            count = minigame_message_counts.get(message.channel.id, 0) + 1
+            minigame_message_counts[message.channel.id] = count
+            if count >= minigame_config["message_threshold"]:
+                await trigger_minigame(message.channel)
     
     await bot.process_commands(message)
 
+def build_invited_index():
+    """Rebuild the invited -> inviter index from the per-inviter lists"""
+    index = {}
+    for inviter_id, data in invite_data.items():
+        for invited_id in data.get('invited_users', []):
+            index.setdefault(invited_id, {"inviter_id": inviter_id, "joined_at": 0, "reward": INVITE_REWARD})
+    return index
+
+def cache_invite(guild_id, invite, uses=None):
+    """Add an invite to the cache, keeping already-acknowledged uses"""
+    entry = invite_cache.setdefault(guild_id, {}).get(invite.code)
+    if entry is None:
+        entry = {"uses": invite.uses if uses is None else uses, "seen": invite.uses or 0, "max_uses": invite.max_uses or 0, "deleted": False}
+        invite_cache[guild_id][invite.code] = entry
+    entry["seen"] = max(entry["seen"], invite.uses or 0)
+    entry["inviter_id"] = invite.inviter.id if invite.inviter else entry.get("inviter_id")
+    entry["inviter_bot"] = invite.inviter.bot if invite.inviter else entry.get("inviter_bot", False)
+    entry["deleted"] = False
+    return entry
+
+async def refresh_invite_cache(guild, reset=True):
+    """Fetch the guild's invites once and update the cached use counts,
+    returns the codes of invites that weren't cached yet (None if the fetch failed)"""
+    try:
+        invites = await guild.invites()
+    except Exception as e:
+        print(f"⚠️ Could not get invites for guild {guild.name}: {e}")
+        return None
+    
+    if reset:
+        invite_cache[guild.id] = {}
+    
+    fetched = set()
+    new_codes = []
+    for invite in invites:
+        if invite.code not in invite_cache[guild.id]:
+            new_codes.append(invite.code)
+        # Past uses of an invite we never saw created are acknowledged, not pending
+        cache_invite(guild.id, invite)
+        fetched.add(invite.code)
+    
+    for code, entry in invite_cache[guild.id].items():
+        if code not in fetched:
+            entry["deleted"] = True
+    
+    if reset:
+        print(f"✅ Cached {len(invites)} invites for {guild.name}")
+    return new_codes
+
+def take_invite_use(guild_id, allow_deleted=False):
+    """Attribute one unacknowledged invite use, returns the invite's cache entry or None"""
+    guild_invites = invite_cache.get(guild_id, {})
+    for code, entry in guild_invites.items():
+        if entry["seen"] > entry["uses"]:
+            entry["uses"] += 1
+            return entry
+    
+    if allow_deleted:
+        # Single-use invites are deleted by Discord as they are used, so they never show a new use
+        for code, entry in list(guild_invites.items()):
+            if entry["deleted"] and entry["max_uses"] and entry["uses"] < entry["max_uses"]:
+                del guild_invites[code]
+                return entry
+        
+        for code in [code for code, entry in guild_invites.items() if entry["deleted"]]:
+            del guild_invites[code]
+    return None
+
+async def find_used_invites(guild, count):
+    """Attribute a batch of joins (in join order) to invites with at most one fetch"""
+    # Uses seen by an earlier fetch belong to the earliest joins that are still unattributed
+    entries = []
+    while len(entries) < count:
+        entry = take_invite_use(guild.id)
+        if not entry:
+            break
+        entries.append(entry)
+    
+    if len(entries) < count:
+        if guild.id not in invite_cache:
+            await refresh_invite_cache(guild)
+        else:
+            new_codes = await refresh_invite_cache(guild, reset=False)
+            while new_codes is not None and len(entries) < count:
+                entry = take_invite_use(guild.id, allow_deleted=True)
+                if not entry:
+                    break
+                entries.append(entry)
+            
+            # An invite created while on_invite_create was missed can only account for its latest use
+            for code in new_codes or ():
+                entry = invite_cache[guild.id][code]
+                if len(entries) < count and entry["seen"] > 0:
+                    entries.append(entry)
+    
+    return entries + [None] * (count - len(entries))
+
+@bot.event
+async def on_invite_create(invite):
+    if invite.guild:
+        cache_invite(invite.guild.id, invite, 0)
+
+@bot.event
+async def on_invite_delete(invite):
+    if invite.guild:
+        entry = invite_cache.get(invite.guild.id, {}).get(invite.code)
+        if entry:
+            entry["deleted"] = True
+
 @bot.event
 async def on_member_join(member):
-    try:
-        account_age = datetime.now().astimezone() - member.created_at
-        if account_age.days < 30:
-            await send_invite_dm(member, None, "Account too new", f"The account {member.display_name} is too new (less than 30 days old). No reward given.")
-            print(f"❌ {member} joined but account is too new ({account_age.days} days)")
-            return
-        
-        try:
-            invites = await member.guild.invites()
-        except:
-            print(f"⚠️ Could not get invites for guild {member.guild.name}")
-            await send_invite_dm(member, None, "Invite tracking error", "Could not track invites for this member.")
+    await join_queue.put(member)
+
+async def process_join_batches():
+    """Collect joins for a short window and reward them in one batch, stops at a None sentinel"""
+    stopping = False
+    while not stopping:
+        member = await join_queue.get()
+        if member is None:
             return
-        
-        used_invite = None
-        cached_invites = invite_data.get('cached_invites', {})
-        
-        for invite in invites:
-            cached_uses = cached_invites.get(invite.code, 0)
-            if invite.uses > cached_uses:
-                used_invite = invite
+        members = [member]
+        deadline = time.time() + JOIN_BATCH_WINDOW
+        while len(members) < JOIN_BATCH_MAX:
+            timeout = deadline - time.time()
+            if timeout <= 0:
                 break
+            try:
+                member = await asyncio.wait_for(join_queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                break
+            if member is None:
+                stopping = True
+                break
+            members.append(member)
         
-        if not used_invite or not used_invite.inviter or used_invite.inviter.bot:
-            await send_invite_dm(member, None, "No invite found", "Could not determine who invited this member.")
-            return
-        
-        inviter_id = str(used_invite.inviter.id)
-        invited_id = str(member.id)
-        
-        if inviter_id not in invite_data:
-            invite_data[inviter_id] = {
-                'invited_users': [],
-                'total_invites': 0,
-                'tokens_earned': 0
-            }
-        
-        if invited_id in invite_data[inviter_id]['invited_users']:
-            await send_invite_dm(used_invite.inviter, member, "Already tracked", "This member was already tracked.")
-            return
-        
-        update_balance(int(inviter_id), 300)
-        invite_data[inviter_id]['invited_users'].append(invited_id)
-        invite_data[inviter_id]['total_invites'] += 1
-        invite_data[inviter_id]['tokens_earned'] += 300
-        
-        invite_data['cached_invites'] = {invite.code: invite.uses for invite in invites}
-        
-        await save_data()
+        try:
+            await process_member_joins(members)
+        except Exception as e:
+            print(f"⚠️ Error processing {len(members)} member joins: {e}")
+
+async def process_member_joins(members):
+    """Attribute and reward a batch of joins, then notify each inviter once"""
+    guilds = {}
+    for member in members:
+        guilds.setdefault(member.guild.id, (member.guild, []))[1].append(member)
+    
+    notifications = {}
+    member_notices = []
+    inviters = {}
+    rewarded = 0
+    
+    for guild, guild_members in guilds.values():
+        await enter_guild(guild.id)
+        guild_rewarded = rewarded
+        used_invites = await find_used_invites(guild, len(guild_members))
+        
+        for member, used_invite in zip(guild_members, used_invites):
+            account_age = datetime.now().astimezone() - member.created_at
+            if account_age.days < 30:
+                member_notices.append((member, "Account too new", f"The account {member.display_name} is too new (less than 30 days old). No reward given."))
+                print(f"❌ {member} joined but account is too new ({account_age.days} days)")
+                continue
+            
+            if not used_invite or not used_invite.get("inviter_id") or used_invite.get("inviter_bot"):
+                member_notices.append((member, "No invite found", "Could not determine who invited this member."))
+                print(f"⚠️ Could not determine who invited {member}")
+                continue
+            
+            inviter_id = str(used_invite["inviter_id"])
+            invited_id = str(member.id)
+            if inviter_id not in inviters:
+                inviters[inviter_id] = guild.get_member(used_invite["inviter_id"])
+            
+            if inviter_id not in invite_data:
+                invite_data[inviter_id] = {
+                    'invited_users': [],
+                    'total_invites': 0,
+                    'tokens_earned': 0
+                }
+            
+            if invited_id in invited_index:
+                notifications.setdefault(inviter_id, []).append((member, "Already tracked", "This member was already invited before."))
+                continue
+            
+            update_balance(int(inviter_id), INVITE_REWARD, "invite")
+            invited_index[invited_id] = {"inviter_id": inviter_id, "joined_at": time.time(), "reward": INVITE_REWARD}
+            invite_data[inviter_id]['invited_users'].append(invited_id)
+            invite_data[inviter_id]['total_invites'] += 1
+            invite_data[inviter_id]['tokens_earned'] += INVITE_REWARD
+            notifications.setdefault(inviter_id, []).append((member, "Reward given", f"{INVITE_REWARD} tokens"))
+            rewarded += 1
+        
+        if rewarded > guild_rewarded:
+            await save_data()
+    
+    if rewarded:
+        print(f"✅ Rewarded {rewarded} invites from a batch of {len(members)} joins")
+    
+    # DMs go out after the batch is saved
+    for member, status, message in member_notices:
+        await send_invite_dm(member, None, status, message)
+    
+    for inviter_id, results in notifications.items():
+        inviter = inviters.get(inviter_id)
+        try:
+            inviter = inviter or await bot.fetch_user(int(inviter_id))
+        except Exception as e:
+            print(f"⚠️ Could not find inviter {inviter_id}: {e}")
+            continue
         
-        await send_invite_dm(used_invite.inviter, member, "Reward given", "300 tokens")
+        if len(results) == 1:
+            member, status, message = results[0]
+            await send_invite_dm(inviter, member, status, message)
+        else:
+            await send_invite_summary_dm(inviter, results)
+
+@bot.event
+async def on_member_remove(member):
+    await enter_guild(member.guild.id)
+    entry = invited_index.get(str(member.id))
+    window = invite_config.get("clawback_hours", 0) * 3600
+    if not entry or "clawed_back" in entry or not window or time.time() - entry["joined_at"] > window:
+        return
+    
+    # Settle before any await so a quick rejoin/leave cannot claw back twice
+    inviter_id = entry["inviter_id"]
+    clawback = min(entry["reward"], get_user_balance(inviter_id))
+    if clawback > 0:
+        update_balance(inviter_id, -clawback, "invite")
+    entry["clawed_back"] = clawback
+    
+    inviter_data = invite_data.get(inviter_id)
+    if inviter_data:
+        inviter_data['total_invites'] = max(0, inviter_data['total_invites'] - 1)
+        inviter_data['tokens_earned'] = max(0, inviter_data['tokens_earned'] - entry["reward"])
+    
+    await save_data()
+    print(f"↩️ Clawed back {clawback} tokens from {inviter_id} after {member} left")
+    
+    await log_action(
+        "INVITE_CLAWBACK",
+        "↩️ Invite Reward Revoked",
+        f"**{member}** left within {invite_config['clawback_hours']}h of joining",
+        color=0xff4444,
+        fields=[
+            {"name": "Inviter", "value": f"<@{inviter_id}>", "inline": True},
+            {"name": "Tokens Removed", "value": f"{clawback:,} 🪙", "inline": True}
+        ]
+    )
+    
+    try:
+        inviter = member.guild.get_member(int(inviter_id)) or await bot.fetch_user(int(inviter_id))
+        await send_invite_dm(inviter, member, "Reward revoked", f"{member.display_name} left within {invite_config['clawback_hours']} hours of joining, so {clawback:,} tokens were removed.")
+    except Exception as e:
+        print(f"⚠️ Could not notify inviter {inviter_id} about clawback: {e}")
+
+async def send_invite_summary_dm(inviter, results):
+    """DM an inviter one summary for several joins"""
+    try:
+        rewarded = [member for member, status, _ in results if status == "Reward given"]
+        lines = [f"{'✅' if status == 'Reward given' else '⚠️'} **{member.display_name}** - {status}" for member, status, _ in results]
         
-        print(f"✅ {used_invite.inviter} rewarded 300 tokens for inviting {member}")
+        embed = discord.Embed(
+            title="🔗 Invite Status",
+            description="\n".join(lines)[:4000],
+            color=0x00ff00 if rewarded else 0xFFFF00,
+            timestamp=datetime.now()
+        )
+        embed.add_field(name="New Joins", value=str(len(results)), inline=True)
+        embed.add_field(name="Reward", value=f"{len(rewarded) * INVITE_REWARD:,} 🪙", inline=True)
+        embed.add_field(name="Total Invites", value=invite_data.get(str(inviter.id), {}).get('total_invites', 0), inline=True)
+        embed.set_footer(text="IM's Universe")
         
+        await inviter.send(embed=embed)
     except Exception as e:
-        print(f"⚠️ Error processing member join: {e}")
-        try:
-            if 'used_invite' in locals() and used_invite and used_invite.inviter:
-                await send_invite_dm(used_invite.inviter, member, "Error", f"An error occurred: {str(e)}")
-        except:
-            pass
+        print(f"⚠️ Could not DM {inviter} about invites: {e}")
 
 async def send_invite_dm(inviter, member, status, message):
     try:
@@ -1076,7 +3141,7 @@ async def send_invite_dm(inviter, member, status, message):
         embed.add_field(name="Details", value=message, inline=False)
         
         if status == "Reward given":
-            embed.add_field(name="Reward", value="300 🪙", inline=True)
+            embed.add_field(name="Reward", value=f"{INVITE_REWARD} 🪙", inline=True)
             embed.add_field(name="Total Invites", value=invite_data.get(str(inviter.id), {}).get('total_invites', 0), inline=True)
         
         embed.set_footer(text="IM's Universe")
@@ -1089,15 +3154,6 @@ async def send_invite_dm(inviter, member, status, message):
 
 @bot.tree.command(name="balance", description="Check your token balance")
 async def balance(interaction: discord.Interaction):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
     user_id = str(interaction.user.id)
     balance = get_user_balance(interaction.user.id)
     data = user_data.get(user_id, {})
@@ -1125,24 +3181,8 @@ async def balance(interaction: discord.Interaction):
 
 @bot.tree.command(name="daily", description="Claim daily tokens (24h cooldown)")
 async def daily(interaction: discord.Interaction):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
-    can_use, next_use = can_use_command(interaction.user.id, "daily", 24)
-    
-    if not can_use:
-        time_left = format_time(next_use)
-        await interaction.response.send_message(f"⏰ Daily already claimed! Come back in **{time_left}**", ephemeral=True)
-        return
-    
     tokens = random.randint(1, 50)
-    new_balance = update_balance(interaction.user.id, tokens)
+    new_balance = update_balance(interaction.user.id, tokens, "daily")
     cooldowns["daily"][str(interaction.user.id)] = datetime.now().isoformat()
     await save_data()
     
@@ -1155,25 +3195,9 @@ async def daily(interaction: discord.Interaction):
 
 @bot.tree.command(name="work", description="Work for tokens (3h cooldown)")
 async def work(interaction: discord.Interaction):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
-    can_use, next_use = can_use_command(interaction.user.id, "work", 3)
-    
-    if not can_use:
-        time_left = format_time(next_use)
-        await interaction.response.send_message(f"💼 Still tired! Rest for **{time_left}** more", ephemeral=True)
-        return
-    
     tokens = random.randint(1, 100)
     job = random.choice(WORK_JOBS)
-    new_balance = update_balance(interaction.user.id, tokens)
+    new_balance = update_balance(interaction.user.id, tokens, "work")
     cooldowns["work"][str(interaction.user.id)] = datetime.now().isoformat()
     await save_data()
     
@@ -1187,28 +3211,12 @@ async def work(interaction: discord.Interaction):
 
 @bot.tree.command(name="crime", description="Commit crime for tokens (1h cooldown, risky!)")
 async def crime(interaction: discord.Interaction):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
-    can_use, next_use = can_use_command(interaction.user.id, "crime", 1)
-    
-    if not can_use:
-        time_left = format_time(next_use)
-        await interaction.response.send_message(f"🚔 Lay low for **{time_left}** more!", ephemeral=True)
-        return
-    
     success = random.choice([True, False])
     activity = random.choice(CRIME_ACTIVITIES)
     
     if success:
         tokens = random.randint(1, 100)
-        new_balance = update_balance(interaction.user.id, tokens)
+        new_balance = update_balance(interaction.user.id, tokens, "crime")
         embed = discord.Embed(title="🎭 Crime Success!", color=0x00ff00)
         embed.add_field(name="Crime", value=f"You {activity}", inline=False)
         embed.add_field(name="Gained", value=f"+{tokens:,} 🪙", inline=True)
@@ -1216,7 +3224,7 @@ async def crime(interaction: discord.Interaction):
         tokens = random.randint(1, 200)
         current = get_user_balance(interaction.user.id)
         tokens = min(tokens, current)
-        new_balance = update_balance(interaction.user.id, -tokens)
+        new_balance = update_balance(interaction.user.id, -tokens, "crime")
         embed = discord.Embed(title="🚔 Crime Failed!", color=0xff4444)
         embed.add_field(name="Crime", value=f"Tried to {activity}", inline=False)
         embed.add_field(name="Lost", value=f"-{tokens:,} 🪙", inline=True)
@@ -1231,28 +3239,32 @@ async def crime(interaction: discord.Interaction):
 
 # ===== GAMBLING COMMANDS =====
 
-@bot.tree.command(name="coinflip", description="Bet tokens on a coinflip")
-async def coinflip(interaction: discord.Interaction, amount: str, choice: str):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
+def flip_coin(choice):
+    """Play one coinflip round, returns (won, result)"""
+    roll = random.randint(1, 100)
+    won = roll <= coinflip_config["win_chance"]
     
-    if not can_use_short_cooldown(interaction.user.id, "coinflip", 5):
-        await interaction.response.send_message("⏰ Please wait 5 seconds between coinflips!", ephemeral=True)
-        return
+    result = random.choice(['heads', 'tails'])
+    if not won and random.random() < 0.7:
+        result = 'tails' if choice == 'heads' else 'heads'
     
-    parsed_amount = parse_amount(amount)
-    if parsed_amount is None or parsed_amount <= 0:
-        await interaction.response.send_message("❌ Invalid amount! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
-        return
+    return won, result
+
+def longest_streak(outcomes, value):
+    """Get the longest run of `value` in a list of outcomes"""
+    longest = 0
+    current = 0
+    for outcome in outcomes:
+        current = current + 1 if outcome == value else 0
+        longest = max(longest, current)
+    return longest
+
+@bot.tree.command(name="coinflip", description="Bet tokens on a coinflip")
+async def coinflip(interaction: discord.Interaction, amount: str, choice: str, rounds: int = 1):
+    parsed_amount = interaction.extras["amount"]
     
-    if parsed_amount > coinflip_config["max_bet"]:
-        await interaction.response.send_message(f"❌ Maximum bet is {coinflip_config['max_bet']:,} tokens!", ephemeral=True)
+    if rounds < 1 or rounds > COINFLIP_MAX_ROUNDS:
+        await interaction.response.send_message(f"❌ Rounds must be between 1 and {COINFLIP_MAX_ROUNDS}!", ephemeral=True)
         return
     
     choice = choice.lower()
@@ -1265,34 +3277,65 @@ async def coinflip(interaction: discord.Interaction, amount: str, choice: str):
     else:
         choice = 'tails'
     
+    total_bet = parsed_amount * rounds
     balance = get_user_balance(interaction.user.id)
-    if balance < parsed_amount:
-        await interaction.response.send_message(f"❌ Insufficient funds! You need **{parsed_amount - balance:,}** more tokens.", ephemeral=True)
+    if balance < total_bet:
+        await interaction.response.send_message(f"❌ Insufficient funds! You need **{total_bet - balance:,}** more tokens.", ephemeral=True)
         return
 
-    roll = random.randint(1, 100)
-    win_chance = coinflip_config["win_chance"]
-    won = roll <= win_chance
-    
-    actual_flip = random.choice(['heads', 'tails'])
-    result = actual_flip
-    
-    if not won and random.random() < 0.7:
-        result = 'tails' if choice == 'heads' else 'heads'
-    
-    if won:
-        winnings = parsed_amount
-        new_balance = update_balance(interaction.user.id, winnings)
-        embed = discord.Embed(title="🪙 Coinflip - YOU WON!", color=0x00ff00)
-        embed.add_field(name="Your Choice", value=choice.title(), inline=True)
-        embed.add_field(name="Result", value=f"🪙 {result.title()}", inline=True)
-        embed.add_field(name="Winnings", value=f"+{winnings:,} 🪙", inline=True)
+    outcomes = [flip_coin(choice) for _ in range(rounds)]
+    wins = sum(1 for won, _ in outcomes if won)
+    net = (2 * wins - rounds) * parsed_amount
+    new_balance = update_balance(interaction.user.id, net, "coinflip")
+    
+    if rounds == 1:
+        won, result = outcomes[0]
+        if won:
+            embed = discord.Embed(title="🪙 Coinflip - YOU WON!", color=0x00ff00)
+            embed.add_field(name="Your Choice", value=choice.title(), inline=True)
+            embed.add_field(name="Result", value=f"🪙 {result.title()}", inline=True)
+            embed.add_field(name="Winnings", value=f"+{parsed_amount:,} 🪙", inline=True)
+        else:
+            embed = discord.Embed(title="🪙 Coinflip - YOU LOST!", color=0xff4444)
+            embed.add_field(name="Your Choice", value=choice.title(), inline=True)
+            embed.add_field(name="Result", value=f"🪙 {result.title()}", inline=True)
+            embed.add_field(name="Lost", value=f"-{parsed_amount:,} 🪙", inline=True)
+        
+        log_title = f"🪙 Coinflip {'Win' if won else 'Loss'}"
+        log_description = f"{interaction.user.mention} {'won' if won else 'lost'} **{parsed_amount:,} tokens** on coinflip"
+        log_fields = [
+            {"name": "Bet Amount", "value": f"{parsed_amount:,} 🪙", "inline": True},
+            {"name": "Choice", "value": choice.title(), "inline": True},
+            {"name": "Result", "value": result.title(), "inline": True},
+            {"name": "Outcome", "value": "Won" if won else "Lost", "inline": True}
+        ]
     else:
-        new_balance = update_balance(interaction.user.id, -parsed_amount)
-        embed = discord.Embed(title="🪙 Coinflip - YOU LOST!", color=0xff4444)
+        results = [won for won, _ in outcomes]
+        win_streak = longest_streak(results, True)
+        loss_streak = longest_streak(results, False)
+        history = "".join("🟢" if won else "🔴" for won in results)
+        
+        embed = discord.Embed(
+            title=f"🪙 Coinflip x{rounds} - {'NET WIN' if net > 0 else 'NET LOSS' if net < 0 else 'BROKE EVEN'}!",
+            color=0x00ff00 if net > 0 else 0xff4444 if net < 0 else 0xFFD700
+        )
         embed.add_field(name="Your Choice", value=choice.title(), inline=True)
-        embed.add_field(name="Result", value=f"🪙 {result.title()}", inline=True)
-        embed.add_field(name="Lost", value=f"-{parsed_amount:,} 🪙", inline=True)
+        embed.add_field(name="Bet per Round", value=f"{parsed_amount:,} 🪙", inline=True)
+        embed.add_field(name="Won / Lost", value=f"{wins} / {rounds - wins}", inline=True)
+        embed.add_field(name="Longest Win Streak", value=str(win_streak), inline=True)
+        embed.add_field(name="Longest Loss Streak", value=str(loss_streak), inline=True)
+        embed.add_field(name="Net Result", value=f"{net:+,} 🪙", inline=True)
+        embed.add_field(name="Rounds", value=history, inline=False)
+        
+        log_title = f"🪙 Coinflip x{rounds} {'Win' if net > 0 else 'Loss' if net < 0 else 'Even'}"
+        log_description = f"{interaction.user.mention} played **{rounds} rounds** of coinflip for a net **{net:+,} tokens**"
+        log_fields = [
+            {"name": "Bet per Round", "value": f"{parsed_amount:,} 🪙", "inline": True},
+            {"name": "Choice", "value": choice.title(), "inline": True},
+            {"name": "Won / Lost", "value": f"{wins} / {rounds - wins}", "inline": True},
+            {"name": "Streaks", "value": f"🟢 {win_streak} / 🔴 {loss_streak}", "inline": True},
+            {"name": "Net Result", "value": f"{net:+,} 🪙", "inline": True}
+        ]
     
     embed.add_field(name="New Balance", value=f"{new_balance:,} 🪙", inline=False)
     embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
@@ -1302,28 +3345,27 @@ async def coinflip(interaction: discord.Interaction, amount: str, choice: str):
     
     await log_action(
         "COINFLIP",
-        f"🪙 Coinflip {'Win' if won else 'Loss'}",
-        f"{interaction.user.mention} {'won' if won else 'lost'} **{parsed_amount:,} tokens** on coinflip",
-        color=0x00ff00 if won else 0xff4444,
+        log_title,
+        log_description,
+        color=0x00ff00 if net > 0 else 0xff4444,
         user=interaction.user,
-        fields=[
-            {"name": "Bet Amount", "value": f"{parsed_amount:,} 🪙", "inline": True},
-            {"name": "Choice", "value": choice.title(), "inline": True},
-            {"name": "Result", "value": result.title(), "inline": True},
-            {"name": "Outcome", "value": "Won" if won else "Lost", "inline": True}
-        ]
+        fields=log_fields
     )
     
     await interaction.response.send_message(embed=embed)
 
 # ===== DUEL SYSTEM =====
 
-class DuelAcceptView(discord.ui.View):
+class DuelAcceptView(GuildView):
     def __init__(self, challenger_id, challenged_id, amount):
-        super().__init__(timeout=60)
+        # Expiry is handled by the deadline scheduler so the view survives restarts
+        super().__init__(timeout=None)
         self.challenger_id = challenger_id
         self.challenged_id = challenged_id
         self.amount = amount
+        self.duel_key = f"{challenger_id}_{challenged_id}"
+        self.accept_duel.custom_id = f"duel_accept_{self.duel_key}"
+        self.decline_duel.custom_id = f"duel_decline_{self.duel_key}"
     
     @discord.ui.button(label="✅ Accept Duel", style=discord.ButtonStyle.green)
     async def accept_duel(self, interaction: discord.Interaction, button: discord.ui.Button):
@@ -1331,26 +3373,27 @@ class DuelAcceptView(discord.ui.View):
             await interaction.response.send_message("❌ This duel is not for you!", ephemeral=True)
             return
         
-        challenger_balance = get_user_balance(self.challenger_id)
-        challenged_balance = get_user_balance(self.challenged_id)
+        winner_id = random.choice([self.challenger_id, self.challenged_id])
+        loser_id = self.challenged_id if winner_id == self.challenger_id else self.challenger_id
         
-        if challenger_balance < self.amount:
-            await interaction.response.send_message("❌ The challenger no longer has enough tokens!", ephemeral=True)
+        try:
+            async with economy.transaction(self.challenger_id, self.challenged_id, source="duel") as tx:
+                # The challenger's stake is already in escrow, only the challenged user pays here
+                duel_open = self.duel_key in pending_duels
+                if duel_open:
+                    tx.debit(self.challenged_id, self.amount)
+                    tx.credit(winner_id, self.amount * 2)
+                    del pending_duels[self.duel_key]
+                    cancel_deadline(f"duel:{self.duel_key}")
+                balances = {winner_id: tx.balance(winner_id), loser_id: tx.balance(loser_id)}
+        except InsufficientFunds as e:
+            await interaction.response.send_message(f"❌ You don't have enough tokens! Need {e.shortfall:,} more.", ephemeral=True)
             return
         
-        if challenged_balance < self.amount:
-            await interaction.response.send_message(f"❌ You don't have enough tokens! Need {self.amount - challenged_balance:,} more.", ephemeral=True)
+        if not duel_open:
+            await interaction.response.send_message("❌ This duel has already ended!", ephemeral=True)
             return
         
-        duel_key = f"{self.challenger_id}_{self.challenged_id}"
-        if duel_key in pending_duels:
-            del pending_duels[duel_key]
-        
-        winner_id = random.choice([self.challenger_id, self.challenged_id])
-        loser_id = self.challenged_id if winner_id == self.challenger_id else self.challenger_id
-        
-        update_balance(winner_id, self.amount)
-        update_balance(loser_id, -self.amount)
         await save_data()
         
         winner = bot.get_user(winner_id)
@@ -1362,8 +3405,8 @@ class DuelAcceptView(discord.ui.View):
         embed.add_field(name="Winner", value=f"🏆 {winner.mention}", inline=True)
         embed.add_field(name="Loser", value=f"💀 {loser.mention}", inline=True)
         embed.add_field(name="Amount", value=f"{self.amount:,} 🪙", inline=True)
-        embed.add_field(name="Winner's Balance", value=f"{get_user_balance(winner_id):,} 🪙", inline=True)
-        embed.add_field(name="Loser's Balance", value=f"{get_user_balance(loser_id):,} 🪙", inline=True)
+        embed.add_field(name="Winner's Balance", value=f"{balances[winner_id]:,} 🪙", inline=True)
+        embed.add_field(name="Loser's Balance", value=f"{balances[loser_id]:,} 🪙", inline=True)
         embed.add_field(name="‎", value="‎", inline=True)
         
         embed.set_footer(text="The coin has decided!")
@@ -1382,6 +3425,7 @@ class DuelAcceptView(discord.ui.View):
             ]
         )
         
+        self.stop()
         await interaction.response.edit_message(embed=embed, view=None)
     
     @discord.ui.button(label="❌ Decline Duel", style=discord.ButtonStyle.red)
@@ -1390,38 +3434,30 @@ class DuelAcceptView(discord.ui.View):
             await interaction.response.send_message("❌ This duel is not for you!", ephemeral=True)
             return
         
-        duel_key = f"{self.challenger_id}_{self.challenged_id}"
-        if duel_key in pending_duels:
-            del pending_duels[duel_key]
+        duel_data = pending_duels.pop(self.duel_key, None)
+        if not duel_data:
+            await interaction.response.send_message("❌ This duel has already ended!", ephemeral=True)
+            return
+        
+        cancel_deadline(f"duel:{self.duel_key}")
+        update_balance(self.challenger_id, self.amount, "duel")
+        await save_data()
         
-        challenger = bot.get_user(self.challenger_id)
         embed = discord.Embed(
             title="❌ Duel Declined", 
-            description=f"{interaction.user.mention} declined the duel challenge from {challenger.mention}.",
+            description=f"{interaction.user.mention} declined the duel challenge from <@{self.challenger_id}>.",
             color=0xff4444
         )
+        embed.add_field(name="Refunded", value=f"{self.amount:,} 🪙", inline=True)
         
+        self.stop()
         await interaction.response.edit_message(embed=embed, view=None)
 
-@bot.tree.command(name="duel", description="Challenge another user to a coinflip duel")
-async def duel(interaction: discord.Interaction, user: discord.Member, amount: str):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
-    if not can_use_short_cooldown(interaction.user.id, "duel", 10):
-        await interaction.response.send_message("⏰ Please wait 10 seconds between duel challenges!", ephemeral=True)
-        return
-    
-    parsed_amount = parse_amount(amount)
-    if parsed_amount is None or parsed_amount <= 0:
-        await interaction.response.send_message("❌ Invalid amount! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
-        return
+duel_group = discord.app_commands.Group(name="duel", description="Coinflip duels against other users")
+
+@duel_group.command(name="challenge", description="Challenge another user to a coinflip duel")
+async def duel_challenge(interaction: discord.Interaction, user: discord.Member, amount: str):
+    parsed_amount = interaction.extras["amount"]
     
     if user.id == interaction.user.id:
         await interaction.response.send_message("❌ You can't duel yourself!", ephemeral=True)
@@ -1448,14 +3484,20 @@ async def duel(interaction: discord.Interaction, user: discord.Member, amount: s
         await interaction.response.send_message("❌ There's already a pending duel between you two!", ephemeral=True)
         return
     
+    # Escrow the challenger's stake until the duel is accepted, declined or expires
+    challenger_balance = update_balance(interaction.user.id, -parsed_amount, "duel")
     pending_duels[duel_key] = {
         'challenger': interaction.user.id,
         'challenged': user.id,
         'amount': parsed_amount,
-        'created_at': datetime.now()
+        'created_at': datetime.now().isoformat(),
+        'expires_at': time.time() + DUEL_TIMEOUT,
+        'channel_id': interaction.channel_id
     }
+    schedule_deadline(f"duel:{duel_key}", pending_duels[duel_key]['expires_at'], expire_duel, duel_key)
     
     set_short_cooldown(interaction.user.id, "duel")
+    await save_data()
     
     embed = discord.Embed(
         title="⚔️ Duel Challenge!",
@@ -1465,9 +3507,9 @@ async def duel(interaction: discord.Interaction, user: discord.Member, amount: s
     
     embed.add_field(name="💰 Stakes", value=f"{parsed_amount:,} 🪙", inline=True)
     embed.add_field(name="🎯 Rules", value="Winner takes all!\nCoinflip decides the victor", inline=True)
-    embed.add_field(name="⏰ Expires", value="60 seconds", inline=True)
+    embed.add_field(name="⏰ Expires", value=f"<t:{int(pending_duels[duel_key]['expires_at'])}:R>", inline=True)
     
-    embed.add_field(name="💪 Challenger Balance", value=f"{challenger_balance:,} 🪙", inline=True)
+    embed.add_field(name="💪 Challenger Balance", value=f"{challenger_balance:,} 🪙 (stake held)", inline=True)
     embed.add_field(name="🎲 Challenged Balance", value=f"{challenged_balance:,} 🪙", inline=True)
     embed.add_field(name="‎", value="‎", inline=True)
     
@@ -1475,33 +3517,155 @@ async def duel(interaction: discord.Interaction, user: discord.Member, amount: s
     
     view = DuelAcceptView(interaction.user.id, user.id, parsed_amount)
     await interaction.response.send_message(embed=embed, view=view)
+    
+    try:
+        message = await interaction.original_response()
+        if duel_key in pending_duels:
+            pending_duels[duel_key]['message_id'] = message.id
+    except Exception as e:
+        print(f"⚠️ Could not store duel message: {e}")
 
-# ===== GIFT SYSTEM =====
-
-@bot.tree.command(name="gift", description="Gift tokens to another user (max 3k per day)")
-async def gift(interaction: discord.Interaction, user: discord.Member, amount: str):
-    if not has_linked_roblox(interaction.user.id):
+@duel_group.command(name="open", description="Post an open duel anyone with a similar stake can take")
+async def duel_open(interaction: discord.Interaction, amount: str):
+    parsed_amount = interaction.extras["amount"]
+    
+    if str(interaction.user.id) in duel_queue_index:
+        await interaction.response.send_message("❌ You already have an open challenge! Use `/duel cancel` to withdraw it.", ephemeral=True)
+        return
+    
+    balance = get_user_balance(interaction.user.id)
+    if balance < parsed_amount:
+        await interaction.response.send_message(f"❌ You need **{parsed_amount - balance:,}** more tokens for this stake!", ephemeral=True)
+        return
+    
+    bucket = get_duel_bucket(parsed_amount)
+    opponent = pop_duel_queue(bucket)
+    set_short_cooldown(interaction.user.id, "duel")
+    
+    if not opponent:
+        # Nobody waiting in this bucket, escrow the stake and join the queue
+        new_balance = update_balance(interaction.user.id, -parsed_amount, "duel")
+        entry = {
+            'user_id': interaction.user.id,
+            'amount': parsed_amount,
+            'expires_at': time.time() + DUEL_QUEUE_TIMEOUT,
+            'channel_id': interaction.channel_id
+        }
+        add_to_duel_queue(entry)
+        schedule_deadline(f"duelq:{interaction.user.id}", entry['expires_at'], expire_open_duel, str(interaction.user.id))
+        await save_data()
+        
         embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
+            title="⚔️ Open Duel Challenge!",
+            description=f"{interaction.user.mention} is looking for an opponent!",
+            color=0xFFD700
         )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+        embed.add_field(name="💰 Stakes", value=f"{parsed_amount:,} 🪙", inline=True)
+        embed.add_field(name="🎯 Stake Range", value=f"{format_duel_bucket(bucket)} 🪙", inline=True)
+        embed.add_field(name="⏰ Expires", value=f"<t:{int(entry['expires_at'])}:R>", inline=True)
+        embed.add_field(name="💪 Balance", value=f"{new_balance:,} 🪙 (stake held)", inline=True)
+        embed.set_footer(text="Use /duel open with a stake in the same range to take this challenge!")
+        
+        await interaction.response.send_message(embed=embed)
+        
+        try:
+            message = await interaction.original_response()
+            entry['message_id'] = message.id
+        except Exception as e:
+            print(f"⚠️ Could not store open duel message: {e}")
         return
     
-    if not can_use_short_cooldown(interaction.user.id, "gift", 3):
-        await interaction.response.send_message("⏰ Please wait 3 seconds between gifts!", ephemeral=True)
-        return
+    # Matched: play for the smaller stake and return any extra escrow
+    stake = min(parsed_amount, opponent['amount'])
+    opponent_id = opponent['user_id']
+    winner_id = random.choice([interaction.user.id, opponent_id])
+    loser_id = opponent_id if winner_id == interaction.user.id else interaction.user.id
     
-    parsed_amount = parse_amount(amount)
-    if parsed_amount is None or parsed_amount <= 0:
-        await interaction.response.send_message("❌ Invalid amount! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
+    try:
+        async with economy.transaction(interaction.user.id, opponent_id, source="duel") as tx:
+            tx.debit(interaction.user.id, stake)
+            tx.credit(opponent_id, opponent['amount'] - stake)
+            tx.credit(winner_id, stake * 2)
+            balances = {winner_id: tx.balance(winner_id), loser_id: tx.balance(loser_id)}
+    except InsufficientFunds as e:
+        # Put the opponent back at the front of their queue so they don't lose their spot
+        add_to_duel_queue(opponent, front=True)
+        schedule_deadline(f"duelq:{opponent_id}", opponent['expires_at'], expire_open_duel, str(opponent_id))
+        await interaction.response.send_message(f"❌ You need **{e.shortfall:,}** more tokens for this stake!", ephemeral=True)
         return
+    await save_data()
     
-    if parsed_amount > 3000:
-        await interaction.response.send_message("❌ You can only gift up to 3,000 tokens per day!", ephemeral=True)
+    embed = discord.Embed(title="⚔️ Open Duel Complete!", color=0xFFD700)
+    embed.add_field(name="Winner", value=f"🏆 <@{winner_id}>", inline=True)
+    embed.add_field(name="Loser", value=f"💀 <@{loser_id}>", inline=True)
+    embed.add_field(name="Amount", value=f"{stake:,} 🪙", inline=True)
+    embed.add_field(name="Winner's Balance", value=f"{balances[winner_id]:,} 🪙", inline=True)
+    embed.add_field(name="Loser's Balance", value=f"{balances[loser_id]:,} 🪙", inline=True)
+    embed.add_field(name="‎", value="‎", inline=True)
+    embed.set_footer(text="The coin has decided!")
+    
+    await interaction.response.send_message(content=f"<@{opponent_id}>", embed=embed)
+    await edit_open_duel_message(opponent, embed)
+    
+    await log_action(
+        "DUEL",
+        "⚔️ Open Duel Completed",
+        f"Open duel between <@{opponent_id}> and {interaction.user.mention}",
+        color=0xFFD700,
+        user=interaction.user,
+        fields=[
+            {"name": "Challenger", "value": f"<@{opponent_id}>", "inline": True},
+            {"name": "Matched By", "value": interaction.user.mention, "inline": True},
+            {"name": "Amount", "value": f"{stake:,} 🪙", "inline": True},
+            {"name": "Winner", "value": f"<@{winner_id}>", "inline": True}
+        ]
+    )
+
+@duel_group.command(name="cancel", description="Withdraw your open duel challenge")
+async def duel_cancel(interaction: discord.Interaction):
+    entry = remove_from_duel_queue(interaction.user.id)
+    if not entry:
+        await interaction.response.send_message("❌ You don't have an open challenge!", ephemeral=True)
         return
     
+    new_balance = update_balance(interaction.user.id, entry['amount'], "duel")
+    await save_data()
+    
+    embed = discord.Embed(
+        title="❌ Open Duel Withdrawn",
+        description=f"{interaction.user.mention} withdrew their open challenge.",
+        color=0x808080
+    )
+    embed.add_field(name="Refunded", value=f"{entry['amount']:,} 🪙", inline=True)
+    await edit_open_duel_message(entry, embed)
+    
+    await interaction.response.send_message(f"✅ Open challenge withdrawn. **{entry['amount']:,}** 🪙 refunded (balance: {new_balance:,} 🪙)", ephemeral=True)
+
+bot.tree.add_command(duel_group)
+
+# ===== GIFT SYSTEM =====
+
+async def send_gift(from_id, to_id, amount):
+    """Gift tokens within the sender's 3k daily limit, returns (daily_total, error)"""
+    today = datetime.now().date().isoformat()
+    daily_totals = giveaway_daily_totals.setdefault(str(from_id), {})
+    try:
+        async with economy.transaction(from_id, to_id, source="gift") as tx:
+            # Checked under the sender's lock, so overlapping gifts can't all fit under the limit
+            gifted = daily_totals.get(today, 0)
+            if gifted + amount > 3000:
+                return gifted, f"❌ You can only gift {3000 - gifted:,} more tokens today!"
+            tx.transfer(from_id, to_id, amount)
+    except InsufficientFunds as e:
+        return gifted, f"❌ Need **{e.shortfall:,}** more tokens!"
+    # Counted once the transfer committed, before anything else can run
+    daily_totals[today] = gifted + amount
+    return daily_totals[today], None
+
+@bot.tree.command(name="gift", description="Gift tokens to another user (max 3k per day)")
+async def gift(interaction: discord.Interaction, user: discord.Member, amount: str):
+    parsed_amount = interaction.extras["amount"]
+    
     if user.id == interaction.user.id:
         await interaction.response.send_message("❌ Can't gift to yourself!", ephemeral=True)
         return
@@ -1510,28 +3674,11 @@ async def gift(interaction: discord.Interaction, user: discord.Member, amount: s
         await interaction.response.send_message("❌ Can't gift to bots!", ephemeral=True)
         return
     
-    user_id = str(interaction.user.id)
-    today = datetime.now().date().isoformat()
-    
-    if user_id not in giveaway_daily_totals:
-        giveaway_daily_totals[user_id] = {}
-    
-    if today not in giveaway_daily_totals[user_id]:
-        giveaway_daily_totals[user_id][today] = 0
-    
-    if giveaway_daily_totals[user_id][today] + parsed_amount > 3000:
-        remaining = 3000 - giveaway_daily_totals[user_id][today]
-        await interaction.response.send_message(f"❌ You can only gift {remaining:,} more tokens today!", ephemeral=True)
+    daily_total, error = await send_gift(interaction.user.id, user.id, parsed_amount)
+    if error:
+        await interaction.response.send_message(error, ephemeral=True)
         return
     
-    giver_balance = get_user_balance(interaction.user.id)
-    if giver_balance < parsed_amount:
-        await interaction.response.send_message(f"❌ Need **{parsed_amount - giver_balance:,}** more tokens!", ephemeral=True)
-        return
-    
-    update_balance(interaction.user.id, -parsed_amount)
-    update_balance(user.id, parsed_amount)
-    giveaway_daily_totals[user_id][today] += parsed_amount
     set_short_cooldown(interaction.user.id, "gift")
     await save_data()
     
@@ -1545,7 +3692,7 @@ async def gift(interaction: discord.Interaction, user: discord.Member, amount: s
             {"name": "Giver", "value": interaction.user.mention, "inline": True},
             {"name": "Receiver", "value": user.mention, "inline": True},
             {"name": "Amount", "value": f"{parsed_amount:,} 🪙", "inline": True},
-            {"name": "Daily Total", "value": f"{giveaway_daily_totals[user_id][today]:,}/3,000 🪙", "inline": True}
+            {"name": "Daily Total", "value": f"{daily_total:,}/3,000 🪙", "inline": True}
         ]
     )
     
@@ -1554,38 +3701,45 @@ async def gift(interaction: discord.Interaction, user: discord.Member, amount: s
 
 # ===== SHOP SYSTEM =====
 
-class PurchaseConfirmView(discord.ui.View):
-    def __init__(self, item, user_id):
-        super().__init__(timeout=60)
-        self.item = item
+class PurchaseConfirmView(GuildView):
+    def __init__(self, reservation, user_id):
+        super().__init__(timeout=SHOP_RESERVATION_TIMEOUT)
+        # The reservation this view was opened for, a newer one (even for the same item) isn't its to touch
+        self.reservation = reservation
         self.user_id = user_id
     
+    def release(self):
+        if shop_reservations.get(str(self.user_id)) is self.reservation:
+            release_shop_reservation(self.user_id)
+    
+    async def on_timeout(self):
+        self.release()
+    
     @discord.ui.button(label="✅ Confirm Purchase", style=discord.ButtonStyle.green)
     async def confirm_purchase(self, interaction: discord.Interaction, button: discord.ui.Button):
         if interaction.user.id != self.user_id:
             await interaction.response.send_message("❌ This is not your purchase!", ephemeral=True)
             return
         
-        balance = get_user_balance(interaction.user.id)
-        if balance < self.item['price']:
-            await interaction.response.send_message(
-                f"❌ Insufficient funds! You need **{self.item['price'] - balance:,}** more tokens.",
-                ephemeral=True
-            )
+        async with economy.transaction(interaction.user.id, source="shop") as tx:
+            item, quantity, error = commit_shop_reservation(tx, interaction.user.id, self.reservation)
+            new_balance = tx.balance(interaction.user.id)
+        if error:
+            await interaction.response.edit_message(content=error, embed=None, view=None)
             return
         
-        new_balance = update_balance(interaction.user.id, -self.item['price'])
+        self.stop()
         await save_data()
         
-        await log_purchase(interaction.user, self.item['name'], self.item['price'])
+        await log_purchase(interaction.user, item['name'], item['price'], quantity)
         
         embed = discord.Embed(title="✅ Purchase Successful!", color=0x00ff00)
-        embed.add_field(name="Item", value=self.item['name'], inline=True)
-        embed.add_field(name="Cost", value=f"{self.item['price']:,} 🪙", inline=True)
+        embed.add_field(name="Item", value=item['name'] if quantity == 1 else f"{item['name']} x{quantity:,}", inline=True)
+        embed.add_field(name="Cost", value=f"{item['price'] * quantity:,} 🪙", inline=True)
         embed.add_field(name="New Balance", value=f"{new_balance:,} 🪙", inline=True)
         
-        if self.item.get('description'):
-            embed.add_field(name="Description", value=self.item['description'], inline=False)
+        if item.get('description'):
+            embed.add_field(name="Description", value=item['description'], inline=False)
         
         embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
         await interaction.response.edit_message(embed=embed, view=None)
@@ -1596,30 +3750,75 @@ class PurchaseConfirmView(discord.ui.View):
             await interaction.response.send_message("❌ This is not your purchase!", ephemeral=True)
             return
         
+        self.release()
+        self.stop()
         embed = discord.Embed(title="❌ Purchase Cancelled", description="Your purchase has been cancelled.", color=0xff4444)
         await interaction.response.edit_message(embed=embed, view=None)
 
-class ShopView(discord.ui.View):
-    def __init__(self, user_balance):
+def get_shop_page_count():
+    """Get the number of shop pages"""
+    return max(1, (len(shop_data) + SHOP_PAGE_SIZE - 1) // SHOP_PAGE_SIZE)
+
+def build_shop_embed(balance, page):
+    """Build the shop embed for one page of items"""
+    embed = discord.Embed(title="🛒 Token Shop", color=0x0099ff)
+    embed.add_field(name="Your Balance", value=f"**{balance:,}** 🪙", inline=False)
+    
+    start_idx = (page - 1) * SHOP_PAGE_SIZE
+    items_text = ""
+    for item in shop_data[start_idx:start_idx + SHOP_PAGE_SIZE]:
+        affordable = "✅" if balance >= item['price'] else "❌"
+        stock_text = f" • 📦 {format_stock(item)}" if item.get('stock') is not None else ""
+        items_text += f"{affordable} **{item['name']}** - {item['price']:,} 🪙{stock_text}\n"
+        if item.get('description'):
+            items_text += f"    *{item['description'][:50]}{'...' if len(item['description']) > 50 else ''}*\n"
+        items_text += "\n"
+    
+    embed.add_field(name="Available Items", value=items_text, inline=False)
+    embed.set_footer(text=f"Page {page}/{get_shop_page_count()} • {len(shop_data)} items • Click the buttons below to purchase items!")
+    return embed
+
+class ShopView(GuildView):
+    def __init__(self, user_balance, page=1):
         super().__init__(timeout=300)
         self.user_balance = user_balance
+        self.page = page
         
-        for i, item in enumerate(shop_data[:25]):
-            affordable = user_balance >= item['price']
+        start_idx = (page - 1) * SHOP_PAGE_SIZE
+        for i in range(start_idx, min(start_idx + SHOP_PAGE_SIZE, len(shop_data))):
+            item = shop_data[i]
+            available = get_available_stock(item)
+            affordable = user_balance >= item['price'] and (available is None or available > 0)
             button = discord.ui.Button(
-                label=f"{item['name']} - {item['price']:,}🪙",
+                label=f"{item['name']} - {item['price']:,}🪙"[:80],
                 style=discord.ButtonStyle.green if affordable else discord.ButtonStyle.grey,
                 disabled=not affordable,
                 custom_id=f"buy_{i}"
             )
             button.callback = self.create_buy_callback(i)
             self.add_item(button)
+        
+        if get_shop_page_count() > 1:
+            previous_button = discord.ui.Button(label="◀ Previous", style=discord.ButtonStyle.blurple, disabled=page <= 1, row=4)
+            previous_button.callback = self.create_page_callback(page - 1)
+            self.add_item(previous_button)
+            
+            next_button = discord.ui.Button(label="Next ▶", style=discord.ButtonStyle.blurple, disabled=page >= get_shop_page_count(), row=4)
+            next_button.callback = self.create_page_callback(page + 1)
+            self.add_item(next_button)
     
     def create_buy_callback(self, item_index):
         async def buy_callback(interaction):
             await self.show_purchase_confirmation(interaction, item_index)
         return buy_callback
     
+    def create_page_callback(self, page):
+        async def page_callback(interaction):
+            page_number = max(1, min(page, get_shop_page_count()))
+            balance = get_user_balance(interaction.user.id)
+            await interaction.response.edit_message(embed=build_shop_embed(balance, page_number), view=ShopView(balance, page_number))
+        return page_callback
+    
     async def show_purchase_confirmation(self, interaction, item_index):
         if item_index >= len(shop_data):
             await interaction.response.send_message("❌ Invalid item!", ephemeral=True)
@@ -1628,11 +3827,9 @@ class ShopView(discord.ui.View):
         item = shop_data[item_index]
         balance = get_user_balance(interaction.user.id)
         
-        if balance < item['price']:
-            await interaction.response.send_message(
-                f"❌ Insufficient funds! You need **{item['price'] - balance:,}** more tokens.",
-                ephemeral=True
-            )
+        error = reserve_shop_item(interaction.user.id, item)
+        if error:
+            await interaction.response.send_message(error, ephemeral=True)
             return
         
         embed = discord.Embed(title="🛒 Purchase Confirmation", color=0xFFD700)
@@ -1644,76 +3841,42 @@ class ShopView(discord.ui.View):
         if item.get('description'):
             embed.add_field(name="Description", value=item['description'], inline=False)
         
-        embed.set_footer(text="Are you sure you want to buy this item?")
+        if item.get('stock') is not None:
+            embed.add_field(name="Stock", value=f"1 reserved for you • {format_stock(item)}", inline=True)
+        
+        embed.set_footer(text=f"Your item is reserved for {SHOP_RESERVATION_TIMEOUT} seconds. Are you sure you want to buy this item?")
         
-        view = PurchaseConfirmView(item, interaction.user.id)
+        view = PurchaseConfirmView(shop_reservations[str(interaction.user.id)], interaction.user.id)
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 @bot.tree.command(name="shop", description="Browse the token shop")
-async def shop(interaction: discord.Interaction):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
+async def shop(interaction: discord.Interaction, page: int = 1):
     balance = get_user_balance(interaction.user.id)
     
-    embed = discord.Embed(title="🛒 Token Shop", color=0x0099ff)
-    embed.add_field(name="Your Balance", value=f"**{balance:,}** 🪙", inline=False)
-    
     if not shop_data:
-        embed.description = "🚫 No items available!"
+        embed = discord.Embed(title="🛒 Token Shop", description="🚫 No items available!", color=0x0099ff)
+        embed.add_field(name="Your Balance", value=f"**{balance:,}** 🪙", inline=False)
         await interaction.response.send_message(embed=embed, ephemeral=True)
         return
     
-    items_text = ""
-    for item in shop_data[:10]:
-        affordable = "✅" if balance >= item['price'] else "❌"
-        items_text += f"{affordable} **{item['name']}** - {item['price']:,} 🪙\n"
-        if item.get('description'):
-            items_text += f"    *{item['description'][:50]}{'...' if len(item['description']) > 50 else ''}*\n"
-        items_text += "\n"
-    
-    embed.add_field(name="Available Items", value=items_text, inline=False)
-    embed.set_footer(text="Click the buttons below to purchase items!")
-    
-    view = ShopView(balance)
+    page = max(1, min(page, get_shop_page_count()))
+    embed = build_shop_embed(balance, page)
+    view = ShopView(balance, page)
     await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
 @bot.tree.command(name="buy", description="Buy an item from the shop")
 async def buy(interaction: discord.Interaction, item_name: str, quantity: int = 1):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
-    if not can_use_short_cooldown(interaction.user.id, "buy", 3):
-        await interaction.response.send_message("⏰ Please wait 3 seconds between purchases!", ephemeral=True)
-        return
-    
     if quantity <= 0:
         await interaction.response.send_message("❌ Quantity must be at least 1!", ephemeral=True)
         return
     
-    item = None
-    for shop_item in shop_data:
-        if shop_item['name'].lower() == item_name.lower():
-            item = shop_item
-            break
+    item = find_shop_item(item_name)
     
     if not item:
-        similar = [i['name'] for i in shop_data if item_name.lower() in i['name'].lower()]
+        similar = [i['name'] for i in search_shop_items(item_name)]
         error_msg = f"❌ Item **{item_name}** not found!"
         if similar:
-            error_msg += f"\n\nDid you mean: {', '.join(similar[:3])}"
+            error_msg += f"\n\nDid you mean: {', '.join(similar)}"
         await interaction.response.send_message(error_msg, ephemeral=True)
         return
     
@@ -1730,7 +3893,11 @@ async def buy(interaction: discord.Interaction, item_name: str, quantity: int =
         )
         return
     
-    new_balance = update_balance(interaction.user.id, -total_cost)
+    new_balance, error = await purchase_shop_item(interaction.user.id, item, quantity)
+    if error:
+        await interaction.response.send_message(error, ephemeral=True)
+        return
+    
     set_short_cooldown(interaction.user.id, "buy")
     await save_data()
     
@@ -1742,44 +3909,112 @@ async def buy(interaction: discord.Interaction, item_name: str, quantity: int =
     embed.add_field(name="Total Cost", value=f"{total_cost:,} 🪙", inline=True)
     embed.add_field(name="New Balance", value=f"{new_balance:,} 🪙", inline=False)
     
+    if item.get('stock') is not None:
+        embed.add_field(name="Stock", value=format_stock(item), inline=True)
+    
     if item.get('description'):
         embed.add_field(name="Description", value=item['description'], inline=False)
     
     embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
+@buy.autocomplete('item_name')
+async def buy_item_autocomplete(interaction: discord.Interaction, current: str):
+    return [
+        discord.app_commands.Choice(name=f"{item['name']} - {item['price']:,} 🪙"[:100], value=item['name'][:100])
+        for item in search_shop_items(current, 25)
+    ]
+
+@bot.tree.command(name="inventory", description="View the items you own")
+async def inventory(interaction: discord.Interaction, page: int = 1):
+    user_id = str(interaction.user.id)
+    items = user_inventory.get(user_id, {})
+    entry_ids = ledger_user_index.get(user_id, [])
+    
+    embed = discord.Embed(title="🎒 Your Inventory", color=0x0099ff)
+    embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
+    
+    if not items:
+        embed.description = "🚫 You don't own any items yet! Buy some with `/shop`."
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    owned_text = "\n".join(f"• **{name}** x{quantity:,}" for name, quantity in sorted(items.items()))
+    embed.add_field(name="Owned Items", value=owned_text[:1024], inline=False)
+    
+    total_pages = max(1, (len(entry_ids) + INVENTORY_PAGE_SIZE - 1) // INVENTORY_PAGE_SIZE)
+    page = max(1, min(page, total_pages))
+    end_idx = len(entry_ids) - (page - 1) * INVENTORY_PAGE_SIZE
+    page_ids = entry_ids[max(0, end_idx - INVENTORY_PAGE_SIZE):end_idx]
+    history_text = "\n".join(format_ledger_grant(inventory_ledger[entry_id]) for entry_id in reversed(page_ids))
+    embed.add_field(name="History (⏳ pending delivery, ✅ delivered)", value=history_text, inline=False)
+    embed.set_footer(text=f"Page {page}/{total_pages} • {len(entry_ids)} records")
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 # ===== ADMIN COMMANDS =====
 
 def admin_check(interaction: discord.Interaction) -> bool:
     return is_admin(interaction.user)
 
-class AddItemModal(discord.ui.Modal, title="Add Shop Item"):
+def home_admin_check(interaction: discord.Interaction) -> bool:
+    """Admin check for settings shared by every guild, only the home guild may change them"""
+    return interaction.guild_id == home_guild_id and is_admin(interaction.user)
+
+def parse_stock_limit(value, allow_none=False):
+    """Parse a stock or per-user limit input, returns (ok, value) where blank means unlimited"""
+    value = value.strip().lower()
+    if not value or (allow_none and value in ("none", "unlimited")):
+        return True, None
+    if not value.isdigit():
+        return False, None
+    return True, int(value)
+
+def format_stock_limit(item):
+    """Format an item's stock and per-user limit for admin views"""
+    stock = f"{item['stock']:,}" if item.get('stock') is not None else "Unlimited"
+    limit = f"{item['per_user_limit']:,}" if item.get('per_user_limit') is not None else "Unlimited"
+    return f"{stock} in stock • {limit} per user"
+
+class AddItemModal(GuildModal, title="Add Shop Item"):
     name = discord.ui.TextInput(label="Item Name")
     price = discord.ui.TextInput(label="Price (supports k, m, b suffixes)")
     description = discord.ui.TextInput(label="Description", required=False, style=discord.TextStyle.long)
+    stock = discord.ui.TextInput(label="Stock (blank = unlimited)", required=False, placeholder="10")
+    per_user_limit = discord.ui.TextInput(label="Per-User Limit (blank = unlimited)", required=False, placeholder="1")
     
     async def on_submit(self, interaction: discord.Interaction):
         if not admin_check(interaction):
             await interaction.response.send_message("❌ Admin only!", ephemeral=True)
             return
             
+        stock_ok, stock_val = parse_stock_limit(self.stock.value)
+        limit_ok, limit_val = parse_stock_limit(self.per_user_limit.value)
+        if not stock_ok or not limit_ok:
+            await interaction.response.send_message("❌ Stock and per-user limit must be whole numbers (0 or more) or blank!", ephemeral=True)
+            return
+        
         price_val = parse_amount(self.price.value)
         if price_val is None or price_val <= 0:
             await interaction.response.send_message("❌ Invalid price! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
             return
         
-        for item in shop_data:
-            if item['name'].lower() == self.name.value.lower():
-                await interaction.response.send_message("❌ Item with this name already exists!", ephemeral=True)
-                return
+        if find_shop_item(self.name.value):
+            await interaction.response.send_message("❌ Item with this name already exists!", ephemeral=True)
+            return
         
         new_item = {
             'name': self.name.value,
             'price': price_val,
             'description': self.description.value or ""
         }
+        if stock_val is not None:
+            new_item['stock'] = stock_val
+        if limit_val is not None:
+            new_item['per_user_limit'] = limit_val
         
         shop_data.append(new_item)
+        build_shop_index()
         await save_data()
         
         await log_action(
@@ -1791,6 +4026,7 @@ class AddItemModal(discord.ui.Modal, title="Add Shop Item"):
             fields=[
                 {"name": "Item Name", "value": new_item['name'], "inline": True},
                 {"name": "Price", "value": f"{new_item['price']:,} 🪙", "inline": True},
+                {"name": "Stock", "value": format_stock_limit(new_item), "inline": True},
                 {"name": "Description", "value": new_item['description'] or "No description", "inline": False}
             ]
         )
@@ -1798,14 +4034,16 @@ class AddItemModal(discord.ui.Modal, title="Add Shop Item"):
         embed = discord.Embed(title="✅ Item Added!", color=0x00ff00)
         embed.add_field(name="Name", value=new_item['name'], inline=False)
         embed.add_field(name="Price", value=f"{new_item['price']:,} 🪙", inline=False)
+        embed.add_field(name="Stock", value=format_stock_limit(new_item), inline=False)
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-class UpdateItemModal(discord.ui.Modal, title="Update Shop Item"):
+class UpdateItemModal(GuildModal, title="Update Shop Item"):
     item_number = discord.ui.TextInput(label="Item Number", placeholder="Enter number (1, 2, 3...)")
     name = discord.ui.TextInput(label="New Name (optional)", required=False)
     price = discord.ui.TextInput(label="New Price (optional, supports k, m, b)", required=False)
     description = discord.ui.TextInput(label="New Description (optional)", required=False, style=discord.TextStyle.long)
+    stock_limit = discord.ui.TextInput(label="Stock | Per-User Limit (optional)", required=False, placeholder="10 | 1  (use 'none' for unlimited)")
     
     async def on_submit(self, interaction: discord.Interaction):
         if not admin_check(interaction):
@@ -1821,23 +4059,46 @@ class UpdateItemModal(discord.ui.Modal, title="Update Shop Item"):
             await interaction.response.send_message("❌ Item number must be a valid number!", ephemeral=True)
             return
         
+        stock_update = None
+        if self.stock_limit.value.strip():
+            parts = [part.strip() for part in self.stock_limit.value.split("|")]
+            parsed = [parse_stock_limit(part, allow_none=True) if part else (True, ...) for part in parts]
+            if len(parts) > 2 or not all(ok for ok, _ in parsed):
+                await interaction.response.send_message("❌ Use `stock | limit` with whole numbers, 'none' for unlimited, or leave a side blank!", ephemeral=True)
+                return
+            stock_update = [value for _, value in parsed] + [...] * (2 - len(parsed))
+        
         if self.name.value.strip():
-            for i, item in enumerate(shop_data):
-                if i != item_idx and item['name'].lower() == self.name.value.lower():
-                    await interaction.response.send_message("❌ Item with this name already exists!", ephemeral=True)
-                    return
-            shop_data[item_idx]['name'] = self.name.value.strip()
+            existing_idx = shop_name_index.get(self.name.value.strip().lower())
+            if existing_idx is not None and existing_idx != item_idx:
+                await interaction.response.send_message("❌ Item with this name already exists!", ephemeral=True)
+                return
         
+        new_price = None
         if self.price.value.strip():
             new_price = parse_amount(self.price.value)
             if new_price is None or new_price <= 0:
                 await interaction.response.send_message("❌ Price must be a valid number! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
                 return
+        
+        # Everything is valid, apply it all so the index never sees a half-updated item
+        if self.name.value.strip():
+            shop_data[item_idx]['name'] = self.name.value.strip()
+        
+        if new_price is not None:
             shop_data[item_idx]['price'] = new_price
         
         if self.description.value.strip():
             shop_data[item_idx]['description'] = self.description.value.strip()
         
+        if stock_update:
+            for key, value in zip(('stock', 'per_user_limit'), stock_update):
+                if value is None:
+                    shop_data[item_idx].pop(key, None)
+                elif value is not ...:
+                    shop_data[item_idx][key] = value
+        
+        build_shop_index()
         await save_data()
         
         await log_action(
@@ -1849,6 +4110,7 @@ class UpdateItemModal(discord.ui.Modal, title="Update Shop Item"):
             fields=[
                 {"name": "Item", "value": shop_data[item_idx]['name'], "inline": True},
                 {"name": "Price", "value": f"{shop_data[item_idx]['price']:,} 🪙", "inline": True},
+                {"name": "Stock", "value": format_stock_limit(shop_data[item_idx]), "inline": True},
                 {"name": "Changes Made", "value": "Updated item properties", "inline": False}
             ]
         )
@@ -1856,10 +4118,11 @@ class UpdateItemModal(discord.ui.Modal, title="Update Shop Item"):
         embed = discord.Embed(title="✅ Item Updated!", color=0x0099ff)
         embed.add_field(name="Item", value=shop_data[item_idx]['name'], inline=True)
         embed.add_field(name="Price", value=f"{shop_data[item_idx]['price']:,} 🪙", inline=True)
+        embed.add_field(name="Stock", value=format_stock_limit(shop_data[item_idx]), inline=True)
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-class DeleteItemModal(discord.ui.Modal, title="Delete Shop Item"):
+class DeleteItemModal(GuildModal, title="Delete Shop Item"):
     item_number = discord.ui.TextInput(label="Item Number", placeholder="Enter number (1, 2, 3...)")
     confirmation = discord.ui.TextInput(label="Type 'DELETE' to confirm", placeholder="This cannot be undone!")
     
@@ -1882,6 +4145,7 @@ class DeleteItemModal(discord.ui.Modal, title="Delete Shop Item"):
             return
         
         deleted_item = shop_data.pop(item_idx)
+        build_shop_index()
         await save_data()
         
         await log_action(
@@ -1903,7 +4167,7 @@ class DeleteItemModal(discord.ui.Modal, title="Delete Shop Item"):
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-class ShopManageView(discord.ui.View):
+class ShopManageView(GuildView):
     def __init__(self):
         super().__init__(timeout=300)
     
@@ -1938,9 +4202,78 @@ class ShopManageView(discord.ui.View):
         
         await interaction.response.send_modal(DeleteItemModal())
 
+@bot.tree.command(name="fulfillment", description="View items waiting to be delivered (Admin only)")
+@discord.app_commands.check(admin_check)
+async def fulfillment(interaction: discord.Interaction, user: discord.Member = None, item_name: str = None):
+    if user:
+        entry_ids = (entry_id for entry_id in ledger_user_index.get(str(user.id), []) if not is_fulfilled(entry_id))
+    elif item_name:
+        entry_ids = (entry_id for entry_id in ledger_item_index.get(item_name.strip().lower(), []) if not is_fulfilled(entry_id))
+    else:
+        entry_ids = iter(pending_fulfillment)
+    entry_ids = (entry_id for entry_id in entry_ids if is_current_guild_grant(inventory_ledger[entry_id]))
+    
+    page_ids = [entry_id for _, entry_id in zip(range(INVENTORY_PAGE_SIZE * 2), entry_ids)]
+    guild_pending = sum(1 for entry in pending_fulfillment.values() if is_current_guild_grant(entry))
+    
+    embed = discord.Embed(title="📦 Pending Fulfillment", color=0xff9900)
+    embed.add_field(name="Total Pending", value=f"{guild_pending:,}", inline=True)
+    if user:
+        embed.add_field(name="User", value=user.mention, inline=True)
+    if item_name:
+        embed.add_field(name="Item", value=item_name, inline=True)
+    
+    if page_ids:
+        pending_text = "\n".join(format_ledger_grant(inventory_ledger[entry_id], show_user=True) for entry_id in page_ids)
+        embed.add_field(name="Oldest First", value=pending_text[:1024], inline=False)
+    else:
+        embed.description = "✅ Nothing waiting to be delivered!"
+    
+    embed.set_footer(text="Use /fulfill <record> once an item has been delivered in Roblox")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="fulfill", description="Mark an item as delivered (Admin only)")
+@discord.app_commands.check(admin_check)
+async def fulfill(interaction: discord.Interaction, record: int):
+    if not inventory_ids_ready():
+        await interaction.response.send_message("❌ The ledger is busy, please try again in a moment!", ephemeral=True)
+        return
+    grant = pending_fulfillment.get(record)
+    if grant and is_current_guild_grant(grant):
+        grant = fulfill_ledger_entry(record, interaction.user.id)
+    else:
+        grant = None
+    if not grant:
+        await interaction.response.send_message(f"❌ Record **#{record}** is not pending fulfillment!", ephemeral=True)
+        return
+    
+    await save_data()
+    
+    await log_action(
+        "FULFILL",
+        "📦 Item Delivered",
+        f"**{interaction.user.mention}** delivered **{grant['item']}** x{grant['quantity']} to <@{grant['user_id']}>",
+        color=0x00ff00,
+        user=interaction.user,
+        fields=[
+            {"name": "Record", "value": f"#{grant['id']}", "inline": True},
+            {"name": "Roblox Username", "value": roblox_data.get(grant['user_id'], "Not set"), "inline": True},
+            {"name": "Source", "value": grant['source'], "inline": True}
+        ]
+    )
+    
+    embed = discord.Embed(title="✅ Marked as Delivered", color=0x00ff00)
+    embed.add_field(name="Record", value=f"#{grant['id']}", inline=True)
+    embed.add_field(name="Item", value=f"{grant['item']} x{grant['quantity']}", inline=True)
+    embed.add_field(name="User", value=f"<@{grant['user_id']}>", inline=True)
+    guild_pending = sum(1 for entry in pending_fulfillment.values() if is_current_guild_grant(entry))
+    embed.add_field(name="Remaining", value=f"{guild_pending:,} pending", inline=True)
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 @bot.tree.command(name="addshop", description="Manage shop (Admin only)")
 @discord.app_commands.check(admin_check)
-async def addshop(interaction: discord.Interaction):
+async def addshop(interaction: discord.Interaction, page: int = 1):
     embed = discord.Embed(title="🛍️ Shop Management", color=0xff9900)
     embed.add_field(name="📊 Stats", value=f"**Items:** {len(shop_data)}\n**Status:** {'Active' if shop_data else 'Empty'}", inline=True)
     
@@ -1955,9 +4288,12 @@ async def addshop(interaction: discord.Interaction):
             inline=True
         )
         
-        items_list = "\n".join([f"{i+1}. **{item['name']}** - {item['price']:,} 🪙" for i, item in enumerate(shop_data[:10])])
-        if len(shop_data) > 10:
-            items_list += f"\n... and {len(shop_data) - 10} more items"
+        page = max(1, min(page, get_shop_page_count()))
+        start_idx = (page - 1) * SHOP_PAGE_SIZE
+        page_items = shop_data[start_idx:start_idx + SHOP_PAGE_SIZE]
+        items_list = "\n".join([f"{i}. **{item['name']}** - {item['price']:,} 🪙{' • 📦 ' + format_stock(item) if item.get('stock') is not None else ''}" for i, item in enumerate(page_items, start=start_idx + 1)])
+        if get_shop_page_count() > 1:
+            items_list += f"\n\nPage {page}/{get_shop_page_count()} • use `/addshop page:<n>` to see more"
         embed.add_field(name="🛒 Current Items", value=items_list, inline=False)
     else:
         embed.add_field(name="🛒 Current Items", value="*No items in shop*", inline=False)
@@ -1973,7 +4309,7 @@ async def addshop(interaction: discord.Interaction):
     view = ShopManageView()
     await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
-class ResetConfirmView(discord.ui.View):
+class ResetConfirmView(GuildView):
     def __init__(self, original_user_id):
         super().__init__(timeout=30)
         self.original_user_id = original_user_id
@@ -1984,16 +4320,21 @@ class ResetConfirmView(discord.ui.View):
             await interaction.response.send_message("❌ Only the command user can confirm!", ephemeral=True)
             return
         
-        global user_data, cooldowns, invite_data, user_message_times, roblox_data
+        # Book the wiped balances so the ledger still adds up to the token supply
+        wiped = {user_id: -data['balance'] for user_id, data in user_data.items() if data.get('balance')}
+        if wiped:
+            economy.post(wiped, "admin")
         user_data.clear()
-        cooldowns = {
-            "daily": {}, "work": {}, "crime": {}, "gift": {}, "buy": {}, 
-            "coinflip": {}, "duel": {}, "giveaway": {}, "mines": {}, 
-            "roblox": {}, "doors": {}
-        }
+        cooldowns.clear()
+        cooldowns.update(new_cooldowns())
         invite_data.clear()
-        user_message_times.clear()
-        roblox_data.clear()
+        invited_index.clear()
+        
+        # Roblox links and anti-spam history are shared by every guild
+        if interaction.guild_id == home_guild_id:
+            user_message_times.clear()
+            roblox_data.clear()
+            roblox_name_index.clear()
         await save_data()
         
         success_embed = discord.Embed(
@@ -2058,15 +4399,6 @@ async def resetdata(interaction: discord.Interaction, confirmation_code: str):
 
 @bot.tree.command(name="leaderboard", description="View the top token holders")
 async def leaderboard(interaction: discord.Interaction, page: int = 1):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
     if not user_data:
         embed = discord.Embed(
             title="📊 Token Leaderboard",
@@ -2154,6 +4486,67 @@ async def leaderboard(interaction: discord.Interaction, page: int = 1):
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
+@bot.tree.command(name="economy", description="View the token economy dashboard (Admin only)")
+@discord.app_commands.check(home_admin_check)
+async def economy_dashboard(interaction: discord.Interaction, days: int = 7):
+    days = max(1, min(days, ECONOMY_DAILY_BUCKETS))
+    if shared_store:
+        # Pull in what the other workers have booked since the last save, through save_data
+        # so our own entries are flushed together with the guild files they belong to
+        await save_data()
+    
+    embed = discord.Embed(title="📈 Token Economy", color=0x0099ff, timestamp=datetime.now())
+    embed.add_field(name="Token Supply", value=f"**{economy.get_supply():,}** 🪙", inline=True)
+    embed.add_field(name="Ledger Entries", value=f"{economy.next_entry_id:,}", inline=True)
+    embed.add_field(name="‎", value="‎", inline=True)
+    
+    for source, label in ECONOMY_SOURCES.items():
+        totals = economy.sources.get(source)
+        if not totals:
+            continue
+        embed.add_field(
+            name=label,
+            value=(
+                f"House net: **{economy.get_house_net(source):+,}** 🪙 ({days}d: {economy.get_house_net(source, days):+,} 🪙)\n"
+                f"In {totals['paid_in']:,} • Out {totals['paid_out']:,} • {totals['entries']:,} entries"
+            ),
+            inline=False
+        )
+    
+    if not economy.sources:
+        embed.add_field(name="Sources", value="No transactions yet!", inline=False)
+    embed.set_footer(text="House net = tokens taken from users minus tokens paid out")
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="jobs", description="View background job status (Admin only)")
+@discord.app_commands.check(home_admin_check)
+async def jobs(interaction: discord.Interaction):
+    status_emojis = {"starting": "⏳", "scheduled": "🕒", "running": "🟢", "restarting": "🟠", "stopped": "⚪"}
+    
+    embed = discord.Embed(title="⚙️ Background Jobs", color=0x0099ff, timestamp=datetime.now())
+    for entry in supervisor.jobs.values():
+        value = f"{status_emojis[entry.status]} **{entry.status.title()}** • {entry.restarts} restarts\n"
+        if not entry.periodic:
+            value += f"Service, up since <t:{int(entry.started_at)}:R>" if entry.started_at else "Service, waiting for startup"
+        else:
+            value += f"Every {entry.interval}s" if entry.interval is not None else "Scheduled"
+            if entry.last_run:
+                value += f" • last run <t:{int(entry.last_run)}:R> ({entry.last_duration * 1000:.0f} ms)"
+            else:
+                value += " • hasn't run yet"
+            value += f" • next <t:{int(entry.next_run)}:R>"
+        if entry.last_error:
+            value += f"\nLast error: `{entry.last_error[:200]}`"
+        embed.add_field(name=entry.name, value=value, inline=False)
+    
+    if not supervisor.jobs:
+        embed.add_field(name="Jobs", value="No background jobs started yet!", inline=False)
+    if SHARD_COUNT:
+        embed.set_footer(text=f"Worker {WORKER_ID} • shards {SHARD_IDS or 'all'}")
+    
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
 @bot.tree.command(name="adminbalance", description="Check user balance (Admin only)")
 @discord.app_commands.check(admin_check)
 async def adminbalance(interaction: discord.Interaction, user: discord.Member):
@@ -2181,7 +4574,7 @@ async def addtoken(interaction: discord.Interaction, user: discord.Member, amoun
         await interaction.response.send_message("❌ Invalid amount! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
         return
     
-    new_balance = update_balance(user.id, parsed_amount)
+    new_balance = update_balance(user.id, parsed_amount, "admin")
     await save_data()
     
     await log_action(
@@ -2220,7 +4613,7 @@ async def removetoken(interaction: discord.Interaction, user: discord.Member, am
         )
         return
     
-    new_balance = update_balance(user.id, -parsed_amount)
+    new_balance = update_balance(user.id, -parsed_amount, "admin")
     await save_data()
     
     await log_action(
@@ -2246,29 +4639,36 @@ async def removetoken(interaction: discord.Interaction, user: discord.Member, am
 # ===== MINES GAME =====
 
 class MinesButton(discord.ui.Button):
-    def __init__(self, position, revealed=False, is_mine=False):
+    def __init__(self, position, game_id, nonce=None, revealed=False, is_mine=False, disabled=False):
         self.position = position
         self.revealed = revealed
         self.is_mine = is_mine
         
         # Calculate row (0-4) for the 5x5 grid
         row = position // 5
+        # The nonce is per game, so a board from an earlier game never matches this one
+        custom_id = f"{game_id}_{nonce}_{position}" if nonce else f"{game_id}_{position}"
         
-        if revealed:
+        if disabled and not revealed:
+            super().__init__(style=discord.ButtonStyle.secondary, label="⬜", disabled=True, row=row, custom_id=custom_id)
+        elif revealed:
             if is_mine:
-                super().__init__(style=discord.ButtonStyle.danger, label="💣", disabled=True, row=row)
+                super().__init__(style=discord.ButtonStyle.danger, label="💣", disabled=True, row=row, custom_id=custom_id)
             else:
-                super().__init__(style=discord.ButtonStyle.success, label="💎", disabled=True, row=row)
+                super().__init__(style=discord.ButtonStyle.success, label="💎", disabled=True, row=row, custom_id=custom_id)
         else:
-            super().__init__(style=discord.ButtonStyle.secondary, label="⬜", row=row)
+            super().__init__(style=discord.ButtonStyle.secondary, label="⬜", row=row, custom_id=custom_id)
     
     async def callback(self, interaction: discord.Interaction):
-        game_id = f"{interaction.user.id}_mines"
-        if game_id not in active_mines_games:
-            await interaction.response.send_message("❌ This game has expired!", ephemeral=True)
+        game_id = self.view.game_id
+        if interaction.user.id != int(game_id.split('_')[0]):
+            await interaction.response.send_message("❌ This is not your game!", ephemeral=True)
             return
         
-        game = active_mines_games[game_id]
+        game = active_mines_games.get(game_id)
+        if not game or game.get('nonce') != self.view.nonce:
+            await interaction.response.send_message("❌ This game has expired!", ephemeral=True)
+            return
         
         if game.get('game_over') or self.position in game['revealed']:
             await interaction.response.defer()
@@ -2280,17 +4680,16 @@ class MinesButton(discord.ui.Button):
             
             for child in self.view.children:
                 if isinstance(child, MinesButton):
+                    child.disabled = True
                     if child.position in game['mines']:
                         child.revealed = True
                         child.is_mine = True
                         child.style = discord.ButtonStyle.danger
                         child.label = "💣"
-                        child.disabled = True
                     elif child.position in game['revealed']:
                         child.revealed = True
                         child.style = discord.ButtonStyle.success
                         child.label = "💎"
-                        child.disabled = True
             
             embed = discord.Embed(
                 title="💣 Mines Game - YOU LOST!",
@@ -2299,12 +4698,12 @@ class MinesButton(discord.ui.Button):
             )
             embed.add_field(name="Bet Amount", value=f"{game['bet']:,} 🪙", inline=True)
             embed.add_field(name="Safe Spots Found", value=f"{len(game['revealed']) - 1}", inline=True)
-            embed.add_field(name="Multiplier", value=f"{MINES_MULTIPLIERS.get(len(game['revealed']) - 1, 1.0):.2f}x", inline=True)
+            embed.add_field(name="Multiplier", value=f"{get_mines_multiplier(game['mines_count'], len(game['revealed']) - 1):.2f}x", inline=True)
             embed.set_footer(text="Better luck next time!")
             
-            await interaction.response.edit_message(embed=embed, view=self.view)
+            end_mines_game(game_id)
             
-            del active_mines_games[game_id]
+            await interaction.response.edit_message(embed=embed, view=self.view)
             return
         
         game['revealed'].append(self.position)
@@ -2313,7 +4712,7 @@ class MinesButton(discord.ui.Button):
         self.label = "💎"
         self.disabled = True
         
-        current_multiplier = MINES_MULTIPLIERS.get(len(game['revealed']), 1.0)
+        current_multiplier = get_mines_multiplier(game['mines_count'], len(game['revealed']))
         potential_win = int(game['bet'] * current_multiplier)
         
         embed = discord.Embed(
@@ -2331,26 +4730,21 @@ class MinesButton(discord.ui.Button):
         
         await interaction.response.edit_message(embed=embed, view=self.view)
 
-class MinesView(discord.ui.View):
-    def __init__(self, game_id):
-        super().__init__(timeout=300)
+class MinesView(GuildView):
+    def __init__(self, game_id, game, finished=False):
+        # Expiry is handled by the deadline scheduler so the view survives restarts,
+        # end_mines_game stops it when the game ends
+        super().__init__(timeout=None)
         self.game_id = game_id
+        self.nonce = game.get('nonce')
         
-        # Create the 5x5 grid (25 buttons in rows 0-4)
+        # Create the 5x5 grid (25 buttons in rows 0-4), a finished board shows the mines and can't be clicked
         for i in range(25):
-            self.add_item(MinesButton(i))
+            revealed = i in game['revealed'] or (finished and i in game['mines'])
+            self.add_item(MinesButton(i, game_id, self.nonce, revealed=revealed, is_mine=i in game['mines'] and revealed, disabled=finished))
 
 @bot.tree.command(name="cashout", description="Cash out from your current mines game")
 async def cashout(interaction: discord.Interaction):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
     game_id = f"{interaction.user.id}_mines"
     if game_id not in active_mines_games:
         await interaction.response.send_message("❌ You don't have an active mines game! Use `/mines` to start one.", ephemeral=True)
@@ -2362,10 +4756,11 @@ async def cashout(interaction: discord.Interaction):
         await interaction.response.send_message("❌ You haven't revealed any gems yet! Click some squares first.", ephemeral=True)
         return
     
-    multiplier = MINES_MULTIPLIERS.get(len(game['revealed']), 1.0)
+    multiplier = get_mines_multiplier(game['mines_count'], len(game['revealed']))
     winnings = int(game['bet'] * multiplier)
     
-    update_balance(interaction.user.id, winnings)
+    end_mines_game(game_id)
+    update_balance(interaction.user.id, winnings, "mines")
     await save_data()
     
     embed = discord.Embed(
@@ -2382,8 +4777,7 @@ async def cashout(interaction: discord.Interaction):
     embed.set_footer(text="Congratulations!")
     
     await interaction.response.send_message(embed=embed)
-    
-    del active_mines_games[game_id]
+    await edit_mines_board(game_id, game, embed)
     
     await log_action(
         "MINES",
@@ -2401,31 +4795,7 @@ async def cashout(interaction: discord.Interaction):
 
 @bot.tree.command(name="mines", description="Play mines game - find gems to multiply your bet!")
 async def mines(interaction: discord.Interaction, amount: str, mines_count: int):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
-    if not can_use_short_cooldown(interaction.user.id, "mines", 10):
-        await interaction.response.send_message("⏰ Please wait 10 seconds between mines games!", ephemeral=True)
-        return
-    
-    parsed_amount = parse_amount(amount)
-    if parsed_amount is None or parsed_amount <= 0:
-        await interaction.response.send_message("❌ Invalid amount! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
-        return
-    
-    if parsed_amount < mines_config["min_bet"]:
-        await interaction.response.send_message(f"❌ Minimum bet is {mines_config['min_bet']:,} tokens!", ephemeral=True)
-        return
-    
-    if parsed_amount > mines_config["max_bet"]:
-        await interaction.response.send_message(f"❌ Maximum bet is {mines_config['max_bet']:,} tokens!", ephemeral=True)
-        return
+    parsed_amount = interaction.extras["amount"]
     
     if mines_count < mines_config["min_mines"] or mines_count > mines_config["max_mines"]:
         await interaction.response.send_message(f"❌ Number of mines must be between {mines_config['min_mines']} and {mines_config['max_mines']}!", ephemeral=True)
@@ -2436,11 +4806,13 @@ async def mines(interaction: discord.Interaction, amount: str, mines_count: int)
         await interaction.response.send_message(f"❌ You need **{parsed_amount - balance:,}** more tokens to play!", ephemeral=True)
         return
     
-    update_balance(interaction.user.id, -parsed_amount)
-    set_short_cooldown(interaction.user.id, "mines")
-    await save_data()
-    
     game_id = f"{interaction.user.id}_mines"
+    if game_id in active_mines_games:
+        await interaction.response.send_message("❌ You already have an active mines game! Use `/cashout` to finish it first.", ephemeral=True)
+        return
+    
+    update_balance(interaction.user.id, -parsed_amount, "mines")
+    set_short_cooldown(interaction.user.id, "mines")
     
     all_positions = list(range(25))
     mines_positions = random.sample(all_positions, mines_count)
@@ -2451,8 +4823,13 @@ async def mines(interaction: discord.Interaction, amount: str, mines_count: int)
         'mines_count': mines_count,
         'revealed': [],
         'created_at': datetime.now().isoformat(),
-        'game_over': False
+        'expires_at': time.time() + MINES_GAME_TIMEOUT,
+        'game_over': False,
+        'nonce': f"{random.getrandbits(32):08x}",
+        'channel_id': interaction.channel_id
     }
+    schedule_deadline(f"mines:{game_id}", active_mines_games[game_id]['expires_at'], expire_mines_game, game_id)
+    await save_data()
     
     embed = discord.Embed(
         title="💎 Mines Game",
@@ -2467,12 +4844,19 @@ async def mines(interaction: discord.Interaction, amount: str, mines_count: int)
     embed.add_field(name="‎", value="‎", inline=True)
     embed.set_footer(text="Use /cashout to collect your winnings!")
     
-    view = MinesView(game_id)
+    view = MinesView(game_id, active_mines_games[game_id])
+    mines_views[game_id] = view
     await interaction.response.send_message(embed=embed, view=view)
+    
+    try:
+        message = await interaction.original_response()
+        active_mines_games[game_id]['message_id'] = message.id
+    except Exception as e:
+        print(f"⚠️ Could not store mines game message: {e}")
 
 # ===== MINES CONFIGURATION =====
 
-class MinesConfigModal(discord.ui.Modal, title="Mines Configuration"):
+class MinesConfigModal(GuildModal, title="Mines Configuration"):
     min_mines = discord.ui.TextInput(
         label="Minimum Mines",
         placeholder=f"Current: {mines_config['min_mines']}",
@@ -2505,8 +4889,16 @@ class MinesConfigModal(discord.ui.Modal, title="Mines Configuration"):
         max_length=10
     )
     
+    house_edge = discord.ui.TextInput(
+        label="House Edge (%)",
+        placeholder=f"Current: {mines_config['house_edge']}",
+        default=str(mines_config["house_edge"]),
+        min_length=1,
+        max_length=5
+    )
+    
     async def on_submit(self, interaction: discord.Interaction):
-        if not admin_check(interaction):
+        if not home_admin_check(interaction):
             await interaction.response.send_message("❌ Admin only!", ephemeral=True)
             return
         
@@ -2532,10 +4924,21 @@ class MinesConfigModal(discord.ui.Modal, title="Mines Configuration"):
             await interaction.response.send_message("❌ Bet amounts must be valid numbers! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
             return
         
+        try:
+            house_edge = float(self.house_edge.value)
+            if house_edge < 0 or house_edge >= 100:
+                await interaction.response.send_message("❌ House edge must be between 0-99%!", ephemeral=True)
+                return
+        except ValueError:
+            await interaction.response.send_message("❌ House edge must be a valid number!", ephemeral=True)
+            return
+        
         mines_config["min_mines"] = min_mines
         mines_config["max_mines"] = max_mines
         mines_config["min_bet"] = min_bet
         mines_config["max_bet"] = max_bet
+        mines_config["house_edge"] = house_edge
+        build_mines_payout_table()
         await save_data()
         
         embed = discord.Embed(title="✅ Mines Configuration Updated", color=0x00ff00)
@@ -2543,6 +4946,7 @@ class MinesConfigModal(discord.ui.Modal, title="Mines Configuration"):
         embed.add_field(name="Max Mines", value=str(max_mines), inline=True)
         embed.add_field(name="Min Bet", value=f"{min_bet:,} 🪙", inline=True)
         embed.add_field(name="Max Bet", value=f"{max_bet:,} 🪙", inline=True)
+        embed.add_field(name="House Edge", value=f"{house_edge}%", inline=True)
         embed.set_footer(text="Changes applied to all mines games")
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
@@ -2557,12 +4961,13 @@ class MinesConfigModal(discord.ui.Modal, title="Mines Configuration"):
                 {"name": "Min Mines", "value": str(min_mines), "inline": True},
                 {"name": "Max Mines", "value": str(max_mines), "inline": True},
                 {"name": "Min Bet", "value": f"{min_bet:,} 🪙", "inline": True},
-                {"name": "Max Bet", "value": f"{max_bet:,} 🪙", "inline": True}
+                {"name": "Max Bet", "value": f"{max_bet:,} 🪙", "inline": True},
+                {"name": "House Edge", "value": f"{house_edge}%", "inline": True}
             ]
         )
 
 @bot.tree.command(name="config_mines", description="Configure mines game settings (Admin only)")
-@discord.app_commands.check(admin_check)
+@discord.app_commands.check(home_admin_check)
 async def config_mines(interaction: discord.Interaction):
     await interaction.response.send_modal(MinesConfigModal())
 
@@ -2570,44 +4975,65 @@ async def config_mines(interaction: discord.Interaction):
 
 @bot.tree.command(name="roblox", description="Set your Roblox username (24h cooldown)")
 async def roblox(interaction: discord.Interaction, username: str):
-    can_use, next_use = can_use_command(interaction.user.id, "roblox", 24)
+    if len(username) < 3 or len(username) > 20:
+        await interaction.response.send_message("❌ Roblox username must be between 3-20 characters!", ephemeral=True)
+        return
     
-    if not can_use:
-        time_left = format_time(next_use)
-        await interaction.response.send_message(f"⏰ You can only set your Roblox username once per day! Come back in **{time_left}**", ephemeral=True)
+    owner = get_roblox_owner(username)
+    if owner and owner != str(interaction.user.id):
+        await interaction.response.send_message(f"❌ **{username}** is already linked to another Discord account!", ephemeral=True)
         return
     
-    if len(username) < 3 or len(username) > 20:
-        await interaction.response.send_message("❌ Roblox username must be between 3-20 characters!", ephemeral=True)
+    await interaction.response.defer(ephemeral=True)
+    
+    try:
+        canonical = await validate_roblox_name(username)
+    except Exception:
+        await interaction.followup.send("❌ Couldn't check that username with Roblox right now, please try again!", ephemeral=True)
+        return
+    if not canonical:
+        await interaction.followup.send(f"❌ Roblox user **{username}** was not found!", ephemeral=True)
+        return
+    
+    error = link_roblox_account(interaction.user.id, canonical)
+    if error:
+        await interaction.followup.send(error, ephemeral=True)
         return
     
-    roblox_data[str(interaction.user.id)] = username
     cooldowns["roblox"][str(interaction.user.id)] = datetime.now().isoformat()
     await save_data()
     
     embed = discord.Embed(
         title="✅ Roblox Username Set!",
-        description=f"Your Roblox username has been set to: **{username}**",
+        description=f"Your Roblox username has been set to: **{canonical}**",
         color=0x00ff00
     )
-    embed.add_field(name="Username", value=username, inline=True)
+    embed.add_field(name="Username", value=canonical, inline=True)
     embed.add_field(name="Next Change", value="24 hours", inline=True)
     embed.set_footer(text="Use /getroblox to view other users' usernames")
     
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    await interaction.followup.send(embed=embed, ephemeral=True)
 
-@bot.tree.command(name="getroblox", description="Get a user's Roblox username (Admin only)")
+@bot.tree.command(name="getroblox", description="Look up a user's Roblox username, or who linked a username (Admin only)")
 @discord.app_commands.check(admin_check)
-async def getroblox(interaction: discord.Interaction, user: discord.Member):
-    username = roblox_data.get(str(user.id), "Not set")
+async def getroblox(interaction: discord.Interaction, user: discord.Member = None, username: str = None):
+    if not user and not username:
+        await interaction.response.send_message("❌ Provide a user or a Roblox username to look up!", ephemeral=True)
+        return
     
     embed = discord.Embed(
         title="👤 Roblox Username Lookup",
         color=0x0099ff
     )
-    embed.add_field(name="Discord User", value=user.mention, inline=True)
-    embed.add_field(name="Roblox Username", value=username, inline=True)
-    embed.set_thumbnail(url=user.display_avatar.url)
+    
+    if user:
+        embed.add_field(name="Discord User", value=user.mention, inline=True)
+        embed.add_field(name="Roblox Username", value=roblox_data.get(str(user.id), "Not set"), inline=True)
+        embed.set_thumbnail(url=user.display_avatar.url)
+    else:
+        owner = get_roblox_owner(username)
+        embed.add_field(name="Roblox Username", value=roblox_data.get(owner, username) if owner else username, inline=True)
+        embed.add_field(name="Discord User", value=f"<@{owner}>" if owner else "Not linked", inline=True)
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
 
@@ -2618,8 +5044,22 @@ async def setroblox(interaction: discord.Interaction, user: discord.Member, user
         await interaction.response.send_message("❌ Roblox username must be between 3-20 characters!", ephemeral=True)
         return
     
+    await interaction.response.defer(ephemeral=True)
+    
+    try:
+        canonical = await validate_roblox_name(username)
+    except Exception:
+        await interaction.followup.send("❌ Couldn't check that username with Roblox right now, please try again!", ephemeral=True)
+        return
+    if not canonical:
+        await interaction.followup.send(f"❌ Roblox user **{username}** was not found!", ephemeral=True)
+        return
+    
     old_username = roblox_data.get(str(user.id), "Not set")
-    roblox_data[str(user.id)] = username
+    error = link_roblox_account(user.id, canonical)
+    if error:
+        await interaction.followup.send(f"❌ **{canonical}** is already linked to <@{get_roblox_owner(canonical)}>!", ephemeral=True)
+        return
     await save_data()
     
     embed = discord.Embed(
@@ -2628,10 +5068,10 @@ async def setroblox(interaction: discord.Interaction, user: discord.Member, user
         color=0x00ff00
     )
     embed.add_field(name="Old Username", value=old_username, inline=True)
-    embed.add_field(name="New Username", value=username, inline=True)
+    embed.add_field(name="New Username", value=canonical, inline=True)
     embed.set_footer(text=f"Updated by {interaction.user.display_name}")
     
-    await interaction.response.send_message(embed=embed, ephemeral=True)
+    await interaction.followup.send(embed=embed, ephemeral=True)
     
     await log_action(
         "ROBLOX_UPDATE",
@@ -2642,13 +5082,38 @@ async def setroblox(interaction: discord.Interaction, user: discord.Member, user
         fields=[
             {"name": "Target User", "value": user.mention, "inline": True},
             {"name": "Old Username", "value": old_username, "inline": True},
-            {"name": "New Username", "value": username, "inline": True}
+            {"name": "New Username", "value": canonical, "inline": True}
         ]
     )
 
+@bot.tree.command(name="validateroblox", description="Check every linked Roblox username still exists (Admin only)")
+@discord.app_commands.check(admin_check)
+async def validateroblox(interaction: discord.Interaction):
+    await interaction.response.defer(ephemeral=True)
+    
+    try:
+        resolved = await validate_roblox_names(list(roblox_data.values()))
+    except Exception:
+        await interaction.followup.send("❌ Couldn't check the usernames with Roblox right now, please try again!", ephemeral=True)
+        return
+    invalid = [(user_id, username) for user_id, username in roblox_data.items() if not resolved.get(normalize_roblox_name(username))]
+    duplicates = len(roblox_data) - len(roblox_name_index)
+    
+    embed = discord.Embed(title="🔍 Roblox Username Check", color=0x00ff00 if not invalid else 0xff9900)
+    embed.add_field(name="Linked Accounts", value=f"{len(roblox_data):,}", inline=True)
+    embed.add_field(name="Not Found", value=f"{len(invalid):,}", inline=True)
+    embed.add_field(name="Shared Usernames", value=f"{duplicates:,}", inline=True)
+    if invalid:
+        invalid_text = "\n".join(f"<@{user_id}> - {username}" for user_id, username in invalid[:20])
+        if len(invalid) > 20:
+            invalid_text += f"\n... and {len(invalid) - 20} more"
+        embed.add_field(name="Usernames Not Found", value=invalid_text, inline=False)
+    
+    await interaction.followup.send(embed=embed, ephemeral=True)
+
 # ===== COINFLIP CONFIGURATION =====
 
-class CoinflipConfigModal(discord.ui.Modal, title="Coinflip Configuration"):
+class CoinflipConfigModal(GuildModal, title="Coinflip Configuration"):
     win_chance = discord.ui.TextInput(
         label="Win Chance (%)",
         placeholder="Enter a number between 1-100",
@@ -2666,7 +5131,7 @@ class CoinflipConfigModal(discord.ui.Modal, title="Coinflip Configuration"):
     )
     
     async def on_submit(self, interaction: discord.Interaction):
-        if not admin_check(interaction):
+        if not home_admin_check(interaction):
             await interaction.response.send_message("❌ Admin only!", ephemeral=True)
             return
         
@@ -2712,27 +5177,172 @@ class CoinflipConfigModal(discord.ui.Modal, title="Coinflip Configuration"):
         )
 
 @bot.tree.command(name="config_cf", description="Configure coinflip settings (Admin only)")
-@discord.app_commands.check(admin_check)
+@discord.app_commands.check(home_admin_check)
 async def config_cf(interaction: discord.Interaction):
     await interaction.response.send_modal(CoinflipConfigModal())
 
+class InviteConfigModal(GuildModal, title="Invite Configuration"):
+    clawback_hours = discord.ui.TextInput(
+        label="Clawback Window (hours, 0 = off)",
+        placeholder="24",
+        min_length=1,
+        max_length=4
+    )
+    
+    def __init__(self):
+        super().__init__()
+        self.clawback_hours.default = str(invite_config.get("clawback_hours", 24))
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        if not admin_check(interaction):
+            await interaction.response.send_message("❌ Admin only!", ephemeral=True)
+            return
+        
+        try:
+            clawback_hours = int(self.clawback_hours.value)
+            if clawback_hours < 0:
+                raise ValueError
+        except ValueError:
+            await interaction.response.send_message("❌ Clawback window must be a whole number of hours (0 or more)!", ephemeral=True)
+            return
+        
+        invite_config["clawback_hours"] = clawback_hours
+        await save_data()
+        
+        embed = discord.Embed(title="✅ Invite Configuration Updated", color=0x00ff00)
+        embed.add_field(name="Clawback Window", value=f"{clawback_hours} hours" if clawback_hours else "Disabled", inline=True)
+        embed.set_footer(text="Invite rewards are removed if the member leaves within this window")
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        await log_action(
+            "INVITE_CONFIG",
+            "⚙️ Invite Configuration Updated",
+            f"**{interaction.user.mention}** updated invite configuration",
+            color=0x0099ff,
+            user=interaction.user,
+            fields=[
+                {"name": "Clawback Window", "value": f"{clawback_hours} hours" if clawback_hours else "Disabled", "inline": True}
+            ]
+        )
+
+@bot.tree.command(name="config_invites", description="Configure invite rewards (Admin only)")
+@discord.app_commands.check(admin_check)
+async def config_invites(interaction: discord.Interaction):
+    await interaction.response.send_modal(InviteConfigModal())
+
+class GuildConfigModal(GuildModal, title="Server Configuration"):
+    admin_roles = discord.ui.TextInput(
+        label="Admin Role IDs (comma separated)",
+        placeholder="Blank = server administrators",
+        required=False,
+        max_length=500
+    )
+    
+    log_channel = discord.ui.TextInput(
+        label="Log Channel ID",
+        placeholder="Blank = no logging",
+        required=False,
+        max_length=25
+    )
+    
+    purchase_log_channel = discord.ui.TextInput(
+        label="Purchase Log Channel ID",
+        placeholder="Blank = no purchase logging",
+        required=False,
+        max_length=25
+    )
+    
+    priority_roles = discord.ui.TextInput(
+        label="Giveaway Bonus Roles (role_id:entries, ...)",
+        placeholder="123456789012345678:5, 234567890123456789:3",
+        style=discord.TextStyle.long,
+        required=False,
+        max_length=1000
+    )
+    
+    def __init__(self):
+        super().__init__()
+        self.admin_roles.default = ", ".join(str(role_id) for role_id in guild_config["admin_role_ids"])
+        self.log_channel.default = str(guild_config["log_channel_id"] or "")
+        self.purchase_log_channel.default = str(guild_config["purchase_log_channel_id"] or "")
+        self.priority_roles.default = ", ".join(f"{role_id}:{bonus}" for role_id, bonus in guild_config["priority_roles"].items())
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        if not admin_check(interaction):
+            await interaction.response.send_message("❌ Admin only!", ephemeral=True)
+            return
+        
+        try:
+            admin_role_ids = [int(part.strip().strip("<@&>")) for part in self.admin_roles.value.split(",") if part.strip()]
+            log_channel_id = int(self.log_channel.value.strip().strip("<#>")) if self.log_channel.value.strip() else None
+            purchase_log_channel_id = int(self.purchase_log_channel.value.strip().strip("<#>")) if self.purchase_log_channel.value.strip() else None
+            priority_roles = {}
+            for part in self.priority_roles.value.split(","):
+                if part.strip():
+                    role_id, bonus = part.split(":")
+                    priority_roles[int(role_id.strip().strip("<@&>"))] = int(bonus)
+        except ValueError:
+            await interaction.response.send_message("❌ Use numeric IDs, and `role_id:entries` pairs for bonus roles!", ephemeral=True)
+            return
+        
+        missing_roles = [role_id for role_id in [*admin_role_ids, *priority_roles] if not interaction.guild.get_role(role_id)]
+        missing_channels = [channel_id for channel_id in (log_channel_id, purchase_log_channel_id) if channel_id and not interaction.guild.get_channel(channel_id)]
+        if missing_roles or missing_channels:
+            missing = [f"role {role_id}" for role_id in missing_roles] + [f"channel {channel_id}" for channel_id in missing_channels]
+            await interaction.response.send_message(f"❌ Not found in this server: {', '.join(missing)}", ephemeral=True)
+            return
+        
+        if admin_role_ids and not any(role.id in admin_role_ids for role in interaction.user.roles):
+            await interaction.response.send_message("❌ You must have one of the admin roles yourself!", ephemeral=True)
+            return
+        
+        guild_config["admin_role_ids"] = admin_role_ids
+        guild_config["log_channel_id"] = log_channel_id
+        guild_config["purchase_log_channel_id"] = purchase_log_channel_id
+        guild_config["priority_roles"] = priority_roles
+        await save_data()
+        
+        admin_text = ", ".join(f"<@&{role_id}>" for role_id in admin_role_ids) or "Server administrators"
+        bonus_text = ", ".join(f"<@&{role_id}> +{bonus}" for role_id, bonus in priority_roles.items()) or "None"
+        embed = discord.Embed(title="✅ Server Configuration Updated", color=0x00ff00)
+        embed.add_field(name="Admin Roles", value=admin_text, inline=False)
+        embed.add_field(name="Log Channel", value=f"<#{log_channel_id}>" if log_channel_id else "Disabled", inline=True)
+        embed.add_field(name="Purchase Log", value=f"<#{purchase_log_channel_id}>" if purchase_log_channel_id else "Disabled", inline=True)
+        embed.add_field(name="Giveaway Bonus Roles", value=bonus_text, inline=False)
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        await log_action(
+            "GUILD_CONFIG",
+            "⚙️ Server Configuration Updated",
+            f"**{interaction.user.mention}** updated the server configuration",
+            color=0x0099ff,
+            user=interaction.user,
+            fields=[
+                {"name": "Admin Roles", "value": admin_text, "inline": False},
+                {"name": "Giveaway Bonus Roles", "value": bonus_text, "inline": False}
+            ]
+        )
+
+@bot.tree.command(name="config_guild", description="Configure admin roles and log channels for this server (Admin only)")
+@discord.app_commands.check(admin_check)
+async def config_guild(interaction: discord.Interaction):
+    await interaction.response.send_modal(GuildConfigModal())
+
 # ===== INVITES PANEL =====
 
-class InvitePanelView(discord.ui.View):
+class LinkedAccountView(GuildView):
+    """View whose buttons all require a linked Roblox account"""
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        return await super().interaction_check(interaction) and await require_roblox_link(interaction)
+
+class InvitePanelView(LinkedAccountView):
     def __init__(self):
         super().__init__(timeout=None)
     
     @discord.ui.button(label="🔗 Generate Invite Link", style=discord.ButtonStyle.green, emoji="🔗")
     async def generate_invite(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not has_linked_roblox(interaction.user.id):
-            embed = discord.Embed(
-                title="🔗 Roblox Account Required",
-                description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-                color=0xff9900
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
-        
         try:
             guild = interaction.guild
             invite_channel = guild.text_channels[0]
@@ -2764,15 +5374,6 @@ class InvitePanelView(discord.ui.View):
     
     @discord.ui.button(label="📊 View My Invites", style=discord.ButtonStyle.blurple, emoji="📊")
     async def view_invites(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not has_linked_roblox(interaction.user.id):
-            embed = discord.Embed(
-                title="🔗 Roblox Account Required",
-                description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-                color=0xff9900
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
-        
         user_id_str = str(interaction.user.id)
         user_invites = invite_data.get(user_id_str, {
             'invited_users': [],
@@ -2859,106 +5460,151 @@ class DoorButton(discord.ui.Button):
         self.door_number = door_number
     
     async def callback(self, interaction: discord.Interaction):
-        if not has_linked_roblox(interaction.user.id):
-            embed = discord.Embed(
-                title="🔗 Roblox Account Required",
-                description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-                color=0xff9900
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
-        
         if not can_use_short_cooldown(interaction.user.id, "doors", 3):
             await interaction.response.send_message("⏰ Please wait 3 seconds between door games!", ephemeral=True)
             return
         
-        fee = 550
+        fee = doors_config["fee"]
         balance = get_user_balance(interaction.user.id)
         if balance < fee:
             await interaction.response.send_message(f"❌ You need **{fee - balance:,}** more tokens to play!", ephemeral=True)
             return
+        if not inventory_ids_ready():
+            await interaction.response.send_message("❌ The doors are busy, please try again in a moment!", ephemeral=True)
+            return
+        
+        update_balance(interaction.user.id, -fee, "doors")
+        set_short_cooldown(interaction.user.id, "doors")
+        
+        prize = roll_door_prize()
+        prize_type = prize["name"]
+        token_prize = prize["tokens"]
+        
+        if token_prize > 0:
+            update_balance(interaction.user.id, token_prize, "doors")
+        else:
+            record_inventory_grant(interaction.user.id, prize_type, 1, 0, "doors")
+        await save_data()
+        
+        embed = discord.Embed(
+            title="🚪 Doors Game Result",
+            color=0xFFD700,
+            timestamp=datetime.now()
+        )
+        
+        embed.add_field(name="Door Chosen", value=f"🚪 Door {self.door_number}", inline=True)
+        embed.add_field(name="Entry Fee", value=f"{fee:,} 🪙", inline=True)
+        embed.add_field(name="Prize Won", value=prize_type, inline=True)
+        
+        if token_prize > 0:
+            embed.add_field(name="Token Prize", value=f"{token_prize:,} 🪙", inline=True)
+            embed.add_field(name="Net Gain/Loss", value=f"{token_prize - fee:,} 🪙", inline=True)
+        
+        embed.add_field(name="New Balance", value=f"{get_user_balance(interaction.user.id):,} 🪙", inline=True)
+        
+        embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
+        
+        await log_action(
+            "DOORS_GAME",
+            "🚪 Doors Game Played",
+            f"**{interaction.user.mention}** played doors game and won **{prize_type}**",
+            color=0xFFD700,
+            user=interaction.user,
+            fields=[
+                {"name": "Door Chosen", "value": f"Door {self.door_number}", "inline": True},
+                {"name": "Entry Fee", "value": f"{fee:,} 🪙", "inline": True},
+                {"name": "Prize Won", "value": prize_type, "inline": True},
+                {"name": "Token Prize", "value": f"{token_prize:,} 🪙" if token_prize > 0 else "0 🪙", "inline": True}
+            ]
+        )
+        
+        if token_prize == 0:
+            await log_purchase(interaction.user, f"Doors Game - {prize_type}", 0, 1, "reward")
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+class DoorsBatchModal(GuildModal, title="Open Multiple Doors"):
+    count = discord.ui.TextInput(
+        label=f"Number of Doors (1-{DOORS_MAX_BATCH})",
+        placeholder="Enter how many doors to open",
+        min_length=1,
+        max_length=2
+    )
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        if not can_use_short_cooldown(interaction.user.id, "doors", 3):
+            await interaction.response.send_message("⏰ Please wait 3 seconds between door games!", ephemeral=True)
+            return
+        
+        try:
+            count = int(self.count.value)
+            if count < 1 or count > DOORS_MAX_BATCH:
+                raise ValueError
+        except ValueError:
+            await interaction.response.send_message(f"❌ Number of doors must be between 1 and {DOORS_MAX_BATCH}!", ephemeral=True)
+            return
+        
+        total_fee = doors_config["fee"] * count
+        balance = get_user_balance(interaction.user.id)
+        if balance < total_fee:
+            await interaction.response.send_message(f"❌ You need **{total_fee - balance:,}** more tokens to open {count} doors!", ephemeral=True)
+            return
+        if not inventory_ids_ready(count):
+            await interaction.response.send_message("❌ The doors are busy, please try again in a moment!", ephemeral=True)
+            return
+        
+        prizes = [roll_door_prize() for _ in range(count)]
+        token_total = sum(prize["tokens"] for prize in prizes)
+        net = token_total - total_fee
+        
+        prize_counts = {}
+        reward_types = set()
+        for prize in prizes:
+            prize_counts[prize["name"]] = prize_counts.get(prize["name"], 0) + 1
+            if prize["tokens"] == 0:
+                reward_types.add(prize["name"])
         
-        update_balance(interaction.user.id, -fee)
+        new_balance = update_balance(interaction.user.id, net, "doors")
         set_short_cooldown(interaction.user.id, "doors")
+        for prize_type in reward_types:
+            record_inventory_grant(interaction.user.id, prize_type, prize_counts[prize_type], 0, "doors")
         await save_data()
         
-        roll = random.random() * 100
-        
-        if roll <= 0.3:
-            prize_type = "TITANIC"
-            token_prize = 0
-            gem_prize = 0
-            titanic_prize = 1
-        elif roll <= 1.3:
-            prize_type = "1,000,000,000 Gems"
-            token_prize = 0
-            gem_prize = 1000000000
-            titanic_prize = 0
-        elif roll <= 2.8:
-            prize_type = "300,000,000 Gems"
-            token_prize = 0
-            gem_prize = 300000000
-            titanic_prize = 0
-        elif roll <= 22.8:
-            prize_type = "50,000,000 Gems"
-            token_prize = 0
-            gem_prize = 50000000
-            titanic_prize = 0
-        elif roll <= 52.8:
-            prize_type = "10,000,000 Gems"
-            token_prize = 0
-            gem_prize = 10000000
-            titanic_prize = 0
-        else:
-            prize_type = "450 Tokens"
-            token_prize = 450
-            gem_prize = 0
-            titanic_prize = 0
-        
-        if token_prize > 0:
-            update_balance(interaction.user.id, token_prize)
-            await save_data()
+        breakdown = "\n".join(f"• **{prize_type}** x{amount}" for prize_type, amount in prize_counts.items())
         
         embed = discord.Embed(
-            title="🚪 Doors Game Result",
+            title=f"🚪 Doors Game x{count} Result",
             color=0xFFD700,
             timestamp=datetime.now()
         )
-        
-        embed.add_field(name="Door Chosen", value=f"🚪 Door {self.door_number}", inline=True)
-        embed.add_field(name="Entry Fee", value=f"550 🪙", inline=True)
-        embed.add_field(name="Prize Won", value=prize_type, inline=True)
-        
-        if token_prize > 0:
-            embed.add_field(name="Token Prize", value=f"{token_prize:,} 🪙", inline=True)
-            embed.add_field(name="Net Gain/Loss", value=f"{token_prize - fee:,} 🪙", inline=True)
-        
-        embed.add_field(name="New Balance", value=f"{get_user_balance(interaction.user.id):,} 🪙", inline=True)
-        
+        embed.add_field(name="Doors Opened", value=str(count), inline=True)
+        embed.add_field(name="Total Fee", value=f"{total_fee:,} 🪙", inline=True)
+        embed.add_field(name="Token Prizes", value=f"{token_total:,} 🪙", inline=True)
+        embed.add_field(name="Prizes Won", value=breakdown, inline=False)
+        embed.add_field(name="Net Gain/Loss", value=f"{net:,} 🪙", inline=True)
+        embed.add_field(name="New Balance", value=f"{new_balance:,} 🪙", inline=True)
         embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
         
         await log_action(
             "DOORS_GAME",
-            "🚪 Doors Game Played",
-            f"**{interaction.user.mention}** played doors game and won **{prize_type}**",
+            f"🚪 Doors Game x{count} Played",
+            f"**{interaction.user.mention}** opened **{count} doors** for a net **{net:,} tokens**",
             color=0xFFD700,
             user=interaction.user,
             fields=[
-                {"name": "Door Chosen", "value": f"Door {self.door_number}", "inline": True},
-                {"name": "Entry Fee", "value": "550 🪙", "inline": True},
-                {"name": "Prize Won", "value": prize_type, "inline": True},
-                {"name": "Token Prize", "value": f"{token_prize:,} 🪙" if token_prize > 0 else "0 🪙", "inline": True}
+                {"name": "Doors Opened", "value": str(count), "inline": True},
+                {"name": "Total Fee", "value": f"{total_fee:,} 🪙", "inline": True},
+                {"name": "Token Prizes", "value": f"{token_total:,} 🪙", "inline": True},
+                {"name": "Prizes Won", "value": breakdown, "inline": False}
             ]
         )
         
-        if gem_prize > 0:
-            await log_purchase(interaction.user, f"Doors Game - {prize_type}", 0, 1, "reward")
-        elif titanic_prize > 0:
-            await log_purchase(interaction.user, "Doors Game - TITANIC", 0, 1, "reward")
+        for prize_type in reward_types:
+            await log_purchase(interaction.user, f"Doors Game - {prize_type}", 0, prize_counts[prize_type], "reward")
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
 
-class DoorsPanelView(discord.ui.View):
+class DoorsPanelView(LinkedAccountView):
     def __init__(self):
         super().__init__(timeout=None)
         
@@ -2968,17 +5614,8 @@ class DoorsPanelView(discord.ui.View):
     
     @discord.ui.button(label="💰 Check Balance", style=discord.ButtonStyle.green, row=1)
     async def check_balance(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not has_linked_roblox(interaction.user.id):
-            embed = discord.Embed(
-                title="🔗 Roblox Account Required",
-                description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-                color=0xff9900
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
-        
         balance = get_user_balance(interaction.user.id)
-        fee = 550
+        fee = doors_config["fee"]
         
         embed = discord.Embed(
             title="💰 Your Token Balance",
@@ -2987,7 +5624,7 @@ class DoorsPanelView(discord.ui.View):
         )
         
         embed.add_field(name="Current Balance", value=f"{balance:,} 🪙", inline=True)
-        embed.add_field(name="Door Game Fee", value=f"550 🪙", inline=True)
+        embed.add_field(name="Door Game Fee", value=f"{fee:,} 🪙", inline=True)
         embed.add_field(name="Can Play?", value="✅ Yes" if balance >= fee else "❌ No", inline=True)
         
         if balance < fee:
@@ -2996,6 +5633,10 @@ class DoorsPanelView(discord.ui.View):
         embed.set_author(name=interaction.user.display_name, icon_url=interaction.user.display_avatar.url)
         
         await interaction.response.send_message(embed=embed, ephemeral=True)
+    
+    @discord.ui.button(label="🎲 Open Multiple Doors", style=discord.ButtonStyle.blurple, row=1)
+    async def open_multiple(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(DoorsBatchModal())
 
 @bot.tree.command(name="doorspanel", description="Display doors game panel in a channel (Admin only)")
 @discord.app_commands.check(admin_check)
@@ -3009,20 +5650,17 @@ async def doorspanel(interaction: discord.Interaction, channel: discord.TextChan
     
     embed.add_field(
         name="🎯 How to Play",
-        value="• Click any of the 5 doors below\n• Pay **550 🪙** entry fee\n• Win amazing prizes based on luck!",
+        value=f"• Click any of the 5 doors below\n• Pay **{doors_config['fee']:,} 🪙** entry fee\n• Win amazing prizes based on luck!\n• Use **Open Multiple Doors** to play up to {DOORS_MAX_BATCH} at once",
         inline=False
     )
     
+    prize_lines = [
+        f"• **{prize['chance']:g}% chance**: {prize['name']}"
+        for prize in sorted(doors_config["prizes"], key=lambda p: p["chance"], reverse=True)
+    ]
     embed.add_field(
         name="🏆 Prize Distribution",
-        value=(
-            "• **60% chance**: 450 🪙\n"
-            "• **30% chance**: 10,000,000 💎\n"
-            "• **20% chance**: 50,000,000 💎\n"
-            "• **1.5% chance**: 300,000,000 💎\n"
-            "• **1% chance**: 1,000,000,000 💎\n"
-            "• **0.3% chance**: TITANIC 🏆"
-        ),
+        value="\n".join(prize_lines),
         inline=False
     )
     
@@ -3043,24 +5681,247 @@ async def doorspanel(interaction: discord.Interaction, channel: discord.TextChan
         await interaction.response.send_message(f"❌ Error sending panel to {channel.mention}: {e}", ephemeral=True)
         
 
+# ===== DOORS CONFIGURATION =====
+
+def format_doors_prizes():
+    """Format the doors prize table as editable `chance | name | tokens` lines"""
+    return "\n".join(f"{prize['chance']:g} | {prize['name']} | {prize['tokens']}" for prize in doors_config["prizes"])
+
+class DoorsConfigModal(GuildModal, title="Doors Configuration"):
+    fee = discord.ui.TextInput(
+        label="Entry Fee (supports k, m, b suffixes)",
+        min_length=1,
+        max_length=10
+    )
+    
+    prizes = discord.ui.TextInput(
+        label="Prizes (one per line: chance | name | tokens)",
+        style=discord.TextStyle.long,
+        min_length=1,
+        max_length=1000
+    )
+    
+    def __init__(self):
+        super().__init__()
+        self.fee.default = str(doors_config["fee"])
+        self.prizes.default = format_doors_prizes()
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        if not home_admin_check(interaction):
+            await interaction.response.send_message("❌ Admin only!", ephemeral=True)
+            return
+        
+        fee = parse_amount(self.fee.value)
+        if fee is None or fee <= 0:
+            await interaction.response.send_message("❌ Entry fee must be a valid number! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
+            return
+        
+        prizes = []
+        for line in self.prizes.value.splitlines():
+            if not line.strip():
+                continue
+            parts = [part.strip() for part in line.split("|")]
+            try:
+                if len(parts) != 3:
+                    raise ValueError
+                tokens = parse_amount(parts[2])
+                if tokens is None:
+                    raise ValueError
+                prizes.append({"name": parts[1], "chance": float(parts[0]), "tokens": tokens})
+            except ValueError:
+                await interaction.response.send_message(f"❌ Invalid prize line: `{line}`\nUse `chance | name | tokens`", ephemeral=True)
+                return
+        
+        new_config = {"fee": fee, "prizes": prizes}
+        error = validate_doors_config(new_config)
+        if error:
+            await interaction.response.send_message(f"❌ Invalid doors configuration: {error}", ephemeral=True)
+            return
+        
+        doors_config["fee"] = fee
+        doors_config["prizes"] = prizes
+        build_doors_prize_table()
+        await save_data()
+        
+        expected_tokens = get_doors_expected_tokens()
+        
+        embed = discord.Embed(title="✅ Doors Configuration Updated", color=0x00ff00)
+        embed.add_field(name="Entry Fee", value=f"{fee:,} 🪙", inline=True)
+        embed.add_field(name="Prizes", value=str(len(prizes)), inline=True)
+        embed.add_field(name="Token RTP", value=f"{expected_tokens / fee * 100:.1f}%", inline=True)
+        embed.add_field(name="Prize Table", value=format_doors_prizes(), inline=False)
+        embed.set_footer(text="Changes applied to all doors games")
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        await log_action(
+            "DOORS_CONFIG",
+            "⚙️ Doors Configuration Updated",
+            f"**{interaction.user.mention}** updated doors configuration",
+            color=0x0099ff,
+            user=interaction.user,
+            fields=[
+                {"name": "Entry Fee", "value": f"{fee:,} 🪙", "inline": True},
+                {"name": "Token RTP", "value": f"{expected_tokens / fee * 100:.1f}%", "inline": True},
+                {"name": "Prize Table", "value": format_doors_prizes(), "inline": False}
+            ]
+        )
+
+@bot.tree.command(name="config_doors", description="Configure doors game prizes (Admin only)")
+@discord.app_commands.check(home_admin_check)
+async def config_doors(interaction: discord.Interaction):
+    await interaction.response.send_modal(DoorsConfigModal())
+
 # ===== GIVEAWAY SYSTEM =====
 
-class GiveawayEnterView(discord.ui.View):
+def get_giveaway_deadline(giveaway):
+    """Get the unix time a giveaway ends at"""
+    try:
+        return datetime.fromisoformat(giveaway['end_time']).timestamp()
+    except:
+        return time.time()
+
+def build_giveaway_embed(giveaway, time_left):
+    """Build a giveaway's announcement with its countdown and entries so far"""
+    embed = discord.Embed(
+        title="🎉 TOKEN GIVEAWAY 🎉",
+        description=f"Hosted by <@{giveaway['creator']}>",
+        color=0xFFD700,
+        timestamp=datetime.now()
+    )
+    
+    embed.set_thumbnail(url="https://cdn.discordapp.com/emojis/1125274830004781156.webp?size=96&quality=lossless")
+    embed.add_field(name="🏆 TOTAL PRIZE", value=f"**{giveaway['amount']:,}** 🪙", inline=True)
+    embed.add_field(name="👑 WINNERS", value=f"**{giveaway['winners']}** lucky winners", inline=True)
+    embed.add_field(name="⏰ TIME REMAINING", value=f"**{time_left} seconds**", inline=True)
+    embed.add_field(name="🎫 ENTRIES", value=f"**{giveaway['total_entries']:,}** entries", inline=True)
+    
+    if giveaway['total_entries'] > 0:
+        approx_chance = min(100, round((giveaway['winners'] / giveaway['total_entries']) * 100, 1))
+        embed.add_field(name="🎲 YOUR CHANCES", value=f"**~{approx_chance}%** chance to win", inline=True)
+    else:
+        embed.add_field(name="🎲 YOUR CHANCES", value="Be the first to enter!", inline=True)
+    
+    role_bonus_text = "\n".join([f"<@&{role_id}>: **+{bonus} entries**" for role_id, bonus in guild_config["priority_roles"].items()])
+    if role_bonus_text:
+        embed.add_field(name="🌟 ROLE BONUSES", value=role_bonus_text, inline=False)
+    
+    embed.set_footer(text=f"Click the button below to enter! • Ends in {time_left} seconds")
+    return embed
+
+async def edit_giveaway_message(giveaway, **fields):
+    """Update the message that announced a giveaway"""
+    channel = bot.get_channel(giveaway.get('channel_id', 0))
+    if channel and giveaway.get('message_id'):
+        try:
+            await channel.get_partial_message(giveaway['message_id']).edit(**fields)
+        except Exception as e:
+            print(f"⚠️ Error updating giveaway message: {e}")
+
+async def update_giveaway_message(giveaway_id):
+    """Refresh a giveaway's countdown, every 5 seconds until it ends"""
+    giveaway = active_giveaways.get(giveaway_id)
+    if not giveaway:
+        return
+    
+    time_left = round(get_giveaway_deadline(giveaway) - time.time())
+    await edit_giveaway_message(giveaway, embed=build_giveaway_embed(giveaway, time_left))
+    # Scheduled after the edit so a slow one delays the next refresh instead of piling up behind it
+    if time_left > 5 and giveaway_id in active_giveaways:
+        schedule_deadline(f"giveaway_update:{giveaway_id}", time.time() + 5, update_giveaway_message, giveaway_id)
+
+async def end_giveaway(giveaway_id):
+    """Split a giveaway's prize between random entrants, or refund the host if nobody entered"""
+    giveaway = active_giveaways.pop(giveaway_id, None)
+    if not giveaway:
+        return
+    cancel_deadline(f"giveaway_update:{giveaway_id}")
+    
+    creator = giveaway['creator']
+    participants = list(giveaway['entries'])
+    
+    if not participants:
+        update_balance(creator, giveaway['amount'], "giveaway")
+        daily_totals = giveaway_daily_totals.get(str(creator), {})
+        day = giveaway['created_at'][:10]
+        if day in daily_totals:
+            daily_totals[day] -= giveaway['amount']
+        await save_data()
+        
+        refund_embed = discord.Embed(
+            title="🎉 GIVEAWAY ENDED",
+            description="No one entered the giveaway. Tokens have been refunded.",
+            color=0xff4444
+        )
+        await edit_giveaway_message(giveaway, embed=refund_embed, view=None)
+        return
+    
+    actual_winners_count = min(giveaway['winners'], len(participants))
+    selected_winners = random.sample(participants, actual_winners_count)
+    
+    prize_per_winner = giveaway['amount'] // actual_winners_count
+    remaining_tokens = giveaway['amount'] % actual_winners_count
+    
+    winner_mentions = []
+    for i, winner_id in enumerate(selected_winners):
+        prize = prize_per_winner + (remaining_tokens if i == 0 else 0)
+        update_balance(int(winner_id), prize, "giveaway")
+        winner_mentions.append(f"<@{winner_id}> - {prize:,} 🪙")
+    await save_data()
+    
+    result_embed = discord.Embed(
+        title="🎊 GIVEAWAY RESULTS 🎊",
+        description="The giveaway has ended! Here are the winners:",
+        color=0x00ff00,
+        timestamp=datetime.now()
+    )
+    
+    result_embed.add_field(name="🏆 Total Prize", value=f"**{giveaway['amount']:,}** 🪙", inline=True)
+    result_embed.add_field(name="👑 Winners", value=f"**{actual_winners_count}**", inline=True)
+    result_embed.add_field(name="🎫 Total Entries", value=f"**{giveaway['total_entries']}**", inline=True)
+    result_embed.add_field(
+        name="🎉 Congratulations to the winners!", 
+        value="\n".join(winner_mentions), 
+        inline=False
+    )
+    result_embed.add_field(
+        name="💰 Prize Distribution", 
+        value=f"Prize was split equally among {actual_winners_count} winner(s)", 
+        inline=False
+    )
+    result_embed.set_footer(text="Tokens have been distributed to winners!")
+    
+    await log_action(
+        "GIVEAWAY",
+        "🎉 Giveaway Completed",
+        f"**<@{creator}>** hosted a giveaway of **{giveaway['amount']:,} tokens**",
+        color=0xFFD700,
+        user=bot.get_user(creator),
+        fields=[
+            {"name": "Total Prize", "value": f"{giveaway['amount']:,} 🪙", "inline": True},
+            {"name": "Winners", "value": f"{actual_winners_count}", "inline": True},
+            {"name": "Prize per Winner", "value": f"{prize_per_winner:,} 🪙", "inline": True},
+            {"name": "Winners", "value": "\n".join(winner_mentions), "inline": False}
+        ]
+    )
+    
+    await edit_giveaway_message(giveaway, embed=result_embed, view=None)
+
+def resume_giveaways():
+    """Schedule the end of saved giveaways (ones that ran out while the bot was offline end right away)"""
+    for giveaway_id, giveaway in active_giveaways.items():
+        schedule_deadline(f"giveaway:{giveaway_id}", get_giveaway_deadline(giveaway), end_giveaway, giveaway_id)
+    
+    if active_giveaways:
+        print(f"🔄 Resumed {len(active_giveaways)} giveaways")
+
+class GiveawayEnterView(LinkedAccountView):
     def __init__(self, giveaway_id):
         super().__init__(timeout=25)
         self.giveaway_id = giveaway_id
     
     @discord.ui.button(label="🎉 Enter Giveaway", style=discord.ButtonStyle.green, emoji="🎉")
     async def enter_giveaway(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not has_linked_roblox(interaction.user.id):
-            embed = discord.Embed(
-                title="🔗 Roblox Account Required",
-                description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-                color=0xff9900
-            )
-            await interaction.response.send_message(embed=embed, ephemeral=True)
-            return
-        
         if self.giveaway_id not in active_giveaways:
             await interaction.response.send_message("❌ This giveaway has ended!", ephemeral=True)
             return
@@ -3073,7 +5934,7 @@ class GiveawayEnterView(discord.ui.View):
         
         entries = 1
         
-        for role_id, bonus_entries in PRIORITY_ROLES.items():
+        for role_id, bonus_entries in guild_config["priority_roles"].items():
             if any(role.id == role_id for role in interaction.user.roles):
                 entries += bonus_entries
         
@@ -3083,7 +5944,7 @@ class GiveawayEnterView(discord.ui.View):
         await save_data()
         
         role_bonus_text = ""
-        for role_id, bonus_entries in PRIORITY_ROLES.items():
+        for role_id, bonus_entries in guild_config["priority_roles"].items():
             if any(role.id == role_id for role in interaction.user.roles):
                 role_bonus_text += f"• <@&{role_id}>: +{bonus_entries} entries\n"
         
@@ -3099,31 +5960,7 @@ class GiveawayEnterView(discord.ui.View):
 
 @bot.tree.command(name="giveaway", description="Start a token giveaway (25 seconds)")
 async def giveaway(interaction: discord.Interaction, amount: str, winners: int):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
-    if not can_use_short_cooldown(interaction.user.id, "giveaway", 30):
-        await interaction.response.send_message("⏰ Please wait 30 seconds before starting another giveaway!", ephemeral=True)
-        return
-    
-    parsed_amount = parse_amount(amount)
-    if parsed_amount is None or parsed_amount <= 0:
-        await interaction.response.send_message("❌ Invalid amount! Use numbers or suffixes like 10k, 1m, 1b", ephemeral=True)
-        return
-    
-    if parsed_amount < 50:
-        await interaction.response.send_message("❌ Minimum giveaway amount is 50 tokens!", ephemeral=True)
-        return
-    
-    if parsed_amount > 5000:
-        await interaction.response.send_message("❌ Maximum giveaway amount is 5,000 tokens!", ephemeral=True)
-        return
+    parsed_amount = interaction.extras["amount"]
     
     if winners < 1 or winners > 12:
         await interaction.response.send_message("❌ Number of winners must be between 1 and 12!", ephemeral=True)
@@ -3151,7 +5988,7 @@ async def giveaway(interaction: discord.Interaction, amount: str, winners: int):
         await interaction.response.send_message(f"❌ You need **{parsed_amount - balance:,}** more tokens to start this giveaway!", ephemeral=True)
         return
     
-    new_balance = update_balance(interaction.user.id, -parsed_amount)
+    new_balance = update_balance(interaction.user.id, -parsed_amount, "giveaway")
     giveaway_daily_totals[user_id][today] += parsed_amount
     set_short_cooldown(interaction.user.id, "giveaway")
     
@@ -3163,197 +6000,28 @@ async def giveaway(interaction: discord.Interaction, amount: str, winners: int):
         'winners': winners,
         'entries': {},
         'total_entries': 0,
+        'channel_id': interaction.channel_id,
         'created_at': datetime.now().isoformat(),
         'end_time': (datetime.now() + timedelta(seconds=25)).isoformat()
     }
+    giveaway_data = active_giveaways[giveaway_id]
+    schedule_deadline(f"giveaway:{giveaway_id}", get_giveaway_deadline(giveaway_data), end_giveaway, giveaway_id)
+    schedule_deadline(f"giveaway_update:{giveaway_id}", time.time() + 5, update_giveaway_message, giveaway_id)
     
     await save_data()
     
-    embed = discord.Embed(
-        title="🎉 TOKEN GIVEAWAY 🎉",
-        description=f"Hosted by {interaction.user.mention}",
-        color=0xFFD700,
-        timestamp=datetime.now()
-    )
-    
-    embed.set_thumbnail(url="https://cdn.discordapp.com/emojis/1125274830004781156.webp?size=96&quality=lossless")
-    embed.add_field(name="🏆 TOTAL PRIZE", value=f"**{parsed_amount:,}** 🪙", inline=True)
-    embed.add_field(name="👑 WINNERS", value=f"**{winners}** lucky winners", inline=True)
-    embed.add_field(name="⏰ TIME REMAINING", value="**25 seconds**", inline=True)
-    embed.add_field(name="🎫 ENTRIES", value="**0** entries", inline=True)
-
-    role_bonus_text = "\n".join([f"<@&{role_id}>: **+{bonus} entries**" for role_id, bonus in PRIORITY_ROLES.items()])
-    if role_bonus_text:
-        embed.add_field(name="🌟 ROLE BONUSES", value=role_bonus_text, inline=False)
-    
-    embed.set_footer(text="Click the button below to enter! • Ends in 25 seconds")
-    
     view = GiveawayEnterView(giveaway_id)
-    await interaction.response.send_message(embed=embed, view=view)
-    
-    async def update_giveaway_message():
-        for i in range(5):
-            await asyncio.sleep(5)
-            
-            if giveaway_id not in active_giveaways:
-                break
-                
-            giveaway = active_giveaways[giveaway_id]
-            time_left = 20 - (i * 5)
-            
-            updated_embed = discord.Embed(
-                title="🎉 TOKEN GIVEAWAY 🎉",
-                description=f"Hosted by {interaction.user.mention}",
-                color=0xFFD700,
-                timestamp=datetime.now()
-            )
-            
-            updated_embed.set_thumbnail(url="https://cdn.discordapp.com/emojis/1125274830004781156.webp?size=96&quality=lossless")
-            updated_embed.add_field(name="🏆 TOTAL PRIZE", value=f"**{parsed_amount:,}** 🪙", inline=True)
-            updated_embed.add_field(name="👑 WINNERS", value=f"**{winners}** lucky winners", inline=True)
-            updated_embed.add_field(name="⏰ TIME REMAINING", value=f"**{time_left} seconds**", inline=True)
-            updated_embed.add_field(name="🎫 ENTRIES", value=f"**{giveaway['total_entries']:,}** entries", inline=True)
-            
-            if giveaway['total_entries'] > 0:
-                approx_chance = min(100, round((winners / giveaway['total_entries']) * 100, 1))
-                updated_embed.add_field(name="🎲 YOUR CHANCES", value=f"**~{approx_chance}%** chance to win", inline=True)
-            else:
-                updated_embed.add_field(name="🎲 YOUR CHANCES", value="Be the first to enter!", inline=True)
-            
-            if role_bonus_text:
-                updated_embed.add_field(name="🌟 ROLE BONUSES", value=role_bonus_text, inline=False)
-            
-            updated_embed.set_footer(text=f"Click the button below to enter! • Ends in {time_left} seconds")
-            
-            try:
-                await interaction.edit_original_response(embed=updated_embed, view=view)
-            except:
-                break
+    await interaction.response.send_message(embed=build_giveaway_embed(giveaway_data, 25), view=view)
     
-    asyncio.create_task(update_giveaway_message())
-    
-    await asyncio.sleep(25)
-    
-    if giveaway_id in active_giveaways:
-        giveaway = active_giveaways[giveaway_id]
-        
-        if giveaway['total_entries'] > 0:
-            all_entries = []
-            for user_id, entries in giveaway['entries'].items():
-                all_entries.extend([user_id] * entries)
-            
-            unique_participants = list(set(all_entries))
-            actual_winners_count = min(giveaway['winners'], len(unique_participants))
-            
-            if actual_winners_count > 0:
-                selected_winners = random.sample(unique_participants, actual_winners_count)
-                
-                prize_per_winner = giveaway['amount'] // actual_winners_count
-                remaining_tokens = giveaway['amount'] % actual_winners_count
-                
-                winner_mentions = []
-                total_distributed = 0
-                
-                for i, winner_id in enumerate(selected_winners):
-                    try:
-                        winner = await bot.fetch_user(int(winner_id))
-                        prize = prize_per_winner + (remaining_tokens if i == 0 else 0)
-                        update_balance(winner.id, prize)
-                        total_distributed += prize
-                        winner_mentions.append(f"{winner.mention} - {prize:,} 🪙")
-                    except:
-                        continue
-                
-                result_embed = discord.Embed(
-                    title="🎊 GIVEAWAY RESULTS 🎊",
-                    description="The giveaway has ended! Here are the winners:",
-                    color=0x00ff00,
-                    timestamp=datetime.now()
-                )
-                
-                result_embed.add_field(name="🏆 Total Prize", value=f"**{giveaway['amount']:,}** 🪙", inline=True)
-                result_embed.add_field(name="👑 Winners", value=f"**{actual_winners_count}**", inline=True)
-                result_embed.add_field(name="🎫 Total Entries", value=f"**{giveaway['total_entries']}**", inline=True)
-                
-                if winner_mentions:
-                    winners_text = "\n".join(winner_mentions)
-                    result_embed.add_field(
-                        name="🎉 Congratulations to the winners!", 
-                        value=winners_text, 
-                        inline=False
-                    )
-                
-                result_embed.add_field(
-                    name="💰 Prize Distribution", 
-                    value=f"Prize was split equally among {actual_winners_count} winner(s)", 
-                    inline=False
-                )
-                
-                result_embed.set_footer(text="Tokens have been distributed to winners!")
-                
-                await log_action(
-                    "GIVEAWAY",
-                    "🎉 Giveaway Completed",
-                    f"**{interaction.user.mention}** hosted a giveaway of **{giveaway['amount']:,} tokens**",
-                    color=0xFFD700,
-                    user=interaction.user,
-                    fields=[
-                        {"name": "Total Prize", "value": f"{giveaway['amount']:,} 🪙", "inline": True},
-                        {"name": "Winners", "value": f"{actual_winners_count}", "inline": True},
-                        {"name": "Prize per Winner", "value": f"{prize_per_winner:,} 🪙", "inline": True},
-                        {"name": "Winners", "value": "\n".join(winner_mentions) if winner_mentions else "No winners", "inline": False}
-                    ]
-                )
-                
-                try:
-                    await interaction.edit_original_response(embed=result_embed, view=None)
-                except Exception as e:
-                    print(f"⚠️ Error updating giveaway message: {e}")
-                    
-            else:
-                refund_embed = discord.Embed(
-                    title="🎉 GIVEAWAY ENDED",
-                    description="No valid winners could be selected. Tokens have been refunded.",
-                    color=0xff4444
-                )
-                
-                update_balance(interaction.user.id, giveaway['amount'])
-                giveaway_daily_totals[user_id][today] -= giveaway['amount']
-                
-                try:
-                    await interaction.edit_original_response(embed=refund_embed, view=None)
-                except:
-                    pass
-                
-        else:
-            update_balance(interaction.user.id, giveaway['amount'])
-            giveaway_daily_totals[user_id][today] -= giveaway['amount']
-            
-            refund_embed = discord.Embed(
-                title="🎉 GIVEAWAY ENDED",
-                description="No one entered the giveaway. Tokens have been refunded.",
-                color=0xff4444
-            )
-            
-            try:
-                await interaction.edit_original_response(embed=refund_embed, view=None)
-            except:
-                pass
-        
-        del active_giveaways[giveaway_id]
-        await save_data()
+    try:
+        message = await interaction.original_response()
+        if giveaway_id in active_giveaways:
+            active_giveaways[giveaway_id]['message_id'] = message.id
+    except Exception as e:
+        print(f"⚠️ Could not store giveaway message: {e}")
 
 @bot.tree.command(name="giveawayinfo", description="Check your daily giveaway limits")
 async def giveawayinfo(interaction: discord.Interaction):
-    if not has_linked_roblox(interaction.user.id):
-        embed = discord.Embed(
-            title="🔗 Roblox Account Required",
-            description="You need to link your Roblox account before using the bot!\n\nUse `/roblox <username>` to link your account.",
-            color=0xff9900
-        )
-        await interaction.response.send_message(embed=embed, ephemeral=True)
-        return
-    
     user_id = str(interaction.user.id)
     today = datetime.now().date().isoformat()
     
@@ -3391,7 +6059,7 @@ async def giveawayinfo(interaction: discord.Interaction):
         inline=False
     )
     
-    role_bonus_text = "\n".join([f"<@&{role_id}>: +{bonus} entries" for role_id, bonus in PRIORITY_ROLES.items()])
+    role_bonus_text = "\n".join([f"<@&{role_id}>: +{bonus} entries" for role_id, bonus in guild_config["priority_roles"].items()])
     if role_bonus_text:
         embed.add_field(
             name="🌟 Role Bonuses", 
@@ -3406,25 +6074,105 @@ async def giveawayinfo(interaction: discord.Interaction):
 
 # ===== TRIGGER EVENT COMMAND =====
 
+class MinigameConfigModal(GuildModal, title="Minigame Configuration"):
+    channels = discord.ui.TextInput(
+        label="Channel IDs (comma separated)",
+        style=discord.TextStyle.long,
+        max_length=1000
+    )
+    
+    message_threshold = discord.ui.TextInput(
+        label="Messages Between Games",
+        placeholder="75",
+        min_length=1,
+        max_length=5
+    )
+    
+    def __init__(self):
+        super().__init__()
+        self.channels.default = ", ".join(str(channel_id) for channel_id in minigame_config["channels"])
+        self.message_threshold.default = str(minigame_config["message_threshold"])
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        if not admin_check(interaction):
+            await interaction.response.send_message("❌ Admin only!", ephemeral=True)
+            return
+        
+        try:
+            channel_ids = [int(part.strip().strip("<#>")) for part in self.channels.value.split(",") if part.strip()]
+            message_threshold = int(self.message_threshold.value)
+            if message_threshold < 1:
+                raise ValueError
+        except ValueError:
+            await interaction.response.send_message("❌ Use channel IDs separated by commas and a message count of at least 1!", ephemeral=True)
+            return
+        
+        missing = [channel_id for channel_id in channel_ids if not interaction.guild.get_channel(channel_id)]
+        if missing:
+            await interaction.response.send_message(f"❌ Channel not found: {', '.join(str(channel_id) for channel_id in missing)}", ephemeral=True)
+            return
+        
+        minigame_config["channels"] = channel_ids
+        minigame_config["message_threshold"] = message_threshold
+        build_minigame_channels()
+        await save_data()
+        
+        channels_text = ", ".join(f"<#{channel_id}>" for channel_id in channel_ids) or "None"
+        embed = discord.Embed(title="✅ Minigame Configuration Updated", color=0x00ff00)
+        embed.add_field(name="Channels", value=channels_text, inline=False)
+        embed.add_field(name="Messages Between Games", value=str(message_threshold), inline=True)
+        
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        
+        await log_action(
+            "MINIGAME_CONFIG",
+            "⚙️ Minigame Configuration Updated",
+            f"**{interaction.user.mention}** updated minigame configuration",
+            color=0x0099ff,
+            user=interaction.user,
+            fields=[
+                {"name": "Channels", "value": channels_text, "inline": False},
+                {"name": "Messages Between Games", "value": str(message_threshold), "inline": True}
+            ]
+        )
+
+@bot.tree.command(name="config_minigames", description="Configure minigame channels (Admin only)")
+@discord.app_commands.check(admin_check)
+async def config_minigames(interaction: discord.Interaction):
+    await interaction.response.send_modal(MinigameConfigModal())
+
 @bot.tree.command(name="triggerevent", description="Force start a minigame (Admin only)")
 @discord.app_commands.check(admin_check)
-async def triggerevent(interaction: discord.Interaction):
+async def triggerevent(interaction: discord.Interaction, channel: discord.TextChannel = None):
     """Force start a minigame immediately"""
-    global minigame_message_count
+    if channel is None:
+        channel_ids = minigame_config["channels"]
+        if interaction.channel_id in channel_ids:
+            channel = interaction.channel
+        elif channel_ids:
+            channel = interaction.guild.get_channel(channel_ids[0])
+    
+    if not channel:
+        await interaction.response.send_message("❌ Minigame channel not found!", ephemeral=True)
+        return
+    
+    if channel.id in active_minigames:
+        await interaction.response.send_message(f"❌ A minigame is already running in {channel.mention}!", ephemeral=True)
+        return
     
-    # Reset message count to trigger minigame
-    minigame_message_count = 75
-    await trigger_minigame()
+    if not await trigger_minigame(channel):
+        await interaction.response.send_message(f"❌ Could not start a minigame in {channel.mention}!", ephemeral=True)
+        return
     
     embed = discord.Embed(
         title="🎯 Minigame Triggered!",
-        description="A minigame has been force started in the minigame channel!",
+        description=f"A minigame has been force started in {channel.mention}!",
         color=0x00ff00,
         timestamp=datetime.now()
     )
     embed.add_field(name="Triggered by", value=interaction.user.mention, inline=True)
-    embed.add_field(name="Channel", value=f"<#{MINIGAME_CHANNEL_ID}>", inline=True)
-    embed.set_footer(text="Users have 60 seconds to answer!")
+    embed.add_field(name="Channel", value=channel.mention, inline=True)
+    embed.set_footer(text=f"Users have {MINIGAME_DURATION} seconds to answer!")
     
     await interaction.response.send_message(embed=embed, ephemeral=True)
     
@@ -3436,7 +6184,7 @@ async def triggerevent(interaction: discord.Interaction):
         user=interaction.user,
         fields=[
             {"name": "Action", "value": "Force started minigame", "inline": True},
-            {"name": "Channel", "value": f"<#{MINIGAME_CHANNEL_ID}>", "inline": True}
+            {"name": "Channel", "value": channel.mention, "inline": True}
         ]
     )
 
@@ -3457,8 +6205,9 @@ async def about(ctx):
             "`/daily` - Claim daily tokens (24h cooldown)\n"
             "`/work` - Work for tokens (3h cooldown)\n"
             "`/crime` - Risky crime for tokens (1h cooldown)\n"
-            "`/coinflip <amount> <heads/tails>` - Bet tokens on coinflip\n"
-            "`/duel <user> <amount>` - Challenge someone to coinflip\n"
+            "`/coinflip <amount> <heads/tails> [rounds]` - Bet tokens on coinflip\n"
+            "`/duel challenge <user> <amount>` - Challenge someone to coinflip\n"
+            "`/duel open <amount>` - Post an open duel for anyone with a similar stake\n"
             "`/gift <user> <amount>` - Gift tokens to another user\n"
             "`/giveaway <amount> <winners>` - Start a token giveaway\n"
             "`/giveawayinfo` - Check your daily limits\n"
@@ -3472,8 +6221,9 @@ async def about(ctx):
     embed.add_field(
         name="🛒 Shop Commands",
         value=(
-            "`/shop` - Browse available items for purchase\n"
-            "`/buy <item_name> [quantity]` - Buy items from the shop"
+            "`/shop [page]` - Browse available items for purchase\n"
+            "`/buy <item_name> [quantity]` - Buy items from the shop\n"
+            "`/inventory [page]` - View the items you own"
         ),
         inline=False
     )
@@ -3487,22 +6237,31 @@ async def about(ctx):
         inline=False
     )
     
-    if is_admin(ctx.author):
+    if ctx.guild and is_admin(ctx.author):
         embed.add_field(
             name="⚙️ Admin Commands",
             value=(
                 "`/addtoken <user> <amount>` - Add tokens to user\n"
                 "`/removetoken <user> <amount>` - Remove tokens from user\n"
                 "`/adminbalance <user>` - Check user's balance\n"
-                "`/addshop` - Manage shop items\n"
+                "`/economy [days]` - View the token economy dashboard\n"
+                "`/jobs` - View background job status\n"
+                "`/addshop [page]` - Manage shop items\n"
+                "`/fulfillment [user] [item_name]` - View items waiting to be delivered\n"
+                "`/fulfill <record>` - Mark an item as delivered\n"
                 "`/resetdata <code>` - Reset all user data\n"
                 "`/config_cf` - Configure coinflip settings\n"
                 "`/config_mines` - Configure mines settings\n"
-                "`/getroblox <user>` - Get Roblox username\n"
+                "`/config_doors` - Configure doors prizes\n"
+                "`/config_guild` - Configure admin roles and log channels\n"
+                "`/config_invites` - Configure invite reward clawback\n"
+                "`/getroblox [user] [username]` - Look up Roblox usernames\n"
+                "`/validateroblox` - Check linked Roblox usernames\n"
                 "`/setroblox <user> <username>` - Set Roblox username\n"
                 "`/invitespanel <channel>` - Send invite panel to channel\n"
                 "`/doorspanel <channel>` - Send doors game panel to channel\n"
-                "`/triggerevent` - Force start a minigame"
+                "`/config_minigames` - Configure minigame channels\n"
+                "`/triggerevent [channel]` - Force start a minigame"
             ),
             inline=False
         )
@@ -3532,6 +6291,32 @@ async def about(ctx):
     
     await ctx.send(embed=embed)
 
+def run_workers(worker_count):
+    """Run the bot as worker processes that split the shards between them, returns the worst exit code"""
+    shard_count = SHARD_COUNT or worker_count
+    workers = []
+    for worker_id in range(worker_count):
+        shard_ids = [shard_id for shard_id in range(shard_count) if shard_id % worker_count == worker_id]
+        env = dict(os.environ, SHARD_COUNT=str(shard_count), SHARD_IDS=",".join(map(str, shard_ids)), WORKER_ID=str(worker_id))
+        workers.append(subprocess.Popen([sys.executable, os.path.abspath(__file__)], env=env))
+        print(f"🧩 Started worker {worker_id} for shards {shard_ids} of {shard_count}")
+    
+    # Ctrl+C already reaches the whole process group, SIGTERM has to be passed on
+    def stop_workers(signum, frame):
+        for worker in workers:
+            worker.terminate()
+    signal.signal(signal.SIGTERM, stop_workers)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    return max(worker.wait() for worker in workers)
+
+async def run_bot(token):
+    """Run the bot until shutdown() closes it"""
+    install_signal_handlers()
+    async with bot:
+        await bot.start(token)
+    if shutdown_task:
+        await shutdown_task
+
 # Run the bot
 if __name__ == "__main__":
     TOKEN = os.getenv('DISCORD_BOT_TOKEN')
@@ -3541,18 +6326,26 @@ if __name__ == "__main__":
         print("💡 Set it in Railway dashboard under Variables tab")
         sys.exit(1)
     
+    parser = argparse.ArgumentParser(description="Run the bot")
+    parser.add_argument("--workers", type=int, default=0, help="Split the shards across this many processes")
+    args = parser.parse_args()
+    
+    if (args.workers or SHARD_COUNT) and not HOME_GUILD_ID:
+        # Workers can't all see the log channel, so they can't find the home guild on their own
+        print("❌ ERROR: HOME_GUILD_ID must be set to run sharded")
+        sys.exit(1)
+    if args.workers:
+        sys.exit(run_workers(args.workers))
+    if SHARD_COUNT:
+        try:
+            open_shared_store()
+        except (RuntimeError, sqlite3.Error) as e:
+            print(f"❌ Could not claim shards: {e}")
+            sys.exit(1)
+    
     try:
         print("🔑 Token found, connecting to Discord...")
-        import signal
-        def handle_exit(signum, frame):
-            loop = asyncio.get_event_loop()
-            loop.run_until_complete(force_save_on_exit())
-            sys.exit(0)
-            
-        signal.signal(signal.SIGTERM, handle_exit)
-        signal.signal(signal.SIGINT, handle_exit)
-        
-        bot.run(TOKEN, log_handler=None)
+        asyncio.run(run_bot(TOKEN))
     except discord.LoginFailure:
         print("❌ Invalid bot token!")
         sys.exit(1)
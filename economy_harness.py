@@ -0,0 +1,173 @@
+"""Concurrency stress test for economy transactions.
+
+Fires thousands of concurrent, conflicting balance operations through the
+bot's real economy.transaction in a temporary directory: gifts between a
+small pool of users (so most operations contend for the same locks), duels
+that escrow both stakes and pay the winner, overdrafts that must fail, and
+chat rewards that change balances outside the locks. Every operation awaits
+while holding its locks, the way command handlers do. Nothing connects to
+Discord.
+
+Checks at the end:
+    - nothing deadlocked (everything finished within --timeout)
+    - no balance went negative
+    - tokens are conserved: balances = starting tokens + chat rewards
+    - one ledger entry per committed operation, transfer entries sum to zero
+    - the ledger supply matches the balances
+    - concurrent /gift calls from one sender stay under the 3k daily limit,
+      even while other transactions hold the recipients' locks
+
+Usage:
+    python economy_harness.py
+    python economy_harness.py --operations 20000 --users 10 --seed 1 --gifts 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime
+
+HOME_GUILD_ID = 1000 << 22
+
+
+async def operation(bot, rng, users, stats):
+    """One command: gift, duel, overdraft or chat reward"""
+    await bot.enter_guild(HOME_GUILD_ID)
+    roll = rng.random()
+    try:
+        if roll < 0.5:
+            from_id, to_id = rng.sample(users, 2)
+            async with bot.economy.transaction(from_id, to_id, source="gift") as tx:
+                await asyncio.sleep(rng.random() * 0.002)
+                tx.transfer(from_id, to_id, rng.randint(1, 300))
+        elif roll < 0.75:
+            challenger, challenged = rng.sample(users, 2)
+            stake = rng.randint(1, 500)
+            async with bot.economy.transaction(challenger, challenged, source="duel") as tx:
+                tx.debit(challenger, stake)
+                tx.debit(challenged, stake)
+                await asyncio.sleep(rng.random() * 0.002)
+                tx.credit(rng.choice([challenger, challenged]), stake * 2)
+        elif roll < 0.85:
+            user_id, to_id = rng.sample(users, 2)
+            async with bot.economy.transaction(user_id, to_id, source="gift") as tx:
+                await asyncio.sleep(0)
+                tx.transfer(user_id, to_id, bot.get_user_balance(user_id) + 1)
+            stats["overdrafts_committed"] += 1
+            return
+        else:
+            amount = rng.randint(1, 5)
+            bot.update_balance(rng.choice(users), amount, "chat")
+            stats["chat"] += amount
+        stats["committed"] += 1
+    except bot.InsufficientFunds:
+        stats["refused"] += 1
+
+
+async def hold_lock(bot, rng, user_id):
+    """Another command holding a recipient's lock for a moment"""
+    await bot.enter_guild(HOME_GUILD_ID)
+    async with bot.economy.transaction(user_id, source="chat"):
+        await asyncio.sleep(rng.random() * 0.002)
+
+
+async def gift_burst(bot, rng, users, count):
+    """Fire /gift from one sender at busy recipients, returns failures"""
+    await bot.enter_guild(HOME_GUILD_ID)
+    sender = 999
+    bot.update_balance(sender, 1_000_000, "admin")
+    amounts = [rng.randint(50, 400) for _ in range(count)]
+
+    async def send(amount):
+        await bot.enter_guild(HOME_GUILD_ID)
+        _, error = await bot.send_gift(sender, rng.choice(users), amount)
+        return 0 if error else amount
+
+    # The holders go first, so the gifts have to wait for locks in between checking and sending
+    holders = [hold_lock(bot, rng, rng.choice(users)) for _ in range(count)]
+    results = await asyncio.gather(*holders, *(send(amount) for amount in amounts))
+    results = results[count:]
+    sent = sum(results)
+    await bot.enter_guild(HOME_GUILD_ID)
+    counted = bot.giveaway_daily_totals[str(sender)][datetime.now().date().isoformat()]
+    print(f"🎁 {count} concurrent gifts from one sender: {sum(1 for amount in results if amount)} went through, {sent:,} tokens")
+
+    failures = []
+    if sent > 3000:
+        failures.append(f"one sender gifted {sent:,} tokens in a day, over the 3,000 limit")
+    if counted != sent:
+        failures.append(f"the daily gift total says {counted:,}, {sent:,} were sent")
+    if bot.get_user_balance(sender) != 1_000_000 - sent:
+        failures.append(f"the sender has {bot.get_user_balance(sender):,} tokens after gifting {sent:,} of 1,000,000")
+    return failures
+
+
+async def run(args):
+    import bot
+    rng = random.Random(args.seed)
+    bot.home_guild_id = HOME_GUILD_ID
+    await bot.load_data()
+    await bot.enter_guild(HOME_GUILD_ID)
+
+    users = [1000 + i for i in range(args.users)]
+    for user_id in users:
+        bot.update_balance(user_id, args.balance, "admin")
+    starting = args.balance * args.users
+    first_entry = bot.economy.next_entry_id
+
+    stats = {"committed": 0, "refused": 0, "chat": 0, "overdrafts_committed": 0}
+    tasks = [operation(bot, random.Random(rng.random()), users, stats) for _ in range(args.operations)]
+    failures = []
+    try:
+        await asyncio.wait_for(asyncio.gather(*tasks), timeout=args.timeout)
+    except asyncio.TimeoutError:
+        failures.append(f"operations still running after {args.timeout}s (deadlock?)")
+
+    await bot.enter_guild(HOME_GUILD_ID)
+    balances = [bot.get_user_balance(user_id) for user_id in users]
+    entries = [entry for entry in bot.balance_ledger_unsaved if entry["id"] >= first_entry]
+    print(f"💸 {args.operations:,} operations on {args.users} users: {stats['committed']:,} committed, "
+          f"{stats['refused']:,} refused for insufficient funds")
+    print(f"   {len(entries):,} ledger entries, {sum(balances):,} tokens held")
+
+    if min(balances) < 0:
+        failures.append(f"{sum(1 for balance in balances if balance < 0)} balances went negative")
+    if stats["overdrafts_committed"]:
+        failures.append(f"{stats['overdrafts_committed']} overdrafts were committed")
+    if sum(balances) != starting + stats["chat"]:
+        failures.append(f"balances add up to {sum(balances):,}, expected {starting:,} + {stats['chat']:,} chat rewards")
+    if len(entries) != stats["committed"]:
+        failures.append(f"{len(entries):,} ledger entries for {stats['committed']:,} committed operations")
+    unbalanced = [entry["id"] for entry in entries if entry["source"] != "chat" and sum(entry["deltas"].values())]
+    if unbalanced:
+        failures.append(f"{len(unbalanced)} transfer entries don't sum to zero, e.g. {unbalanced[:5]}")
+    if bot.economy.get_supply() != sum(balances):
+        failures.append(f"ledger supply {bot.economy.get_supply():,} != balances {sum(balances):,}")
+    failures += await gift_burst(bot, rng, users, args.gifts)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fire concurrent conflicting economy transactions and check conservation")
+    parser.add_argument("--operations", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=8, help="Fewer users means more lock contention")
+    parser.add_argument("--balance", type=int, default=1000, help="Starting balance per user")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--gifts", type=int, default=200, help="Concurrent gifts from one sender")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp(prefix="economy_harness_"))
+    failures = asyncio.run(run(args))
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Tokens conserved, no negative balances, one ledger entry per committed operation, gift limit held")
+
+
+if __name__ == "__main__":
+    main()
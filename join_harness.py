@@ -0,0 +1,187 @@
+"""Replay benchmark for join bursts (raids, big promos).
+
+Runs the bot's real join batching (on_member_join queue, invite diffing,
+rewards, save_data, inviter DMs) against a fake guild in a temporary
+directory. Nothing connects to Discord: the fake guild counts invite
+fetches and DMs, and can add latency to the invite fetch like the real API.
+Each synthetic member bumps the use count of the invite they joined
+through (or none for a vanity URL join), then is queued the way
+on_member_join does.
+
+Checks at the end:
+    - every inviter got one reward per member who joined through their invites
+    - invite fetches and saves stay at no more than one per batch
+    - each inviter gets at most one DM per batch
+    - every vanity join leads to one "No invite found" DM
+
+Usage:
+    python join_harness.py
+    python join_harness.py --bursts 5 --burst-size 500 --rate 1000 --inviters 50 --fetch-latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+HOME_GUILD_ID = 1000 << 22
+MEMBER_ID_START = 1_000_000
+
+
+class FakeUser:
+    def __init__(self, user_id, name, stats):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.bot = False
+        self.created_at = datetime.now(timezone.utc) - timedelta(days=365)
+        self.stats = stats
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, embed=None):
+        self.stats["dms"].append(self.id)
+
+
+class FakeInvite:
+    def __init__(self, code, inviter):
+        self.code = code
+        self.inviter = inviter
+        self.uses = 0
+        self.max_uses = 0
+
+
+class FakeGuild:
+    def __init__(self, stats, inviters, fetch_latency):
+        self.id = HOME_GUILD_ID
+        self.name = "Join Harness"
+        self.stats = stats
+        self.fetch_latency = fetch_latency
+        self.members = {inviter.id: inviter for inviter in inviters}
+        self.invite_list = [FakeInvite(f"code{inviter.id}", inviter) for inviter in inviters]
+
+    async def invites(self):
+        self.stats["fetches"] += 1
+        await asyncio.sleep(self.fetch_latency)
+        return [self.snapshot(invite) for invite in self.invite_list]
+
+    def snapshot(self, invite):
+        copy = FakeInvite(invite.code, invite.inviter)
+        copy.uses = invite.uses
+        return copy
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+
+async def run(args):
+    import bot
+    rng = random.Random(args.seed)
+    stats = {"fetches": 0, "dms": [], "saves": 0, "batches": 0, "largest_batch": 0, "repeat_dms": 0}
+
+    bot.home_guild_id = HOME_GUILD_ID
+    await bot.load_data()
+    await bot.enter_guild(HOME_GUILD_ID)
+
+    inviters = [FakeUser(10_000 + i, f"Inviter{i}", stats) for i in range(args.inviters)]
+    guild = FakeGuild(stats, inviters, args.fetch_latency)
+    await bot.refresh_invite_cache(guild)
+    bot.current_guild_id.set(None)
+
+    # Count the work each batch does, the real functions still run
+    save_data, process_member_joins = bot.save_data, bot.process_member_joins
+
+    async def counted_save():
+        stats["saves"] += 1
+        return await save_data()
+
+    async def counted_batch(members):
+        stats["batches"] += 1
+        stats["largest_batch"] = max(stats["largest_batch"], len(members))
+        dms_before = len(stats["dms"])
+        await process_member_joins(members)
+        batch_dms = stats["dms"][dms_before:]
+        stats["repeat_dms"] += len(batch_dms) - len(set(batch_dms))
+
+    bot.save_data, bot.process_member_joins = counted_save, counted_batch
+
+    worker = asyncio.create_task(bot.process_join_batches())
+    expected = {}
+    joined = 0
+    vanity = 0
+    started = time.perf_counter()
+    for burst in range(args.bursts):
+        for _ in range(args.burst_size):
+            member = FakeUser(MEMBER_ID_START + joined, f"Member{joined}", stats)
+            member.guild = guild
+            joined += 1
+            if rng.random() < args.vanity:
+                vanity += 1
+            else:
+                invite = rng.choice(guild.invite_list)
+                invite.uses += 1
+                expected[str(invite.inviter.id)] = expected.get(str(invite.inviter.id), 0) + 1
+            await bot.join_queue.put(member)
+            await asyncio.sleep(1 / args.rate)
+        print(f"   burst {burst + 1}: {args.burst_size} joins at {args.rate}/s")
+        await asyncio.sleep(args.pause)
+
+    await bot.join_queue.put(None)
+    await worker
+    elapsed = time.perf_counter() - started
+
+    await bot.enter_guild(HOME_GUILD_ID)
+    rewarded = {inviter_id: data["total_invites"] for inviter_id, data in bot.invite_data.items()}
+    wrong = {inviter_id: (count, rewarded.get(inviter_id, 0)) for inviter_id, count in expected.items()
+             if rewarded.get(inviter_id, 0) != count}
+
+    print(f"📦 {joined:,} joins in {stats['batches']} batches (largest {stats['largest_batch']}) over {elapsed:.1f}s")
+    print(f"   invite fetches: {stats['fetches'] - 1} (one per join would be {joined:,})")
+    print(f"   saves: {stats['saves']} (one per join would be {joined:,})")
+    member_dms = sum(1 for user_id in stats["dms"] if user_id >= MEMBER_ID_START)
+    print(f"   inviter DMs: {len(stats['dms']) - member_dms} (one per join would be {joined:,})")
+    print(f"   \"No invite found\" DMs: {member_dms} for {vanity} vanity joins")
+
+    failures = []
+    if wrong:
+        failures.append(f"{len(wrong)} inviters got the wrong number of rewards (expected, got): {wrong}")
+    if stats["fetches"] - 1 > stats["batches"]:
+        failures.append("more than one invite fetch per batch")
+    if stats["saves"] > stats["batches"]:
+        failures.append("more than one save per batch")
+    if member_dms != vanity:
+        failures.append(f"{member_dms} \"No invite found\" DMs for {vanity} vanity joins")
+    if stats["repeat_dms"]:
+        failures.append(f"{stats['repeat_dms']} extra DMs to someone already DMed in the same batch")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay synthetic join bursts through the join batcher")
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--burst-size", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=300, help="Joins per second during a burst")
+    parser.add_argument("--pause", type=float, default=3, help="Seconds between bursts")
+    parser.add_argument("--inviters", type=int, default=20)
+    parser.add_argument("--vanity", type=float, default=0.05, help="Share of joins through the vanity URL")
+    parser.add_argument("--fetch-latency", type=float, default=0.1, help="Seconds each invite fetch takes")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp(prefix="join_harness_"))
+    print(f"👋 Replaying {args.bursts} bursts of {args.burst_size} joins from {args.inviters} inviters in {os.getcwd()}")
+    failures = asyncio.run(run(args))
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Every join was attributed with one fetch, one save and one DM per inviter per batch")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Benchmark for minigame answer matching on a busy channel.
+
+Builds real rounds from the question banks in minigames/ with the bot's
+AnswerMatcher and replays a synthetic channel at a fixed message rate:
+mostly chatter, plus wrong guesses, typos, long pastes and correct answers
+written in the ways players type them ("Paris.", "the pacific", accents).
+Each message goes through the matcher the same way on_message checks it,
+and a correct answer starts the next round. Nothing connects to Discord.
+
+Reports the per-message matching cost (mean and p99) and how far the replay
+fell behind its schedule. It fails if a correct variant is rejected, if
+the p99 cost goes over --budget, or if the replay falls behind.
+
+Usage:
+    python minigame_harness.py
+    python minigame_harness.py --rate 1000 --seconds 10 --budget 0.0005
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+
+CORRECT_VARIANTS = (
+    lambda answer: answer,
+    lambda answer: answer.upper(),
+    lambda answer: f"{answer}.",
+    lambda answer: f"{answer}!!",
+    lambda answer: f"the {answer}",
+    lambda answer: f"  {answer.title()}?  ",
+)
+
+
+def make_message(rng, game_round, words, answers):
+    """One synthetic chat message, returns (text, must_match)"""
+    roll = rng.random()
+    if roll < 0.70:
+        return " ".join(rng.choice(words) for _ in range(rng.randint(1, 12))), False
+    if roll < 0.82:
+        return rng.choice(answers), False
+    if roll < 0.92:
+        answer = game_round["answer"]
+        position = rng.randrange(len(answer))
+        return answer[:position] + rng.choice("abcdefghijklmnopqrstuvwxyz") + answer[position + 1:], False
+    if roll < 0.97:
+        return " ".join(rng.choice(words) for _ in range(rng.randint(100, 400))), False
+    accepted = [game_round["answer"], *game_round.get("aliases", [])]
+    return rng.choice(CORRECT_VARIANTS)(rng.choice(accepted)), True
+
+
+def new_round(bot, rng):
+    plugin = rng.choice([plugin for plugin in bot.MINIGAME_PLUGINS.values() if plugin.available()])
+    game_round = plugin.next_round()
+    matcher = bot.AnswerMatcher([game_round["answer"], *game_round.get("aliases", [])], plugin.fuzzy)
+    return game_round, matcher
+
+
+async def replay(bot, args):
+    rng = random.Random(args.seed)
+    words = [line.strip() for line in open(os.path.join(bot.MINIGAME_BANK_DIR, "words.txt")) if line.strip()]
+    answers = [plugin.next_round()["answer"] for plugin in bot.MINIGAME_PLUGINS.values() if plugin.available() for _ in range(20)]
+
+    game_round, matcher = new_round(bot, rng)
+    costs = []
+    rejected = []
+    rounds = 1
+    max_lag = 0.0
+    total = int(args.rate * args.seconds)
+    started = time.perf_counter()
+
+    for number in range(total):
+        # Deliver messages on the channel's schedule, like the gateway would
+        due = started + number / args.rate
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        max_lag = max(max_lag, time.perf_counter() - due)
+
+        text, must_match = make_message(rng, game_round, words, answers)
+        check_started = time.perf_counter()
+        matched = matcher.matches(text)
+        costs.append(time.perf_counter() - check_started)
+
+        if must_match and not matched:
+            rejected.append((text, game_round["answer"]))
+        if matched:
+            game_round, matcher = new_round(bot, rng)
+            rounds += 1
+
+    costs.sort()
+    return {
+        "messages": total,
+        "rounds": rounds,
+        "mean": statistics.fmean(costs),
+        "p99": costs[int(len(costs) * 0.99)],
+        "max": costs[-1],
+        "max_lag": max_lag,
+        "rejected": rejected,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a busy minigame channel through the answer matcher")
+    parser.add_argument("--rate", type=float, default=500, help="Messages per second in the channel")
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--budget", type=float, default=0.001, help="Allowed p99 seconds per message check")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    # The question banks are read relative to the repo
+    os.chdir(os.path.dirname(os.path.abspath(__file__)))
+    sys.path.insert(0, os.getcwd())
+    import bot
+    for plugin in bot.MINIGAME_PLUGINS.values():
+        for bank in plugin.banks:
+            bank.load()
+
+    print(f"🎯 Replaying {args.rate:g} messages/s for {args.seconds:g}s through the answer matcher")
+    stats = asyncio.run(replay(bot, args))
+    print(f"📦 {stats['messages']:,} messages, {stats['rounds']} rounds won")
+    print(f"   match cost: mean {stats['mean'] * 1e6:.1f} µs, p99 {stats['p99'] * 1e6:.1f} µs, max {stats['max'] * 1e6:.1f} µs")
+    print(f"   matching uses {stats['mean'] * args.rate * 100:.2f}% of one core at this rate, replay fell behind by at most {stats['max_lag'] * 1000:.1f} ms")
+
+    failures = []
+    if stats["rejected"]:
+        failures.append(f"{len(stats['rejected'])} correct answers were rejected, e.g. {stats['rejected'][:3]}")
+    if stats["p99"] > args.budget:
+        failures.append(f"p99 match cost {stats['p99'] * 1e6:.0f} µs is over the {args.budget * 1e6:.0f} µs budget")
+    if stats["max_lag"] > 0.1:
+        failures.append(f"the replay fell {stats['max_lag'] * 1000:.0f} ms behind the channel")
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ The matcher keeps up with the channel and accepts every correct variant")
+
+
+if __name__ == "__main__":
+    main()
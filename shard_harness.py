@@ -0,0 +1,241 @@
+"""Local test setup for the sharded deployment (`python bot.py --workers N`).
+
+Starts worker processes that run the bot's real state code (guild loading,
+balance transactions, shop purchases, Roblox links, save_data) against one
+shared store in a temporary directory. A fake gateway stands in for Discord:
+it makes up guild events and routes each one to the worker that leases the
+guild's shard, (guild_id >> 22) % shards, the same way Discord does. Nothing
+connects to Discord.
+
+Checks at the end:
+    - the shared token supply equals the balances held across every guild
+    - inventory record ids are unique across workers
+    - every balance ledger entry carries its row id, so entry ids are unique across workers
+    - a live worker's shards can't be claimed, and a worker refuses guilds it doesn't own
+    - config and Roblox link edits from one worker reach the others
+
+Usage:
+    python shard_harness.py
+    python shard_harness.py --workers 2 --shards 4 --guilds 8 --events 20000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+
+HOME_GUILD_ID = 1000 << 22
+
+
+def get_shard(guild_id, shard_count):
+    return (guild_id >> 22) % shard_count
+
+
+async def handle_event(bot, event):
+    """Apply one gateway event the way the bot's command handlers do"""
+    kind, guild_id, *args = event
+    await bot.enter_guild(guild_id)
+    if kind == "chat":
+        user_id, amount = args
+        bot.update_balance(user_id, amount, "chat")
+    elif kind == "gift":
+        from_id, to_id, amount = args
+        try:
+            async with bot.economy.transaction(from_id, to_id, source="gift") as tx:
+                await asyncio.sleep(0)
+                tx.transfer(from_id, to_id, amount)
+        except bot.InsufficientFunds:
+            pass
+    elif kind == "buy":
+        user_id, = args
+        if not bot.shop_data:
+            bot.shop_data.append({"name": "Test Pet", "price": 50, "type": "pet"})
+            bot.build_shop_index()
+        await bot.purchase_shop_item(user_id, bot.find_shop_item("Test Pet"))
+    elif kind == "link":
+        user_id, username = args
+        bot.link_roblox_account(user_id, username)
+    elif kind == "coinflip_config":
+        bot.coinflip_config["win_chance"], = args
+
+
+async def run_worker(bot, worker_id, events, results):
+    await bot.load_data()
+    bot.build_mines_payout_table()
+    bot.build_doors_prize_table()
+    if bot.owns_guild(bot.home_guild_id):
+        await bot.enter_guild(bot.home_guild_id)
+        bot.current_guild_id.set(None)
+    results.put(("ready", worker_id, None))
+
+    tasks = set()
+    while True:
+        event = await asyncio.to_thread(events.get)
+        if event[0] in ("save", "stop"):
+            await asyncio.gather(*tasks)
+            tasks.clear()
+            await bot.save_data()
+            if event[0] == "save":
+                results.put(("saved", worker_id, None))
+                continue
+            results.put(("report", worker_id, {
+                "balance": sum(data["balance"] for state in bot.guild_states.values() for data in state.user_data.values()),
+                "guilds": sorted(bot.guild_states),
+                "inventory_ids": sorted(entry_id for entry_id, entry in bot.inventory_ledger.items()
+                                        if entry.get("guild_id") in bot.guild_states),
+                "inventory_count": len(bot.inventory_ledger),
+                "win_chance": bot.coinflip_config["win_chance"],
+                "roblox_links": len(bot.roblox_data),
+            }))
+            bot.shared_store.release_shards()
+            return
+        if event[0] == "stray":
+            try:
+                await bot.enter_guild(event[1])
+                results.put(("stray", worker_id, "accepted"))
+            except RuntimeError:
+                results.put(("stray", worker_id, "rejected"))
+            continue
+        task = asyncio.create_task(handle_event(bot, event))
+        tasks.add(task)
+
+
+def worker_main(worker_id, shard_ids, shard_count, data_dir, events, results):
+    # The bot reads its shard settings when it is imported
+    os.environ.update(SHARD_COUNT=str(shard_count), SHARD_IDS=",".join(map(str, shard_ids)),
+                      WORKER_ID=str(worker_id), HOME_GUILD_ID=str(HOME_GUILD_ID))
+    os.chdir(data_dir)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bot
+    bot.open_shared_store()
+    bot.resolve_home_guild()
+    asyncio.run(run_worker(bot, worker_id, events, results))
+
+
+def collect(results, kind, count):
+    """Wait for one message of a kind from each worker"""
+    messages = {}
+    while len(messages) < count:
+        message_kind, worker_id, payload = results.get(timeout=120)
+        if message_kind != kind:
+            raise RuntimeError(f"Expected {kind} from workers, got {message_kind} from worker {worker_id}")
+        messages[worker_id] = payload
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run sharded workers against a fake gateway")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--guilds", type=int, default=8)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--events", type=int, default=20_000)
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    data_dir = tempfile.mkdtemp(prefix="shard_harness_")
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    queues = [context.Queue() for _ in range(args.workers)]
+    shard_owner = {shard_id: shard_id % args.workers for shard_id in range(args.shards)}
+
+    workers = []
+    for worker_id in range(args.workers):
+        shard_ids = [shard_id for shard_id, owner in shard_owner.items() if owner == worker_id]
+        worker = context.Process(target=worker_main, args=(worker_id, shard_ids, args.shards, data_dir, queues[worker_id], results))
+        worker.start()
+        workers.append(worker)
+    print(f"🧩 Started {args.workers} workers for {args.shards} shards in {data_dir}")
+    collect(results, "ready", args.workers)
+
+    # Fake gateway: every guild's events go to the worker leasing its shard
+    guild_ids = [HOME_GUILD_ID] + [(1001 + i) << 22 | rng.randrange(1 << 22) for i in range(args.guilds - 1)]
+
+    def send(event):
+        queues[shard_owner[get_shard(event[1], args.shards)]].put(event)
+
+    failures = []
+    for number in range(args.events):
+        guild_id = rng.choice(guild_ids)
+        user_id = rng.randint(1, args.users)
+        roll = rng.random()
+        if roll < 0.6:
+            send(("chat", guild_id, user_id, rng.randint(1, 50)))
+        elif roll < 0.9:
+            send(("gift", guild_id, user_id, rng.randint(1, args.users), rng.randint(1, 100)))
+        elif roll < 0.99:
+            send(("buy", guild_id, user_id))
+        else:
+            send(("link", guild_id, user_id, f"Player{user_id}_{number}"))
+
+        if number == args.events // 2:
+            send(("coinflip_config", HOME_GUILD_ID, 37))
+            for queue in queues:
+                queue.put(("save",))
+            collect(results, "saved", args.workers)
+
+    # A misrouted event must not be applied by a worker that doesn't own the guild
+    stray_guild = next((guild_id for guild_id in guild_ids if shard_owner[get_shard(guild_id, args.shards)] != 0), None)
+    if stray_guild is not None:
+        queues[0].put(("stray", stray_guild))
+        if collect(results, "stray", 1)[0] != "rejected":
+            failures.append("worker 0 accepted an event for a guild it doesn't own")
+
+    # Shards stay leased while their worker is alive
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bot
+    intruder = bot.SharedStore(os.path.join(data_dir, bot.SHARED_STORE_FILE), args.workers)
+    try:
+        intruder.claim_shards([0])
+        failures.append("a second worker claimed a leased shard")
+    except RuntimeError:
+        pass
+
+    # Two save rounds so every worker has pulled the others' last changes
+    for queue in queues:
+        queue.put(("save",))
+    collect(results, "saved", args.workers)
+    for queue in queues:
+        queue.put(("stop",))
+    reports = collect(results, "report", args.workers)
+    for worker in workers:
+        worker.join()
+
+    economy = bot.Economy()
+    economy.load_dict(intruder.read_economy())
+    balance = sum(report["balance"] for report in reports.values())
+    inventory_ids = [entry_id for report in reports.values() for entry_id in report["inventory_ids"]]
+    stored_ids = [entry["id"] for _, entry in intruder.read_inventory_entries()]
+    renumbered = [row_id for row_id, entry in intruder.db.execute("SELECT id, entry FROM balance_ledger") if json.loads(entry)["id"] != row_id]
+
+    print(f"📦 {args.events:,} events, {economy.next_entry_id:,} balance ledger entries, {len(stored_ids):,} inventory entries")
+    for worker_id, report in sorted(reports.items()):
+        print(f"   worker {worker_id}: {len(report['guilds'])} guilds, {report['balance']:,} tokens, "
+              f"{len(report['inventory_ids'])} grants, win chance {report['win_chance']}%, {report['roblox_links']} Roblox links")
+
+    if economy.get_supply() != balance:
+        failures.append(f"shared supply {economy.get_supply():,} != balances held {balance:,}")
+    if renumbered:
+        failures.append(f"{len(renumbered)} balance ledger entries don't carry their row id, e.g. {renumbered[:5]}")
+    if len(set(inventory_ids)) != len(inventory_ids) or sorted(inventory_ids) != sorted(stored_ids):
+        failures.append("inventory ids collide or are missing from the shared ledger")
+    if any(report["inventory_count"] != len(stored_ids) for report in reports.values()):
+        failures.append("a worker's inventory ledger is missing entries from the other workers")
+    if any(report["win_chance"] != 37 for report in reports.values()):
+        failures.append("the coinflip config edit didn't reach every worker")
+    if len({report["roblox_links"] for report in reports.values()}) != 1:
+        failures.append("workers disagree on the Roblox links")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Shared store stayed consistent across workers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""Concurrency stress test for limited-stock shop drops.
+
+Runs the bot's real shop purchase path (reserve_shop_item from the shop menu,
+the confirm button's commit inside economy.transaction, /buy's
+purchase_shop_item, reservation timeouts on the deadline scheduler) in a
+temporary directory. Hundreds of buyers hit a few drops at once: they
+double-click confirm, cancel, walk away until the reservation times out,
+and gift tokens to each other so balances change under them. Nothing
+connects to Discord.
+
+Checks at the end:
+    - no item sold more than its stock, and stock left = stock - sold
+    - nobody bought more than the per-user limit
+    - no balance went negative, and the tokens held add up to what was
+      handed out minus what the shop took
+    - the economy ledger supply matches the balances
+    - every reservation was released and the reserved counters are back to 0
+    - a confirm view whose reservation was replaced by a newer one doesn't commit
+
+Usage:
+    python shop_harness.py
+    python shop_harness.py --buyers 500 --clicks 4 --seed 1
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+
+HOME_GUILD_ID = 1000 << 22
+DROPS = [
+    {"name": "Huge Drop Cat", "price": 500, "type": "pet", "stock": 10, "per_user_limit": 1},
+    {"name": "Titanic Drop Dog", "price": 1500, "type": "pet", "stock": 25, "per_user_limit": 2},
+    {"name": "Drop Egg", "price": 100, "type": "egg", "per_user_limit": 3},
+]
+
+
+async def buyer(bot, rng, user_id, users, clicks, stats):
+    """One user's clicks during a drop"""
+    await bot.enter_guild(HOME_GUILD_ID)
+    for _ in range(clicks):
+        item = bot.find_shop_item(rng.choice(DROPS)["name"])
+        action = rng.random()
+        await asyncio.sleep(rng.random() * 0.05)
+
+        if action < 0.3:
+            # /buy reserves and commits in one step
+            _, error = await bot.purchase_shop_item(user_id, item)
+            stats["sold" if not error else "refused"] += 1
+            continue
+
+        if action < 0.4:
+            # Gift tokens to someone else while the drop is on
+            to_id = rng.choice(users)
+            try:
+                async with bot.economy.transaction(user_id, to_id, source="gift") as tx:
+                    await asyncio.sleep(0)
+                    tx.transfer(user_id, to_id, rng.randint(1, 1000))
+            except bot.InsufficientFunds:
+                pass
+            continue
+
+        # Shop menu: reserve, think, then confirm (maybe twice), cancel or walk away
+        if bot.reserve_shop_item(user_id, item):
+            stats["refused"] += 1
+            continue
+        reservation = bot.shop_reservations[str(user_id)]
+        await asyncio.sleep(rng.random() * 0.1)
+        roll = rng.random()
+        if roll < 0.15:
+            bot.release_shop_reservation(user_id)
+            stats["cancelled"] += 1
+        elif roll < 0.25:
+            stats["abandoned"] += 1
+        elif roll < 0.3:
+            # Open a second confirm view, click the first (stale) one, then the new one
+            if bot.reserve_shop_item(user_id, bot.find_shop_item(rng.choice(DROPS)["name"])):
+                stats["refused"] += 1
+                continue
+            if not await confirm(bot, user_id, reservation):
+                stats["stale_committed"] += 1
+            error = await confirm(bot, user_id, bot.shop_reservations.get(str(user_id)))
+            stats["sold" if not error else "refused"] += 1
+        else:
+            confirms = 2 if roll < 0.4 else 1
+            results = await asyncio.gather(*(confirm(bot, user_id, reservation) for _ in range(confirms)))
+            stats["sold"] += sum(1 for error in results if not error)
+            stats["refused"] += sum(1 for error in results if error)
+
+
+async def confirm(bot, user_id, reservation):
+    """The confirm button's path in PurchaseConfirmView"""
+    async with bot.economy.transaction(user_id, source="shop") as tx:
+        await asyncio.sleep(0)
+        _, _, error = bot.commit_shop_reservation(tx, user_id, reservation)
+    return error
+
+
+async def run(args):
+    import bot
+    rng = random.Random(args.seed)
+    bot.home_guild_id = HOME_GUILD_ID
+    bot.SHOP_RESERVATION_TIMEOUT = 0.3
+    await bot.load_data()
+    await bot.enter_guild(HOME_GUILD_ID)
+
+    for drop in DROPS:
+        bot.shop_data.append(dict(drop))
+    bot.build_shop_index()
+    users = [1000 + i for i in range(args.buyers)]
+    handed_out = 0
+    for user_id in users:
+        amount = rng.choice([0, 50, 500, 1500, 3000, 6000])
+        if amount:
+            bot.update_balance(user_id, amount, "admin")
+            handed_out += amount
+
+    runner = asyncio.create_task(bot.run_deadlines())
+    stats = {"sold": 0, "refused": 0, "cancelled": 0, "abandoned": 0, "stale_committed": 0}
+    await asyncio.gather(*(buyer(bot, random.Random(rng.random()), user_id, users, args.clicks, stats) for user_id in users))
+    # Let abandoned reservations time out
+    await asyncio.sleep(bot.SHOP_RESERVATION_TIMEOUT + 0.2)
+    runner.cancel()
+    await bot.enter_guild(HOME_GUILD_ID)
+
+    failures = []
+    taken = 0
+    print(f"🛒 {args.buyers} buyers x {args.clicks} clicks: {stats['sold']} sold, {stats['refused']} refused, "
+          f"{stats['cancelled']} cancelled, {stats['abandoned']} left to time out")
+    for drop in DROPS:
+        item = bot.find_shop_item(drop["name"])
+        grants = [entry for entry in bot.inventory_ledger.values() if entry["type"] == "grant" and entry["item"] == drop["name"]]
+        sold = sum(entry["quantity"] for entry in grants)
+        taken += sold * drop["price"]
+        print(f"   {drop['name']}: {sold} sold" + (f" of {drop['stock']}, {item['stock']} left" if "stock" in drop else ""))
+        if "stock" in drop and (sold > drop["stock"] or item["stock"] != drop["stock"] - sold):
+            failures.append(f"{drop['name']} sold {sold} of {drop['stock']} with {item['stock']} left")
+        over_limit = {user_id: count for user_id, count in item.get("purchases", {}).items() if count > drop["per_user_limit"]}
+        if over_limit:
+            failures.append(f"{drop['name']} sold over the per-user limit to {over_limit}")
+        bought = {}
+        for entry in grants:
+            bought[entry["user_id"]] = bought.get(entry["user_id"], 0) + entry["quantity"]
+        if bought != item.get("purchases", {}):
+            failures.append(f"{drop['name']} purchase counts don't match its inventory grants")
+
+    if stats["stale_committed"]:
+        failures.append(f"{stats['stale_committed']} stale confirm views committed a newer reservation")
+    balances = [bot.get_user_balance(user_id) for user_id in users]
+    if min(balances) < 0:
+        failures.append(f"{sum(1 for balance in balances if balance < 0)} balances went negative")
+    if sum(balances) != handed_out - taken:
+        failures.append(f"balances add up to {sum(balances):,}, expected {handed_out:,} handed out - {taken:,} spent")
+    if bot.economy.get_supply() != sum(balances):
+        failures.append(f"ledger supply {bot.economy.get_supply():,} != balances {sum(balances):,}")
+    if bot.shop_reservations or bot.shop_reserved:
+        failures.append(f"{len(bot.shop_reservations)} reservations and {len(bot.shop_reserved)} reserved counters left over")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress limited-stock shop drops with concurrent buyers")
+    parser.add_argument("--buyers", type=int, default=300)
+    parser.add_argument("--clicks", type=int, default=3, help="Purchase attempts per buyer")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(tempfile.mkdtemp(prefix="shop_harness_"))
+    failures = asyncio.run(run(args))
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ No oversell, no negative balances, every token accounted for")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Local test for graceful shutdown: SIGTERM in the middle of a burst of events.
+
+Starts the bot's real state code in a child process (no Discord connection)
+with the same signal handlers, background jobs and save path as the bot.
+The child fires a steady burst of chat rewards and gift transactions, some
+of them still waiting inside their transaction when the signal arrives, and
+prints every balance change once it has been committed. The parent sends
+SIGTERM mid-burst, waits for the child to exit, then checks that the saved
+balances and economy ledger contain every committed change.
+
+Usage:
+    python shutdown_harness.py
+    python shutdown_harness.py --burst 2.0 --users 20 --runs 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+HOME_GUILD_ID = 1000 << 22
+
+
+async def fire_event(bot, rng, users):
+    """One command: a chat reward or a gift that holds its locks across an await"""
+    if not bot.accept_event():
+        print("REJECTED", flush=True)
+        return
+    await bot.enter_guild(HOME_GUILD_ID)
+    from_id, to_id = rng.sample(range(1, users + 1), 2)
+    if rng.random() < 0.5:
+        await asyncio.sleep(rng.random() * 0.2)
+        amount = rng.randint(1, 5)
+        bot.update_balance(from_id, amount, "chat")
+        print(f"ACK {from_id} {amount}", flush=True)
+        return
+    amount = rng.randint(1, 20)
+    try:
+        async with bot.economy.transaction(from_id, to_id, source="gift") as tx:
+            await asyncio.sleep(rng.random() * 0.1)
+            tx.transfer(from_id, to_id, amount)
+    except bot.InsufficientFunds:
+        return
+    print(f"ACK {from_id} {-amount}", flush=True)
+    print(f"ACK {to_id} {amount}", flush=True)
+
+
+async def run_child(users, seed):
+    import bot
+    rng = random.Random(seed)
+    bot.home_guild_id = HOME_GUILD_ID
+    await bot.load_data()
+    await bot.enter_guild(HOME_GUILD_ID)
+    bot.current_guild_id.set(None)
+    bot.start_background_jobs()
+    bot.startup_complete.set()
+    bot.install_signal_handlers()
+    print("READY", flush=True)
+
+    events = set()
+    while not bot.bot.is_closed():
+        task = asyncio.create_task(fire_event(bot, rng, users))
+        events.add(task)
+        task.add_done_callback(events.discard)
+        await asyncio.sleep(0.005)
+    if bot.shutdown_task:
+        await bot.shutdown_task
+
+
+def run_once(args, seed):
+    """Run one child, SIGTERM it mid-burst and compare its saved data to what it committed"""
+    data_dir = tempfile.mkdtemp(prefix="shutdown_harness_")
+    child = subprocess.Popen(
+        [sys.executable, os.path.abspath(__file__), "--child", "--users", str(args.users), "--seed", str(seed)],
+        cwd=data_dir, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.abspath(__file__))))
+
+    for line in child.stdout:
+        if line.startswith("READY"):
+            break
+    time.sleep(args.burst)
+    child.send_signal(signal.SIGTERM)
+    output = child.stdout.read().splitlines()
+    exit_code = child.wait(timeout=60)
+
+    expected = {}
+    for line in output:
+        if line.startswith("ACK "):
+            _, user_id, delta = line.split()
+            expected[user_id] = expected.get(user_id, 0) + int(delta)
+
+    with open(os.path.join(data_dir, "user_data.json")) as f:
+        saved = {user_id: data["balance"] for user_id, data in json.load(f).items()}
+    with open(os.path.join(data_dir, "economy_stats.json")) as f:
+        sources = json.load(f)["sources"]
+    supply = sum(totals["paid_out"] - totals["paid_in"] for totals in sources.values())
+
+    lost = {user_id: (delta, saved.get(user_id, 0)) for user_id, delta in expected.items() if saved.get(user_id, 0) != delta}
+    changes = sum(1 for line in output if line.startswith("ACK "))
+    rejected = sum(1 for line in output if line.startswith("REJECTED"))
+    print(f"   run {seed}: {changes:,} committed changes, {rejected} events turned away, exit code {exit_code}")
+
+    failures = []
+    if exit_code != 0:
+        failures.append(f"child exited with {exit_code}")
+    if not any("Data saved on exit" in line for line in output):
+        failures.append("final save didn't run")
+    if lost:
+        failures.append(f"{len(lost)} users' saved balances don't match their committed changes: {lost}")
+    if supply != sum(saved.values()):
+        failures.append(f"ledger supply {supply:,} != saved balances {sum(saved.values()):,}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SIGTERM the bot mid-burst and check nothing committed is lost")
+    parser.add_argument("--burst", type=float, default=1.0, help="Seconds of events before SIGTERM")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(run_child(args.users, args.seed))
+        return
+
+    print(f"🔄 Sending SIGTERM after {args.burst}s of events, {args.runs} runs")
+    failures = []
+    for seed in range(args.seed, args.seed + args.runs):
+        failures.extend(run_once(args, seed))
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Every committed balance change was saved")
+
+
+if __name__ == "__main__":
+    main()
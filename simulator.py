@@ -0,0 +1,262 @@
+"""Offline house-edge simulator for the bot's games.
+
+Reproduces the outcome logic of /coinflip, /crime, the doors panel, /mines
+and /duel with vectorized NumPy draws and reports RTP, variance, house
+profit per 1k bets and risk of ruin. Reads the live config files so
+proposed changes can be evaluated before applying them.
+
+Usage:
+    python simulator.py --rounds 10000000 --bet 1000 --bankroll 10000
+    python simulator.py --win-chance 40 --mines 3 --reveals 5
+    python simulator.py --check --check-rounds 200000
+
+--check goes through every allowed mine count and every number of reveals
+with the bot's own payout table. It computes the exact RTP of cashing out
+after that many reveals and exits with an error if it is above 1 - house
+edge, or further below it than the 0.01x and whole-token rounding explains.
+It also samples each case and fails if the simulation disagrees with the
+exact value.
+
+Requires numpy (offline tool only, not needed by the bot itself):
+    pip install -r requirements-dev.txt
+"""
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+COINFLIP_CONFIG_FILE = 'coinflip_config.json'
+MINES_CONFIG_FILE = 'mines_config.json'
+DOORS_CONFIG_FILE = 'doors_config.json'
+
+MINES_GRID_SIZE = 25
+DEFAULT_DOORS_CONFIG = {
+    "fee": 550,
+    "prizes": [
+        {"name": "TITANIC", "chance": 0.3, "tokens": 0},
+        {"name": "1,000,000,000 Gems", "chance": 1.0, "tokens": 0},
+        {"name": "300,000,000 Gems", "chance": 1.5, "tokens": 0},
+        {"name": "50,000,000 Gems", "chance": 20.0, "tokens": 0},
+        {"name": "10,000,000 Gems", "chance": 30.0, "tokens": 0},
+        {"name": "450 Tokens", "chance": 47.2, "tokens": 450}
+    ]
+}
+
+CHUNK_SIZE = 1_000_000
+
+
+def load_config(path, defaults):
+    """Load a live config file, falling back to the bot's defaults"""
+    config = dict(defaults)
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            config.update(json.load(f))
+    return config
+
+
+def mines_multiplier(mines_count, revealed, house_edge):
+    """Mirror of build_mines_payout_table in bot.py for a single entry"""
+    safe_tiles = MINES_GRID_SIZE - mines_count
+    survival = 1.0
+    for i in range(1, revealed + 1):
+        survival *= (safe_tiles - i + 1) / (MINES_GRID_SIZE - i + 1)
+    return np.floor((1 - house_edge / 100) / survival * 100) / 100
+
+
+def coinflip_net(rng, n, bet, win_chance):
+    """Net player result per /coinflip round"""
+    roll = rng.integers(1, 101, size=n)
+    return np.where(roll <= win_chance, bet, -bet)
+
+
+def crime_net(rng, n):
+    """Net player result per /crime (balance assumed to cover the 200 max loss)"""
+    success = rng.integers(0, 2, size=n).astype(bool)
+    gain = rng.integers(1, 101, size=n)
+    loss = rng.integers(1, 201, size=n)
+    return np.where(success, gain, -loss)
+
+
+def doors_net(rng, n, doors_config):
+    """Net token result per door opened (gem and Titanic prizes count as 0 tokens)"""
+    cumulative = np.cumsum([prize["chance"] for prize in doors_config["prizes"]])
+    tokens = np.array([prize["tokens"] for prize in doors_config["prizes"]])
+    roll = rng.random(size=n) * cumulative[-1]
+    index = np.minimum(np.searchsorted(cumulative, roll, side="left"), len(tokens) - 1)
+    return tokens[index] - doors_config["fee"]
+
+
+def mines_net(rng, n, bet, mines_count, reveals, house_edge, multiplier=None):
+    """Net player result for revealing `reveals` tiles then cashing out"""
+    mines_hit = rng.hypergeometric(mines_count, MINES_GRID_SIZE - mines_count, reveals, size=n)
+    if multiplier is None:
+        multiplier = mines_multiplier(mines_count, reveals, house_edge)
+    payout = int(bet * multiplier)
+    return np.where(mines_hit == 0, payout - bet, -bet)
+
+
+def duel_net(rng, n, bet):
+    """Net result for the challenger of a /duel (zero-sum between players)"""
+    return np.where(rng.integers(0, 2, size=n) == 0, bet, -bet)
+
+
+def summarize(draw, rounds, stake):
+    """Run `rounds` draws in chunks and collect mean/variance of the net result"""
+    total = 0.0
+    total_sq = 0.0
+    done = 0
+    while done < rounds:
+        n = min(CHUNK_SIZE, rounds - done)
+        net = draw(n).astype(np.float64)
+        total += net.sum()
+        total_sq += np.square(net).sum()
+        done += n
+
+    mean = total / rounds
+    variance = total_sq / rounds - mean ** 2
+    return {
+        "rtp": (stake + mean) / stake if stake else None,
+        "mean": mean,
+        "variance": variance,
+        "house_per_1k": -mean * 1000,
+    }
+
+
+def risk_of_ruin(draw, stake, bankroll, players, session):
+    """Share of players who can no longer afford a round within `session` rounds"""
+    ruined = 0
+    per_chunk = max(1, CHUNK_SIZE // session)
+    done = 0
+    while done < players:
+        n = min(per_chunk, players - done)
+        net = draw(n * session).reshape(n, session)
+        balance = bankroll + np.cumsum(net, axis=1)
+        ruined += np.count_nonzero((balance < stake).any(axis=1))
+        done += n
+    return ruined / players
+
+
+def load_bot_payouts(mines_config):
+    """The bot's own mines payout table for a config, so --check tests what players are actually paid"""
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import bot
+    bot.mines_config = mines_config
+    bot.build_mines_payout_table()
+    return bot.get_mines_multiplier
+
+
+def exact_mines_rtp(mines_count, reveals, bet, multiplier):
+    """Exact RTP of revealing `reveals` tiles then cashing out, returns (rtp, survival chance)"""
+    survival = math.comb(MINES_GRID_SIZE - mines_count, reveals) / math.comb(MINES_GRID_SIZE, reveals)
+    return survival * int(bet * multiplier) / bet, survival
+
+
+def check_mines_rtp(rng, rounds, bet, mines_config, get_multiplier):
+    """Check every allowed mine count and number of reveals, returns the failing (mines, reveals) pairs"""
+    target = 1 - mines_config["house_edge"] / 100
+    failures = []
+    print(f"💣 Checking mines RTP against {target * 100:.2f}% for every mine count and number of reveals "
+          f"(sampling {rounds:,} games each)")
+    for mines_count in range(mines_config["min_mines"], mines_config["max_mines"] + 1):
+        worst = None
+        for reveals in range(1, MINES_GRID_SIZE - mines_count + 1):
+            multiplier = get_multiplier(mines_count, reveals)
+            rtp, survival = exact_mines_rtp(mines_count, reveals, bet, multiplier)
+            # Rounding the multiplier down to 0.01x and the payout down to a whole token is all the house may add
+            lowest = target - survival * (0.01 + 1 / bet)
+            problems = []
+            if not lowest - 1e-9 <= rtp <= target + 1e-9:
+                problems.append(f"exact RTP {rtp * 100:.4f}% outside {lowest * 100:.4f}%-{target * 100:.4f}%")
+            mirrored = mines_multiplier(mines_count, reveals, mines_config["house_edge"])
+            if abs(mirrored - multiplier) > 1e-9:
+                problems.append(f"simulator pays {mirrored:.2f}x, the bot {multiplier:.2f}x")
+
+            # Secondary: the simulation has to agree with the exact value, within 5 of its exact standard errors
+            stats = summarize(
+                lambda n: mines_net(rng, n, bet, mines_count, reveals, mines_config["house_edge"], multiplier),
+                rounds, bet)
+            stderr = int(bet * multiplier) / bet * math.sqrt(survival * (1 - survival) / rounds)
+            if abs(stats["rtp"] - rtp) > 5 * stderr + 1e-12:
+                problems.append(f"sampled RTP {stats['rtp'] * 100:.4f}% disagrees with the exact {rtp * 100:.4f}%")
+
+            for problem in problems:
+                print(f"❌ {mines_count:>3} mines, {reveals:>2} reveals ({multiplier:.2f}x): {problem}")
+            if problems:
+                failures.append((mines_count, reveals))
+            if worst is None or rtp < worst[1]:
+                worst = (reveals, rtp)
+        print(f"   {mines_count:>3} mines: lowest exact RTP {worst[1] * 100:.3f}% at {worst[0]} reveals")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate house edge for all games")
+    parser.add_argument("--rounds", type=int, default=10_000_000)
+    parser.add_argument("--bet", type=int, default=1000)
+    parser.add_argument("--bankroll", type=int, default=10_000)
+    parser.add_argument("--players", type=int, default=10_000)
+    parser.add_argument("--session", type=int, default=100, help="Rounds per player for risk of ruin")
+    parser.add_argument("--win-chance", type=int, help="Override coinflip win chance (%%)")
+    parser.add_argument("--house-edge", type=float, help="Override mines house edge (%%)")
+    parser.add_argument("--doors-config", default=DOORS_CONFIG_FILE, help="Doors prize table to evaluate")
+    parser.add_argument("--mines", type=int, default=3, help="Mines count for the mines strategy")
+    parser.add_argument("--reveals", type=int, default=5, help="Tiles revealed before cashing out")
+    parser.add_argument("--all-mines", action="store_true", help="Also report mines RTP for every allowed mine count")
+    parser.add_argument("--check", action="store_true",
+                        help="Only check the exact mines RTP for every mine count and number of reveals, exit 1 if any is off")
+    parser.add_argument("--check-rounds", type=int, default=100_000, help="Games sampled per case by --check")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    coinflip_config = load_config(COINFLIP_CONFIG_FILE, {"win_chance": 45, "max_bet": 1000})
+    mines_config = load_config(MINES_CONFIG_FILE, {"min_mines": 1, "max_mines": 24, "min_bet": 100, "max_bet": 1000, "house_edge": 3})
+    doors_config = load_config(args.doors_config, DEFAULT_DOORS_CONFIG)
+    if args.win_chance is not None:
+        coinflip_config["win_chance"] = args.win_chance
+    if args.house_edge is not None:
+        mines_config["house_edge"] = args.house_edge
+
+    rng = np.random.default_rng(args.seed)
+    bet = args.bet
+
+    if args.check:
+        failures = check_mines_rtp(rng, args.check_rounds, bet, mines_config, load_bot_payouts(mines_config))
+        if failures:
+            print(f"❌ RTP is off for {len(failures)} (mines, reveals) cases: {failures}")
+            sys.exit(1)
+        print("✅ Mines RTP matches the house edge for every mine count and number of reveals")
+        return
+
+    games = {
+        f"coinflip ({coinflip_config['win_chance']}%)": (
+            lambda n: coinflip_net(rng, n, bet, coinflip_config["win_chance"]), bet),
+        "crime": (lambda n: crime_net(rng, n), 0),
+        "doors": (lambda n: doors_net(rng, n, doors_config), doors_config["fee"]),
+        f"mines ({args.mines} mines, {args.reveals} reveals)": (
+            lambda n: mines_net(rng, n, bet, args.mines, args.reveals, mines_config["house_edge"]), bet),
+        "duel": (lambda n: duel_net(rng, n, bet), bet),
+    }
+
+    print(f"🎲 Simulating {args.rounds:,} rounds per game (bet {bet:,}, bankroll {args.bankroll:,})")
+    print(f"{'Game':<32}{'RTP':>9}{'Variance':>16}{'House/1k bets':>16}{'Risk of ruin':>14}")
+    for name, (draw, stake) in games.items():
+        stats = summarize(draw, args.rounds, stake)
+        rtp = f"{stats['rtp'] * 100:.3f}%" if stats["rtp"] is not None else "n/a"
+        ruin = f"{risk_of_ruin(draw, stake, args.bankroll, args.players, args.session) * 100:.2f}%" if stake else "n/a"
+        print(f"{name:<32}{rtp:>9}{stats['variance']:>16,.0f}{stats['house_per_1k']:>16,.0f}{ruin:>14}")
+
+    if args.all_mines:
+        print(f"\n💣 Mines RTP by mine count ({args.reveals} reveals, {mines_config['house_edge']}% edge)")
+        for mines_count in range(mines_config["min_mines"], mines_config["max_mines"] + 1):
+            reveals = min(args.reveals, MINES_GRID_SIZE - mines_count)
+            stats = summarize(
+                lambda n: mines_net(rng, n, bet, mines_count, reveals, mines_config["house_edge"]),
+                args.rounds, bet)
+            print(f"{mines_count:>3} mines: {stats['rtp'] * 100:.3f}%")
+
+
+if __name__ == "__main__":
+    main()